@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+
+import json
+import logging
+import re
+import shlex
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TextIO
+
+from typer import run
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_WORKERS = 32
+DEFAULT_CONNECT_TIMEOUT = 30
+# Fields of a 'find -ls' line before the file path:
+# inode, blocks, perms, links, user, group, size, month, day, time/year
+FIND_LS_NUM_FIELDS = 10
+FIND_LS_SIZE_INDEX = 6
+STDERR_TAIL_LINES = 20
+FIND_LS_ESCAPE_REGEX = re.compile(r"\\([0-7]{3}|.)")
+
+
+@dataclass
+class RemovedFile:
+    path: str
+    size: int
+    is_dir: bool
+
+
+@dataclass
+class NodeCleanup:
+    node: str
+    returncode: int | None = None
+    num_files: int = 0
+    num_bytes: int = 0
+    files: list[RemovedFile] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+def unescape_find_ls_path(path: str) -> str:
+    """
+    Undo the backslash escaping of special characters ("\\ ") and octal
+    escaping of non-printable bytes ("\\303") in 'find -ls' file paths.
+    """
+    path_bytes = b""
+    pos = 0
+    for match in FIND_LS_ESCAPE_REGEX.finditer(path):
+        escaped = match.group(1)
+        path_bytes += path[pos : match.start()].encode()
+        path_bytes += (
+            bytes([int(escaped, 8)]) if len(escaped) == 3 else escaped.encode()
+        )
+        pos = match.end()
+    path_bytes += path[pos:].encode()
+    return path_bytes.decode(errors="replace")
+
+
+def parse_find_ls_line(line: str) -> RemovedFile | None:
+    fields = line.rstrip("\n").split(maxsplit=FIND_LS_NUM_FIELDS)
+    if len(fields) <= FIND_LS_NUM_FIELDS or not fields[FIND_LS_SIZE_INDEX].isdigit():
+        return None
+    return RemovedFile(
+        path=unescape_find_ls_path(fields[FIND_LS_NUM_FIELDS]),
+        size=int(fields[FIND_LS_SIZE_INDEX]),
+        is_dir=fields[2].startswith("d"),
+    )
+
+
+def format_size(nbytes: int) -> str:
+    return f"{nbytes / 2**30:.2f} GiB"
+
+
+def get_remote_find_command(cleanup_dir: str, find_args: str, delete: bool) -> str:
+    cmd = f"find {shlex.quote(cleanup_dir)} {find_args} -ls"
+    if delete:
+        cmd += " -delete"
+    return cmd
+
+
+def cleanup_node(
+    node: str,
+    remote_cmd: str,
+    log_fp: TextIO | None,
+    log_lock: threading.Lock,
+    connect_timeout: int = DEFAULT_CONNECT_TIMEOUT,
+) -> NodeCleanup:
+    """
+    Run the cleanup 'find' command on one node over SSH, parsing its '-ls'
+    output into the list of (to be) removed files and appending the raw
+    lines to the removed files log (if any).
+    Sizes of removed directories aren't counted in the node byte total.
+    """
+    result = NodeCleanup(node)
+    ssh_cmd = [
+        "ssh",
+        "-o",
+        "BatchMode=yes",
+        "-o",
+        f"ConnectTimeout={connect_timeout}",
+        node,
+        remote_cmd,
+    ]
+    try:
+        proc = subprocess.Popen(
+            ssh_cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors="replace",
+        )
+    except OSError as e:
+        result.errors.append(str(e))
+        return result
+    assert proc.stdout is not None and proc.stderr is not None
+    proc_stderr = proc.stderr
+
+    # Drain stderr in the background so a chatty node can't block stdout
+    stderr_lines: list[str] = []
+    stderr_reader = threading.Thread(target=lambda: stderr_lines.extend(proc_stderr))
+    stderr_reader.start()
+
+    log_lines = []
+    for line in proc.stdout:
+        log_lines.append(line)
+        removed_file = parse_find_ls_line(line)
+        if removed_file is None:
+            continue
+        result.files.append(removed_file)
+        result.num_files += 1
+        if not removed_file.is_dir:
+            result.num_bytes += removed_file.size
+
+    result.returncode = proc.wait()
+    stderr_reader.join()
+    result.errors = [line.rstrip("\n") for line in stderr_lines[-STDERR_TAIL_LINES:]]
+
+    if log_fp is not None:
+        with log_lock:
+            log_fp.writelines(log_lines)
+            log_fp.flush()
+    return result
+
+
+def cleanup_local(
+    nodes: list[str],
+    cleanup_dir: str = "/local",
+    removed_files_log: Path | None = None,
+    find_args: str = "-mindepth 1",
+    report_file: Path | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    estimate: bool = False,
+    connect_timeout: int = DEFAULT_CONNECT_TIMEOUT,
+) -> None:
+    """
+    Remove files within `cleanup_dir` on many cluster nodes at once, like
+    the `cleanup_local` script's 'ssh' METHOD, running the 'find -ls
+    -delete' command over SSH on up to `max_workers` nodes concurrently.
+    With `estimate`, nothing is removed ('-delete' is left off) and the
+    result is a size estimate of what would be removed.
+    The raw 'find -ls' lines of all nodes are appended to
+    `removed_files_log` (if provided), and the per-node removed files and
+    byte totals are written as JSON to `report_file`.
+    SSH runs in batch mode, so keys must be usable without a passphrase
+    prompt (e.g. through ssh-agent).
+    """
+    remote_cmd = get_remote_find_command(cleanup_dir, find_args, delete=(not estimate))
+    verb = "Would remove" if estimate else "Removed"
+    print(f"Running on {len(nodes)} nodes: ssh <node> '{remote_cmd}'")
+
+    results = []
+    log_lock = threading.Lock()
+    with (
+        open(removed_files_log, "a")
+        if removed_files_log is not None
+        else nullcontext() as log_fp,
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+    ):
+        futures = [
+            executor.submit(
+                cleanup_node, node, remote_cmd, log_fp, log_lock, connect_timeout
+            )
+            for node in nodes
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = "" if result.ok else f" (FAILED with status {result.returncode})"
+            print(
+                f"[{len(results)}/{len(nodes)}] {result.node}: {verb.lower()}"
+                f" {result.num_files} files, {format_size(result.num_bytes)}{status}"
+            )
+            if not result.ok:
+                for error in result.errors:
+                    print(f"  {result.node}: {error}", file=sys.stderr)
+
+    results.sort(key=lambda result: result.node)
+    failed_nodes = [result.node for result in results if not result.ok]
+    total_files = sum(result.num_files for result in results)
+    total_bytes = sum(result.num_bytes for result in results)
+
+    if report_file is not None:
+        report = {
+            "cleanup_dir": cleanup_dir,
+            "remote_command": remote_cmd,
+            "estimate": estimate,
+            "total_files": total_files,
+            "total_bytes": total_bytes,
+            "failed_nodes": failed_nodes,
+            "nodes": [dict(asdict(result), ok=result.ok) for result in results],
+        }
+        with open(report_file, "w") as report_fp:
+            json.dump(report, report_fp, indent=2)
+        print(f"Per-node report written to: {report_file}")
+
+    print(
+        f"{verb} {total_files} files, {format_size(total_bytes)} across {len(results)} nodes"
+    )
+    if removed_files_log is not None:
+        print(f"File list written to: {removed_files_log}")
+    if failed_nodes:
+        print(
+            f"Cleanup failed on {len(failed_nodes)} nodes: {' '.join(failed_nodes)}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run(cleanup_local)
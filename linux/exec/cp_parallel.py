@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+
+import errno
+import logging
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from enum import Enum
+
+from typer import run
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_PROGRESS_INTERVAL = 5.0
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+# Errors that mean a zero-copy call isn't supported for this pair of files,
+# rather than that the copy itself failed
+ZERO_COPY_UNSUPPORTED_ERRNOS = frozenset(
+    {
+        errno.ENOSYS,
+        errno.EXDEV,
+        errno.EINVAL,
+        errno.EOPNOTSUPP,
+        errno.ENOTSUP,
+        errno.EBADF,
+    }
+)
+
+
+class CopyStatus(str, Enum):
+    COPIED = "copied"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+def is_identical_copy(src_st: os.stat_result, dst_path: str) -> bool:
+    try:
+        dst_st = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+    return dst_st.st_size == src_st.st_size and dst_st.st_mtime_ns == src_st.st_mtime_ns
+
+
+def copy_file_data(src_fd: int, dst_fd: int, size: int) -> None:
+    """
+    Copy file contents between descriptors in the kernel with
+    `os.copy_file_range`, falling back to `os.sendfile` and then to a plain
+    read/write loop where those aren't supported.
+    """
+    copied = 0
+    for zero_copy in ("copy_file_range", "sendfile"):
+        if not hasattr(os, zero_copy):
+            continue
+        try:
+            # sendfile writes at the current destination offset
+            os.lseek(dst_fd, copied, os.SEEK_SET)
+            while copied < size:
+                count = min(COPY_CHUNK_SIZE, size - copied)
+                if zero_copy == "copy_file_range":
+                    sent = os.copy_file_range(src_fd, dst_fd, count, copied, copied)
+                else:
+                    sent = os.sendfile(dst_fd, src_fd, copied, count)
+                if sent == 0:
+                    break
+                copied += sent
+            if copied >= size:
+                return
+        except OSError as e:
+            if e.errno not in ZERO_COPY_UNSUPPORTED_ERRNOS:
+                raise
+
+    # Pick up where the zero-copy calls left off (the source may also have
+    # grown since it was stat'ed)
+    os.lseek(src_fd, copied, os.SEEK_SET)
+    os.lseek(dst_fd, copied, os.SEEK_SET)
+    with (
+        open(src_fd, "rb", closefd=False) as src_fp,
+        open(dst_fd, "wb", closefd=False) as dst_fp,
+    ):
+        shutil.copyfileobj(src_fp, dst_fp, COPY_CHUNK_SIZE)
+
+
+def copy_file(
+    src_path: str, dst_path: str, skip_identical: bool = True
+) -> tuple[CopyStatus, int]:
+    """
+    Copy a single file, giving the copy the same mtime as the source so that
+    an identical copy (same size and mtime) can be skipped when an
+    interrupted job is run again.
+    Returns the copy status and the number of bytes copied.
+    """
+    try:
+        src_st = os.stat(src_path)
+        if skip_identical and is_identical_copy(src_st, dst_path):
+            return CopyStatus.SKIPPED, 0
+        src_fd = os.open(src_path, os.O_RDONLY)
+        try:
+            dst_fd = os.open(
+                dst_path,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                stat.S_IMODE(src_st.st_mode),
+            )
+            try:
+                copy_file_data(src_fd, dst_fd, src_st.st_size)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        # Set last, so a partial copy never looks identical to the source
+        os.utime(dst_path, ns=(src_st.st_atime_ns, src_st.st_mtime_ns))
+    except OSError as e:
+        logger.error(f"Failed to copy {src_path} -> {dst_path}: {e}")
+        return CopyStatus.FAILED, 0
+    return CopyStatus.COPIED, src_st.st_size
+
+
+class CopyProgress:
+    """
+    Thread-safe tally of copied, skipped and failed files, with the copy
+    throughput since the start.
+    """
+
+    def __init__(self, total_files: int) -> None:
+        self.total_files = total_files
+        self.status_counts = {status: 0 for status in CopyStatus}
+        self.bytes_copied = 0
+        self.start_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, status: CopyStatus, nbytes: int) -> None:
+        with self.lock:
+            self.status_counts[status] += 1
+            self.bytes_copied += nbytes
+
+    def format_report(self) -> str:
+        with self.lock:
+            done = sum(self.status_counts.values())
+            counts = ", ".join(
+                f"{count} {status.value}"
+                for status, count in self.status_counts.items()
+            )
+            nbytes = self.bytes_copied
+        elapsed = max(time.monotonic() - self.start_time, 1e-6)
+        return (
+            f"{done}/{self.total_files} files ({counts}),"
+            f" {nbytes / 2**30:.2f} GiB in {elapsed:.1f}s ({nbytes / 2**20 / elapsed:.1f} MiB/s)"
+        )
+
+
+def get_copy_jobs(
+    paths: list[str],
+    target_directory: str | None = None,
+    prefix: str = "",
+) -> tuple[list[tuple[str, str]], str]:
+    """
+    Resolve `cp` style SOURCE DEST / SOURCE... DIRECTORY / -t DIRECTORY
+    SOURCE... arguments into (source, destination) file path pairs and the
+    destination directory.
+    """
+    if target_directory is not None:
+        src_paths, dst_dir, dst_fname = paths, target_directory, None
+    else:
+        if len(paths) < 2:
+            raise ValueError("Both SOURCE and DEST arguments must be provided")
+        src_paths, destination = paths[:-1], paths[-1]
+        if (
+            len(src_paths) > 1
+            or destination.endswith("/")
+            or os.path.isdir(destination)
+        ):
+            dst_dir, dst_fname = destination, None
+        else:
+            dst_dir, dst_fname = (
+                os.path.dirname(destination) or ".",
+                os.path.basename(destination),
+            )
+
+    jobs = []
+    # Jobs run at the same time, so two sources must never share a destination
+    dst_sources: dict[str, str] = {}
+    for src_path in src_paths:
+        if not os.path.isfile(src_path):
+            raise ValueError(f"SOURCE path is not an existing file: {src_path}")
+        dst_path = os.path.join(
+            dst_dir, f"{prefix}{dst_fname or os.path.basename(src_path)}"
+        )
+        dst_key = os.path.normpath(dst_path)
+        if dst_key in dst_sources:
+            if os.path.samefile(dst_sources[dst_key], src_path):
+                logger.warning(f"SOURCE file specified more than once: {src_path}")
+                continue
+            raise ValueError(
+                f"Will not overwrite just-created {dst_path} with {src_path}"
+                f" (also copied from {dst_sources[dst_key]})"
+            )
+        dst_sources[dst_key] = src_path
+        jobs.append((src_path, dst_path))
+    return jobs, dst_dir
+
+
+def cp_parallel(
+    paths: list[str],
+    target_directory: str | None = None,
+    prefix: str = "",
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    skip_identical: bool = True,
+    progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+    dryrun: bool = False,
+) -> None:
+    """
+    Copy files like the `cp_p` and `cp_pp` scripts, first creating the
+    destination directory if it does not exist, but copying many files at
+    once on a thread pool with in-kernel (zero-copy) transfers.
+    Copies keep the source mtime, and destination files with the same size
+    and mtime as their source are skipped (unless `skip_identical` is
+    turned off), so an interrupted job can simply be run again.
+    Progress and throughput are reported to stderr every
+    `progress_interval` seconds.
+    """
+    jobs, dst_dir = get_copy_jobs(paths, target_directory, prefix)
+
+    if not os.path.isdir(dst_dir):
+        if os.path.exists(dst_dir):
+            raise ValueError(
+                f"Non-directory path already exists at DEST location: {dst_dir}"
+            )
+        if dryrun:
+            print(f'mkdir -p "{dst_dir}"')
+        else:
+            os.makedirs(dst_dir, exist_ok=True)
+    if dryrun:
+        for src_path, dst_path in jobs:
+            print(f'cp "{src_path}" "{dst_path}"')
+        return
+
+    progress = CopyProgress(len(jobs))
+    next_report_time = progress.start_time + progress_interval
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {
+            executor.submit(copy_file, src_path, dst_path, skip_identical)
+            for src_path, dst_path in jobs
+        }
+        while pending:
+            done, pending = wait(
+                pending, timeout=progress_interval, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                progress.add(*future.result())
+            if pending and time.monotonic() >= next_report_time:
+                print(
+                    f"Progress: {progress.format_report()}", end="\r", file=sys.stderr
+                )
+                next_report_time = time.monotonic() + progress_interval
+    print(f"Copy summary: {progress.format_report()}", file=sys.stderr)
+
+    if progress.status_counts[CopyStatus.FAILED]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run(cp_parallel)
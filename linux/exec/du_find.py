@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+
+import fnmatch
+import logging
+import math
+import os
+import re
+import stat
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from enum import Enum
+from pathlib import Path
+from typing import NamedTuple
+
+from du_snapshot import DiskUsageSnapshot, get_pattern_exts, get_snapshot_disk_usage
+from typer import run
+
+logger = logging.getLogger(__name__)
+
+
+UNIT_ABBREVS = ("K", "M", "G", "T")
+DEFAULT_MAX_WORKERS = 16
+GLOB_MAGIC_CHARS = frozenset("*?[")
+
+NameMatcher = Callable[[str], bool]
+
+
+class RoundMode(str, Enum):
+    ON = "on"
+    OFF = "off"
+    UP = "up"
+    DOWN = "down"
+
+
+class DirScan(NamedTuple):
+    usage: int
+    hardlinks: list[tuple[tuple[int, int], int]]
+    subdirs: list[tuple[str, tuple[int, int], int]]
+    matched_paths: list[str]
+
+
+def compile_name_matcher(patterns: list[str]) -> NameMatcher | None:
+    """
+    Compile `find -name` style filename patterns into a single matcher,
+    checking plain "*.ext" patterns with one `str.endswith` call and the rest
+    with one combined regex.
+    """
+    if not patterns:
+        return None
+    suffixes = []
+    others = []
+    for pattern in patterns:
+        if pattern.startswith("*") and not GLOB_MAGIC_CHARS & set(pattern[1:]):
+            suffixes.append(pattern[1:])
+        else:
+            others.append(pattern)
+    suffix_tuple = tuple(suffixes)
+    regex = (
+        re.compile("|".join(fnmatch.translate(pattern) for pattern in others))
+        if others
+        else None
+    )
+
+    def matches(name: str) -> bool:
+        return name.endswith(suffix_tuple) or (
+            regex is not None and regex.match(name) is not None
+        )
+
+    return matches
+
+
+def get_stat_usage(st: os.stat_result, apparent_size: bool = False) -> int:
+    return st.st_size if apparent_size else st.st_blocks * 512
+
+
+def scan_directory(
+    dir_path: str,
+    name_matcher: NameMatcher | None,
+    follow_links: bool = False,
+    apparent_size: bool = False,
+    identify: bool = False,
+) -> DirScan:
+    """
+    Sum the disk usage of the entries of a single directory, using the stat
+    result each `DirEntry` caches so every entry is stat'ed exactly once.
+    Without a name matcher, every entry is counted like `du -s` does
+    (including subdirectories themselves); with one, only matching regular
+    files are counted like `find -type f -name ... | du -a`.
+    Files with more than one hardlink and subdirectories (with their own
+    usage) are handed back separately for the caller to de-duplicate by
+    (st_dev, st_ino).
+    """
+    usage = 0
+    hardlinks = []
+    subdirs = []
+    matched_paths = []
+    try:
+        dirents = os.scandir(dir_path)
+    except OSError as e:
+        logger.warning(f"Cannot read directory: {e}")
+        return DirScan(0, [], [], [])
+
+    with dirents:
+        for entry in dirents:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=follow_links)
+                if is_dir or name_matcher is None or name_matcher(entry.name):
+                    st = entry.stat(follow_symlinks=follow_links)
+                else:
+                    continue
+            except OSError as e:
+                logger.warning(f"Cannot access: {e}")
+                continue
+
+            if is_dir:
+                subdir_usage = (
+                    get_stat_usage(st, apparent_size) if name_matcher is None else 0
+                )
+                subdirs.append((entry.path, (st.st_dev, st.st_ino), subdir_usage))
+                continue
+            if name_matcher is not None:
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                if identify:
+                    matched_paths.append(entry.path)
+
+            entry_usage = get_stat_usage(st, apparent_size)
+            if st.st_nlink > 1:
+                hardlinks.append(((st.st_dev, st.st_ino), entry_usage))
+            else:
+                usage += entry_usage
+
+    return DirScan(usage, hardlinks, subdirs, matched_paths)
+
+
+def get_disk_usage(
+    path: str,
+    executor: ThreadPoolExecutor,
+    name_matcher: NameMatcher | None = None,
+    follow_links: bool = False,
+    apparent_size: bool = False,
+    identify: bool = False,
+    seen_inodes: set[tuple[int, int]] | None = None,
+    visited_dirs: set[tuple[int, int]] | None = None,
+) -> int:
+    """
+    Return the disk usage in bytes of a file or directory tree, walking
+    directories with parallel `os.scandir` tasks.
+    Hardlinked files and directories are counted once per (st_dev, st_ino),
+    across calls that share `seen_inodes` and `visited_dirs`.
+    """
+    if seen_inodes is None:
+        seen_inodes = set()
+    if visited_dirs is None:
+        visited_dirs = set()
+    st = os.stat(path) if follow_links else os.lstat(path)
+    is_dir = stat.S_ISDIR(st.st_mode)
+
+    if not is_dir:
+        if name_matcher is not None and not stat.S_ISREG(st.st_mode):
+            return 0
+        if identify:
+            print(path)
+        key = (st.st_dev, st.st_ino)
+        if st.st_nlink > 1:
+            if key in seen_inodes:
+                return 0
+            seen_inodes.add(key)
+        return get_stat_usage(st, apparent_size)
+
+    if (st.st_dev, st.st_ino) in visited_dirs:
+        logger.info(f"Directory already counted, skipping: {path}")
+        return 0
+    visited_dirs.add((st.st_dev, st.st_ino))
+    if identify and name_matcher is None:
+        print(path)
+    total = 0 if name_matcher is not None else get_stat_usage(st, apparent_size)
+
+    def submit(dir_path: str) -> Future[DirScan]:
+        return executor.submit(
+            scan_directory,
+            dir_path,
+            name_matcher,
+            follow_links,
+            apparent_size,
+            identify,
+        )
+
+    pending = {submit(path)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            scan = future.result()
+            total += scan.usage
+            for key, usage in scan.hardlinks:
+                if key not in seen_inodes:
+                    seen_inodes.add(key)
+                    total += usage
+            for subdir_path, subdir_key, subdir_usage in scan.subdirs:
+                if subdir_key in visited_dirs:
+                    logger.info(f"Directory already counted, skipping: {subdir_path}")
+                    continue
+                visited_dirs.add(subdir_key)
+                total += subdir_usage
+                pending.add(submit(subdir_path))
+            for matched_path in scan.matched_paths:
+                print(matched_path)
+
+    return total
+
+
+def get_outermost_paths(paths: list[str]) -> list[str]:
+    """
+    Drop paths that repeat or are inside another one of the paths, going by
+    their absolute paths.
+    """
+    abs_paths = [os.path.abspath(path) for path in paths]
+    outermost_paths = []
+    for i, (path, abs_path) in enumerate(zip(paths, abs_paths)):
+        if abs_path in abs_paths[:i]:
+            continue
+        if any(
+            abs_path.startswith(other.rstrip("/") + "/")
+            for other in abs_paths
+            if other != abs_path
+        ):
+            continue
+        outermost_paths.append(path)
+    return outermost_paths
+
+
+def round_number(number: float, mode: RoundMode, decimals: int) -> str:
+    if float(number).is_integer():
+        mode = RoundMode.OFF
+    scale = 10**decimals
+    if mode is RoundMode.OFF:
+        number = math.trunc(number * scale) / scale
+    elif mode is RoundMode.UP:
+        number = math.ceil(number * scale) / scale
+    elif mode is RoundMode.DOWN:
+        number = math.floor(number * scale) / scale
+    text = f"{number:.{decimals}f}"
+    return text[1:] if text.startswith("-") and float(text) == 0 else text
+
+
+def format_disk_usage(
+    usage_bytes: int,
+    unit: str | None = None,
+    si: bool = False,
+    decimals: int = 2,
+    round_mode: RoundMode = RoundMode.UP,
+) -> str:
+    """
+    Format a disk usage in the given unit (K, M, G or T), or otherwise the
+    smallest unit that gives a value less than 1000, in the same way as the
+    `du_find` script.
+    """
+    factor = 1000 if si else 1024
+    usage_k = usage_bytes / factor
+    if unit is not None:
+        unit = unit[0].upper()
+        if unit not in UNIT_ABBREVS:
+            raise ValueError(f"Unit must be one of {UNIT_ABBREVS}, but got: {unit}")
+        value = round_number(
+            usage_k / factor ** UNIT_ABBREVS.index(unit), round_mode, decimals
+        )
+        if unit == "K" and not si and "." in value:
+            value = value.rstrip("0").rstrip(".")
+        return value
+
+    for order, unit in enumerate(UNIT_ABBREVS):
+        value = round_number(usage_k / factor**order, round_mode, decimals)
+        if len(value.split(".")[0]) < 4:
+            break
+    return f"{value}{unit}"
+
+
+def du_find(
+    paths: list[str],
+    name: list[str] | None = None,
+    unit: str | None = None,
+    decimals: int = 2,
+    round_mode: RoundMode = RoundMode.UP,
+    sum_all: bool = False,
+    si: bool = False,
+    identify: bool = False,
+    follow_links: bool = False,
+    apparent_size: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    snapshot: Path | None = None,
+    snapshot_only: bool = False,
+) -> None:
+    """
+    Summarize disk usage of each file/directory path, recursively for
+    directories, like `du -sh` but with `find -name` style filtering of
+    filenames (`name` may be given multiple times).
+    Each path total is printed as soon as its walk completes. With
+    `sum_all`, only the summed disk usage of all paths is reported, and
+    directories (and hardlinked files) shared by overlapping paths are
+    counted once.
+    With a `snapshot` index file (SQLite, created if needed), directory
+    paths are walked incrementally, only re-reading directories whose
+    mtime changed since the last run, and `name` may only contain "*.ext"
+    patterns. With `snapshot_only`, totals are answered from the snapshot
+    alone without touching the file system.
+    """
+    name_matcher = compile_name_matcher(name or [])
+    exts = None
+    if snapshot is not None:
+        if identify or follow_links:
+            raise ValueError(
+                "'identify' and 'follow_links' options can't be used with a snapshot"
+            )
+        exts = get_pattern_exts(name) if name else None
+        if name and exts is None:
+            raise ValueError(
+                f"Only '*.ext' name patterns can be used with a snapshot, but got: {name}"
+            )
+    elif snapshot_only:
+        raise ValueError("'snapshot_only' option requires a snapshot")
+    paths = paths or ["."]
+    if snapshot_only and sum_all:
+        # Stored sums can't be de-duplicated, so only query the outermost paths
+        paths = get_outermost_paths(paths)
+    seen_inodes: set[tuple[int, int]] = set()
+    visited_dirs: set[tuple[int, int]] = set()
+    sum_bytes = 0
+
+    with (
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+        DiskUsageSnapshot(snapshot)
+        if snapshot is not None
+        else nullcontext() as usage_snapshot,
+    ):
+        for path in paths:
+            if not sum_all:
+                seen_inodes = set()
+                visited_dirs = set()
+            if usage_snapshot is None:
+                usage = get_disk_usage(
+                    path,
+                    executor,
+                    name_matcher=name_matcher,
+                    follow_links=follow_links,
+                    apparent_size=apparent_size,
+                    identify=identify,
+                    seen_inodes=seen_inodes,
+                    visited_dirs=visited_dirs,
+                )
+            elif snapshot_only:
+                usage = usage_snapshot.query_disk_usage(path, exts, apparent_size)
+            else:
+                usage = get_snapshot_disk_usage(
+                    path,
+                    executor,
+                    usage_snapshot,
+                    exts,
+                    apparent_size,
+                    seen_inodes,
+                    visited_dirs,
+                )
+            sum_bytes += usage
+            if not (sum_all or identify):
+                print(
+                    f"{format_disk_usage(usage, unit, si, decimals, round_mode):>10}   {path}",
+                    flush=True,
+                )
+
+    if sum_all and not identify:
+        print(format_disk_usage(sum_bytes, unit, si, decimals, round_mode))
+
+
+if __name__ == "__main__":
+    run(du_find)
@@ -0,0 +1,408 @@
+import logging
+import os
+import sqlite3
+import stat
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import NamedTuple, Self
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    disk_usage INTEGER NOT NULL,
+    apparent_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS entry_sums (
+    dir TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    regular INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    disk_usage INTEGER NOT NULL,
+    apparent_size INTEGER NOT NULL,
+    PRIMARY KEY (dir, ext, regular)
+);
+CREATE TABLE IF NOT EXISTS hardlinks (
+    dir TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    regular INTEGER NOT NULL,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    disk_usage INTEGER NOT NULL,
+    apparent_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hardlinks_dir ON hardlinks (dir);
+"""
+GLOB_MAGIC_CHARS = frozenset("*?[")
+# Stored in place of the mtime of directories whose summary isn't complete
+# yet, so that they never look current and are re-read by the next walk
+INCOMPLETE_MTIME_NS = -1
+
+EntrySums = dict[tuple[str, bool], list[int]]
+Hardlink = tuple[str, bool, int, int, int, int]
+
+
+class DirStat(NamedTuple):
+    path: str
+    mtime_ns: int
+    dev: int
+    ino: int
+    disk_usage: int
+    apparent_size: int
+
+
+class DirSummary(NamedTuple):
+    sums: EntrySums
+    hardlinks: list[Hardlink]
+    subdirs: list[DirStat]
+    # False if the directory or any of its entries couldn't be read
+    complete: bool = True
+
+
+def get_name_ext(name: str) -> str:
+    # Everything from the last dot, so that "*.ext" patterns match exactly
+    # the names with that extension (including hidden files like ".ext").
+    i = name.rfind(".")
+    return name[i:] if i >= 0 else ""
+
+
+def get_pattern_exts(patterns: list[str]) -> frozenset[str] | None:
+    """
+    Return the extensions of filename patterns if all of them are plain
+    "*.ext" patterns that can be answered from per-extension sums, else None.
+    """
+    exts = set()
+    for pattern in patterns:
+        ext = pattern[1:]
+        if (
+            not pattern.startswith("*")
+            or not ext.startswith(".")
+            or (GLOB_MAGIC_CHARS | {"."}) & set(ext[1:])
+        ):
+            return None
+        exts.add(ext)
+    return frozenset(exts)
+
+
+def get_dir_stat(path: str, st: os.stat_result) -> DirStat:
+    return DirStat(
+        path, st.st_mtime_ns, st.st_dev, st.st_ino, st.st_blocks * 512, st.st_size
+    )
+
+
+def summarize_directory(dir_path: str) -> DirSummary:
+    """
+    Aggregate the disk usage of the non-directory entries of a directory by
+    filename extension, keeping hardlinked files separate so they can be
+    de-duplicated later, and stat its subdirectories.
+    """
+    sums: EntrySums = {}
+    hardlinks: list[Hardlink] = []
+    subdirs: list[DirStat] = []
+    complete = True
+    try:
+        dirents = os.scandir(dir_path)
+    except OSError as e:
+        logger.warning(f"Cannot read directory: {e}")
+        return DirSummary(sums, hardlinks, subdirs, complete=False)
+
+    with dirents:
+        for entry in dirents:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError as e:
+                logger.warning(f"Cannot access: {e}")
+                complete = False
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                subdirs.append(get_dir_stat(entry.path, st))
+                continue
+            ext = get_name_ext(entry.name)
+            regular = stat.S_ISREG(st.st_mode)
+            if st.st_nlink > 1:
+                hardlinks.append(
+                    (ext, regular, st.st_dev, st.st_ino, st.st_blocks * 512, st.st_size)
+                )
+                continue
+            entry_sums = sums.setdefault((ext, regular), [0, 0, 0])
+            entry_sums[0] += 1
+            entry_sums[1] += st.st_blocks * 512
+            entry_sums[2] += st.st_size
+
+    return DirSummary(sums, hardlinks, subdirs, complete)
+
+
+def stat_directories(paths: Iterable[str]) -> list[DirStat]:
+    dir_stats = []
+    for path in paths:
+        try:
+            dir_stats.append(get_dir_stat(path, os.lstat(path)))
+        except OSError as e:
+            logger.warning(f"Cannot access: {e}")
+    return dir_stats
+
+
+def get_tree_bounds(path: str) -> tuple[str, str, str]:
+    # Every path strictly under `path` sorts between "path/" and "path0"
+    return path, f"{path}/", f"{path}0"
+
+
+class DiskUsageSnapshot:
+    """
+    SQLite index of per-directory disk usage, recording the mtime of each
+    directory along with the summed usage of its entries by filename
+    extension, so that later walks only need to re-read directories whose
+    entries changed.
+    A directory mtime only changes when entries are added, removed or
+    renamed, so files that grow in place are not picked up until their
+    directory changes or the snapshot is rebuilt.
+    A directory is stored along with placeholder rows for its new
+    subdirectories, which stay out of date until they are read themselves,
+    so a failed or interrupted walk never leaves part of a tree looking
+    current.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SNAPSHOT_SCHEMA)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        # Don't keep the changes of a walk that failed or was interrupted
+        if exc_type is not None:
+            self.conn.rollback()
+        self.close()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def is_current(self, dir_stat: DirStat) -> bool:
+        row = self.conn.execute(
+            "SELECT mtime_ns, dev, ino FROM dirs WHERE path = ?", (dir_stat.path,)
+        ).fetchone()
+        return row == (dir_stat.mtime_ns, dir_stat.dev, dir_stat.ino)
+
+    def load_dir_summary(
+        self, path: str
+    ) -> tuple[EntrySums, list[Hardlink], list[str]]:
+        sums = {
+            (ext, bool(regular)): [count, disk_usage, apparent_size]
+            for ext, regular, count, disk_usage, apparent_size in self.conn.execute(
+                "SELECT ext, regular, count, disk_usage, apparent_size FROM entry_sums WHERE dir = ?",
+                (path,),
+            )
+        }
+        hardlinks = [
+            (ext, bool(regular), dev, ino, disk_usage, apparent_size)
+            for ext, regular, dev, ino, disk_usage, apparent_size in self.conn.execute(
+                "SELECT ext, regular, dev, ino, disk_usage, apparent_size FROM hardlinks WHERE dir = ?",
+                (path,),
+            )
+        ]
+        subdir_paths = [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT path FROM dirs WHERE parent = ?", (path,)
+            )
+        ]
+        return sums, hardlinks, subdir_paths
+
+    def remove_tree(self, path: str) -> None:
+        bounds = get_tree_bounds(path)
+        self.conn.execute(
+            "DELETE FROM dirs WHERE path = ? OR (path > ? AND path < ?)", bounds
+        )
+        self.conn.execute(
+            "DELETE FROM entry_sums WHERE dir = ? OR (dir > ? AND dir < ?)", bounds
+        )
+        self.conn.execute(
+            "DELETE FROM hardlinks WHERE dir = ? OR (dir > ? AND dir < ?)", bounds
+        )
+
+    def store_dir_summary(self, dir_stat: DirStat, summary: DirSummary) -> None:
+        path = dir_stat.path
+        subdir_paths = {subdir.path for subdir in summary.subdirs}
+        for (old_subdir_path,) in self.conn.execute(
+            "SELECT path FROM dirs WHERE parent = ?", (path,)
+        ).fetchall():
+            if old_subdir_path not in subdir_paths:
+                self.remove_tree(old_subdir_path)
+
+        mtime_ns = dir_stat.mtime_ns if summary.complete else INCOMPLETE_MTIME_NS
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, os.path.dirname(path), mtime_ns, *dir_stat[2:]),
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (subdir.path, path, INCOMPLETE_MTIME_NS, *subdir[2:])
+                for subdir in summary.subdirs
+            ],
+        )
+        self.conn.execute("DELETE FROM entry_sums WHERE dir = ?", (path,))
+        self.conn.execute("DELETE FROM hardlinks WHERE dir = ?", (path,))
+        self.conn.executemany(
+            "INSERT INTO entry_sums VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (path, ext, regular, *values)
+                for (ext, regular), values in summary.sums.items()
+            ],
+        )
+        self.conn.executemany(
+            "INSERT INTO hardlinks VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(path, *hardlink) for hardlink in summary.hardlinks],
+        )
+
+    def query_disk_usage(
+        self, path: str, exts: frozenset[str] | None = None, apparent_size: bool = False
+    ) -> int:
+        """
+        Return the disk usage of a directory tree from the stored sums alone,
+        without touching the file system.
+        """
+        path = os.path.abspath(path)
+        if (
+            self.conn.execute("SELECT 1 FROM dirs WHERE path = ?", (path,)).fetchone()
+            is None
+        ):
+            raise ValueError(f"Directory is not in snapshot: {path}")
+        bounds = get_tree_bounds(path)
+        if self.conn.execute(
+            "SELECT 1 FROM dirs WHERE (path = ? OR (path > ? AND path < ?)) AND mtime_ns = ?",
+            (*bounds, INCOMPLETE_MTIME_NS),
+        ).fetchone():
+            raise ValueError(
+                f"Snapshot of directory is incomplete, refresh it with a walk first: {path}"
+            )
+
+        column = "apparent_size" if apparent_size else "disk_usage"
+        ext_params: tuple[str, ...] = ()
+        if exts is None:
+            ext_filter = ""
+        else:
+            ext_filter = f"AND regular = 1 AND ext IN ({', '.join('?' * len(exts))})"
+            ext_params = tuple(exts)
+
+        total = self.conn.execute(
+            f"SELECT COALESCE(SUM({column}), 0) FROM entry_sums WHERE (dir = ? OR (dir > ? AND dir < ?)) {ext_filter}",
+            (*bounds, *ext_params),
+        ).fetchone()[0]
+        total += self.conn.execute(
+            f"SELECT COALESCE(SUM(usage), 0) FROM (SELECT MAX({column}) AS usage FROM hardlinks"
+            f" WHERE (dir = ? OR (dir > ? AND dir < ?)) {ext_filter} GROUP BY dev, ino)",
+            (*bounds, *ext_params),
+        ).fetchone()[0]
+        if exts is None:
+            total += self.conn.execute(
+                f"SELECT SUM({column}) FROM dirs WHERE path = ? OR (path > ? AND path < ?)",
+                bounds,
+            ).fetchone()[0]
+        return total
+
+
+def get_summary_usage(
+    sums: EntrySums,
+    hardlinks: list[Hardlink],
+    exts: frozenset[str] | None,
+    apparent_size: bool,
+    seen_inodes: set[tuple[int, int]],
+) -> int:
+    value_index = 2 if apparent_size else 1
+    usage = 0
+    for (ext, regular), values in sums.items():
+        if exts is None or (regular and ext in exts):
+            usage += values[value_index]
+    for ext, regular, dev, ino, disk_usage, apparent_size_value in hardlinks:
+        if (exts is None or (regular and ext in exts)) and (
+            dev,
+            ino,
+        ) not in seen_inodes:
+            seen_inodes.add((dev, ino))
+            usage += apparent_size_value if apparent_size else disk_usage
+    return usage
+
+
+def get_snapshot_disk_usage(
+    path: str,
+    executor: ThreadPoolExecutor,
+    snapshot: DiskUsageSnapshot,
+    exts: frozenset[str] | None = None,
+    apparent_size: bool = False,
+    seen_inodes: set[tuple[int, int]] | None = None,
+    visited_dirs: set[tuple[int, int]] | None = None,
+) -> int:
+    """
+    Return the disk usage in bytes of a directory tree, refreshing the
+    snapshot along the way.
+    Directories whose mtime matches the snapshot are answered from their
+    stored sums, and only their subdirectories are stat'ed; all other
+    directories are re-read with parallel `os.scandir` tasks.
+    With `exts`, only regular files with those filename extensions are
+    counted.
+    Directories are counted once per (st_dev, st_ino), across calls that
+    share `visited_dirs`.
+    """
+    if seen_inodes is None:
+        seen_inodes = set()
+    if visited_dirs is None:
+        visited_dirs = set()
+    path = os.path.abspath(path)
+    root_stat = os.lstat(path)
+    if not stat.S_ISDIR(root_stat.st_mode):
+        raise ValueError(f"Snapshot paths must be directories: {path}")
+
+    total = 0
+    pending: dict[Future, DirStat | None] = {}
+
+    def visit(dir_stat: DirStat) -> None:
+        nonlocal total
+        if (dir_stat.dev, dir_stat.ino) in visited_dirs:
+            logger.info(f"Directory already counted, skipping: {dir_stat.path}")
+            return
+        visited_dirs.add((dir_stat.dev, dir_stat.ino))
+        if exts is None:
+            total += dir_stat.apparent_size if apparent_size else dir_stat.disk_usage
+        if snapshot.is_current(dir_stat):
+            sums, hardlinks, subdir_paths = snapshot.load_dir_summary(dir_stat.path)
+            total += get_summary_usage(
+                sums, hardlinks, exts, apparent_size, seen_inodes
+            )
+            if subdir_paths:
+                pending[executor.submit(stat_directories, subdir_paths)] = None
+        else:
+            pending[executor.submit(summarize_directory, dir_stat.path)] = dir_stat
+
+    visit(get_dir_stat(path, root_stat))
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            dir_stat = pending.pop(future)
+            if dir_stat is None:
+                subdirs = future.result()
+            else:
+                summary = future.result()
+                snapshot.store_dir_summary(dir_stat, summary)
+                total += get_summary_usage(
+                    summary.sums, summary.hardlinks, exts, apparent_size, seen_inodes
+                )
+                subdirs = summary.subdirs
+            for subdir_stat in subdirs:
+                visit(subdir_stat)
+
+    snapshot.commit()
+    return total
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+
+import fnmatch
+import logging
+import os
+import re
+import stat
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from enum import Enum
+from typing import NamedTuple
+
+from typer import run
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_WORKERS = 16
+SYMBOLIC_CLAUSE_REGEX = re.compile(r"^([ugoa]*)([-+=])([rwxXst]*)$")
+WHO_BITS = {
+    "u": stat.S_IRWXU | stat.S_ISUID,
+    "g": stat.S_IRWXG | stat.S_ISGID,
+    "o": stat.S_IRWXO | stat.S_ISVTX,
+}
+PERM_BITS = {
+    "r": stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH,
+    "w": stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH,
+    "x": stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH,
+    "s": stat.S_ISUID | stat.S_ISGID,
+    "t": stat.S_ISVTX,
+}
+EXEC_BITS = PERM_BITS["x"]
+
+ModeFunction = Callable[[int, bool], int]
+
+
+class EntryType(str, Enum):
+    FILE = "f"
+    DIR = "d"
+
+
+class DirChmodResult(NamedTuple):
+    num_entries: int
+    changed_paths: list[str]
+    subdirs: list[str]
+
+
+def compile_symbolic_mode(spec: str) -> ModeFunction:
+    """
+    Compile a `chmod` symbolic mode like "u=rwX,g=rwX,o=rX,g+s" into a
+    function that takes the current permission bits of an entry (and whether
+    it's a directory) and returns its new permission bits.
+    As with GNU chmod, "=" keeps the setuid/setgid bits of directories unless
+    they are given explicitly.
+    """
+    clauses = []
+    for clause in spec.split(","):
+        match = SYMBOLIC_CLAUSE_REGEX.match(clause)
+        if match is None:
+            raise ValueError(f"Invalid symbolic mode clause '{clause}' in mode: {spec}")
+        who, op, perms = match.groups()
+        clauses.append((who, op, perms))
+
+    umask = os.umask(0)
+    os.umask(umask)
+
+    def apply_mode(mode: int, is_dir: bool) -> int:
+        for who, op, perms in clauses:
+            if who and "a" not in who:
+                affected = 0
+                for who_char in who:
+                    affected |= WHO_BITS[who_char]
+                mask = affected
+            else:
+                affected = WHO_BITS["u"] | WHO_BITS["g"] | WHO_BITS["o"]
+                # Like chmod, the umask applies when no user class is given
+                mask = affected if who else affected & ~umask
+
+            bits = 0
+            for perm in perms:
+                if perm == "X":
+                    if is_dir or mode & EXEC_BITS:
+                        bits |= EXEC_BITS
+                else:
+                    bits |= PERM_BITS[perm]
+            bits &= mask
+
+            if op == "+":
+                mode |= bits
+            elif op == "-":
+                mode &= ~bits
+            else:
+                preserved = ~affected
+                if is_dir and "s" not in perms:
+                    preserved |= stat.S_ISUID | stat.S_ISGID
+                mode = (mode & preserved) | bits
+        return stat.S_IMODE(mode)
+
+    return apply_mode
+
+
+def compile_name_matcher(patterns: list[str]) -> Callable[[str], bool] | None:
+    if not patterns:
+        return None
+    regex = re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+    return lambda name: regex.match(name) is not None
+
+
+class PermissionFixer:
+    """
+    Applies a file mode function and a directory mode function to entries
+    of a tree, calling `os.chmod` only on entries whose mode would change.
+    """
+
+    def __init__(
+        self,
+        file_mode: ModeFunction,
+        dir_mode: ModeFunction,
+        name_matcher: Callable[[str], bool] | None = None,
+        entry_type: EntryType | None = None,
+        identify: bool = False,
+    ) -> None:
+        self.file_mode = file_mode
+        self.dir_mode = dir_mode
+        self.name_matcher = name_matcher
+        self.entry_type = entry_type
+        self.identify = identify
+
+    def fix_entry(self, path: str, name: str, st: os.stat_result) -> bool:
+        """
+        Fix the mode of a single entry if it is selected, returning whether
+        the mode changed (or would change, when identifying).
+        """
+        if stat.S_ISLNK(st.st_mode):
+            # Like 'chmod -R', symlinks found in the tree are ignored
+            return False
+        is_dir = stat.S_ISDIR(st.st_mode)
+        if self.entry_type is EntryType.FILE and is_dir:
+            return False
+        if self.entry_type is EntryType.DIR and not is_dir:
+            return False
+        if self.name_matcher is not None and not self.name_matcher(name):
+            return False
+
+        mode = stat.S_IMODE(st.st_mode)
+        new_mode = (self.dir_mode if is_dir else self.file_mode)(mode, is_dir)
+        if new_mode == mode:
+            return False
+        if not self.identify:
+            os.chmod(path, new_mode)
+        return True
+
+    def fix_dir_entries(self, dir_path: str) -> DirChmodResult:
+        num_entries = 0
+        changed_paths = []
+        subdirs = []
+        try:
+            dirents = os.scandir(dir_path)
+        except OSError as e:
+            logger.warning(f"Cannot read directory: {e}")
+            return DirChmodResult(0, [], [])
+
+        with dirents:
+            for entry in dirents:
+                num_entries += 1
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                    if self.fix_entry(entry.path, entry.name, st):
+                        changed_paths.append(entry.path)
+                except OSError as e:
+                    logger.warning(f"Cannot change permissions: {e}")
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    subdirs.append(entry.path)
+
+        return DirChmodResult(num_entries, changed_paths, subdirs)
+
+    def fix_tree(self, path: str, executor: ThreadPoolExecutor) -> tuple[int, int]:
+        """
+        Fix permissions of a path and everything below it in a single walk
+        with parallel `os.scandir` tasks, returning the number of entries
+        seen and the number of entries changed.
+        Changed paths are printed when identifying.
+        """
+        st = os.lstat(path)
+        num_entries = 1
+        num_changed = 0
+        if self.fix_entry(path, os.path.basename(os.path.normpath(path)), st):
+            num_changed += 1
+            if self.identify:
+                print(path)
+        if not stat.S_ISDIR(st.st_mode):
+            return num_entries, num_changed
+
+        pending = {executor.submit(self.fix_dir_entries, path)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                num_entries += result.num_entries
+                num_changed += len(result.changed_paths)
+                if self.identify:
+                    for changed_path in result.changed_paths:
+                        print(changed_path)
+                for subdir in result.subdirs:
+                    pending.add(executor.submit(self.fix_dir_entries, subdir))
+        return num_entries, num_changed
+
+
+def fix_perms(
+    file_mode: str,
+    paths: list[str],
+    dir_mode: str | None = None,
+    name: list[str] | None = None,
+    entry_type: EntryType | None = None,
+    identify: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> None:
+    """
+    Recursively apply `chmod` symbolic modes to files (`file_mode`) and
+    directories (`dir_mode`, default same as `file_mode`) in a single
+    parallel walk of each path, as computed by the `fix_perms` script.
+    Only entries whose mode actually changes are chmod'ed. Entries can be
+    limited to `find -name` style filename patterns and to one
+    `entry_type`. With `identify`, the entries that would change are
+    printed instead of being changed.
+    """
+    fixer = PermissionFixer(
+        compile_symbolic_mode(file_mode),
+        compile_symbolic_mode(dir_mode or file_mode),
+        name_matcher=compile_name_matcher(name or []),
+        entry_type=entry_type,
+        identify=identify,
+    )
+    verb = "Would change" if identify else "Changed"
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for path in paths:
+            if not identify:
+                print(f"Fixing perms in {path}")
+            num_entries, num_changed = fixer.fix_tree(path, executor)
+            if not identify:
+                print(
+                    f"{verb} perms of {num_changed} of {num_entries} entries in {path}"
+                )
+
+
+if __name__ == "__main__":
+    run(fix_perms)
@@ -11,6 +11,8 @@ from pyproj import CRS
 from shapely.geometry import Polygon
 from numpy.typing import NDArray
 
+from geo_output import SpatialSortMethod, write_geodataframe
+
 
 def make_source_geom(
     vrt_geotrans: NDArray, src_DstRect: pd.core.series.Series
@@ -48,6 +50,33 @@ def main() -> None:
         type=str,
         help="Output file for extracted source raster features",
     )
+    arg_parser.add_argument(
+        "--spatial-sort",
+        type=SpatialSortMethod,
+        choices=list(SpatialSortMethod),
+        default=None,
+        help="Sort output features along a space-filling curve of their bbox centers",
+    )
+    arg_parser.add_argument(
+        "--bbox-covering",
+        action="store_true",
+        help="Write GeoParquet 1.1 bbox covering columns (Parquet output only)",
+    )
+    arg_parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=None,
+        help="Maximum number of features per Parquet row group",
+    )
+    arg_parser.add_argument(
+        "--partition-by",
+        type=str,
+        default=None,
+        help=(
+            "Write a hive-partitioned Parquet dataset directory partitioned by"
+            " this column ('utm_zone' is derived from the geometry if missing)"
+        ),
+    )
     args = arg_parser.parse_args()
 
     print(f"Reading input VRT file: {args.input_vrt}")
@@ -107,11 +136,14 @@ def main() -> None:
     gdf.set_crs(crs=CRS.from_wkt(proj_wkt), inplace=True)
 
     print(f"Writing {num_sources} output features to file: {args.output_file}")
-    if args.output_file.endswith(".parquet"):
-        output_driver = "Parquet"
-    else:
-        output_driver = None
-    gdf.to_file(args.output_file, driver=output_driver)
+    write_geodataframe(
+        gdf,
+        args.output_file,
+        spatial_sort=args.spatial_sort,
+        write_bbox_covering=args.bbox_covering,
+        row_group_size=args.row_group_size,
+        partition_by=args.partition_by,
+    )
 
     print("Done")
 
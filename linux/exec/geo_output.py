@@ -0,0 +1,194 @@
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+
+PARQUET_SUFFIXES = (".parquet", ".geoparquet")
+GEOJSON_SUFFIXES = (".json", ".geojson")
+
+# Name of the GeoParquet 1.1 bbox covering column written by GeoPandas
+BBOX_COVERING_COLUMN = "bbox"
+DEFAULT_ROW_GROUP_SIZE = 65536
+DEFAULT_SORT_LEVEL = 16
+
+UTM_ZONE_COLUMN = "utm_zone"
+HIVE_DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+class SpatialSortMethod(str, Enum):
+    HILBERT = "hilbert"
+    QUADKEY = "quadkey"
+
+
+def is_parquet_path(path: Path | str) -> bool:
+    return str(path).lower().endswith(PARQUET_SUFFIXES)
+
+
+def get_bbox_centers(
+    geoseries: gpd.GeoSeries,
+) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    bounds = geoseries.bounds.to_numpy()
+    return (bounds[:, 0] + bounds[:, 2]) / 2, (bounds[:, 1] + bounds[:, 3]) / 2
+
+
+def spread_bits_16(arr: NDArray[np.uint64]) -> NDArray[np.uint64]:
+    # Insert a zero bit between each of the low 16 bits of every value
+    arr = arr & np.uint64(0x0000FFFF)
+    arr = (arr | (arr << np.uint64(8))) & np.uint64(0x00FF00FF)
+    arr = (arr | (arr << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    arr = (arr | (arr << np.uint64(2))) & np.uint64(0x33333333)
+    arr = (arr | (arr << np.uint64(1))) & np.uint64(0x55555555)
+    return arr
+
+
+def get_quadkey_distance(
+    geoseries: gpd.GeoSeries,
+    total_bounds: NDArray[np.float64] | None = None,
+    level: int = DEFAULT_SORT_LEVEL,
+) -> NDArray[np.uint64]:
+    """
+    Calculate the integer quadkey (Z-order / Morton code) of each geometry's
+    bounding box center within the total bounds of the series.
+    Sorting by this value orders features the same way as their quadkey strings.
+    """
+    if not 1 <= level <= 16:
+        raise ValueError("Quadkey level must be in the range [1, 16]")
+    minx, miny, maxx, maxy = (
+        geoseries.total_bounds if total_bounds is None else total_bounds
+    )
+    center_x, center_y = get_bbox_centers(geoseries)
+
+    n_cells = (1 << level) - 1
+    width = (maxx - minx) or 1.0
+    height = (maxy - miny) or 1.0
+    # Quadkey rows are counted from the top of the extent down
+    cell_x = np.clip(
+        np.nan_to_num((center_x - minx) / width * n_cells), 0, n_cells
+    ).astype(np.uint64)
+    cell_y = np.clip(
+        np.nan_to_num((maxy - center_y) / height * n_cells), 0, n_cells
+    ).astype(np.uint64)
+
+    return spread_bits_16(cell_x) | (spread_bits_16(cell_y) << np.uint64(1))
+
+
+def sort_geodataframe_spatially(
+    gdf: gpd.GeoDataFrame,
+    method: SpatialSortMethod | str = SpatialSortMethod.HILBERT,
+    level: int = DEFAULT_SORT_LEVEL,
+) -> gpd.GeoDataFrame:
+    """
+    Order features along a space-filling curve so that features close in space
+    end up in the same Parquet row groups.
+    """
+    if len(gdf) < 2:
+        return gdf
+    method = SpatialSortMethod(method)
+    if method == SpatialSortMethod.HILBERT:
+        sort_key = np.asarray(gdf.geometry.hilbert_distance(level=level))
+    else:
+        sort_key = get_quadkey_distance(gdf.geometry, level=level)
+    return gdf.iloc[np.argsort(sort_key, kind="stable")].reset_index(drop=True)
+
+
+def get_utm_zone(geoseries: gpd.GeoSeries) -> pd.Series:
+    """
+    Get the UTM zone name (e.g. "32N") of each geometry's bounding box center.
+    """
+    if geoseries.crs is not None and not geoseries.crs.is_geographic:
+        geoseries = geoseries.to_crs(epsg=4326)
+    lon, lat = get_bbox_centers(geoseries)
+    zone_num = np.clip(np.floor((lon + 180) / 6).astype(int) + 1, 1, 60)
+    hemisphere = np.where(lat >= 0, "N", "S")
+    return pd.Series(
+        [f"{num:02d}{hemi}" for num, hemi in zip(zone_num, hemisphere)],
+        index=geoseries.index,
+    )
+
+
+def write_partitioned_geoparquet(
+    gdf: gpd.GeoDataFrame,
+    output_dir: Path,
+    partition_by: str,
+    **parquet_kwargs: Any,
+) -> Path:
+    """
+    Write a hive-partitioned GeoParquet dataset, with one
+    `<partition_by>=<value>/part-0.parquet` file per distinct column value.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for value, part_gdf in gdf.groupby(partition_by, sort=True, dropna=False):
+        value_str = HIVE_DEFAULT_PARTITION if pd.isna(value) else str(value)
+        part_dir = output_dir / f"{partition_by}={value_str}"
+        part_dir.mkdir(exist_ok=True)
+        # Drop the row labels left over from the groupby, so they aren't
+        # stored as an '__index_level_0__' column in every part file
+        part_gdf.drop(columns=[partition_by]).reset_index(drop=True).to_parquet(
+            str(part_dir / "part-0.parquet"), **parquet_kwargs
+        )
+
+    return output_dir
+
+
+def write_geodataframe(
+    gdf: gpd.GeoDataFrame,
+    output_path: Path,
+    *,
+    spatial_sort: SpatialSortMethod | str | None = None,
+    sort_level: int = DEFAULT_SORT_LEVEL,
+    write_bbox_covering: bool = False,
+    row_group_size: int | None = None,
+    partition_by: str | None = None,
+) -> Path:
+    """
+    Write a GeoDataFrame to a vector file, with control over the row order
+    and row-group layout of (Geo)Parquet output.
+    If `write_bbox_covering` is set, GeoParquet 1.1 bbox covering columns are
+    written so that readers can skip row groups by their bbox statistics.
+    If `partition_by` is set, `output_path` is a directory that receives a
+    hive-partitioned dataset. Partitioning by "utm_zone" derives that column
+    from the geometry if it doesn't already exist.
+    """
+    output_path = Path(output_path)
+
+    if partition_by == UTM_ZONE_COLUMN and UTM_ZONE_COLUMN not in gdf.columns:
+        gdf = gdf.assign(**{UTM_ZONE_COLUMN: get_utm_zone(gdf.geometry)})
+
+    if spatial_sort is not None:
+        gdf = sort_geodataframe_spatially(gdf, spatial_sort, level=sort_level)
+
+    if partition_by is not None and not (
+        is_parquet_path(output_path) or output_path.suffix == ""
+    ):
+        raise ValueError("Partitioned output is only supported for Parquet datasets")
+
+    if partition_by is None and not is_parquet_path(output_path):
+        gdf.to_file(
+            str(output_path),
+            driver="GeoJSON"
+            if output_path.suffix.lower() in GEOJSON_SUFFIXES
+            else None,
+        )
+        return output_path
+
+    parquet_kwargs: dict[str, Any] = {}
+    if write_bbox_covering:
+        parquet_kwargs.update(write_covering_bbox=True, schema_version="1.1.0")
+        if row_group_size is None:
+            row_group_size = DEFAULT_ROW_GROUP_SIZE
+    if row_group_size is not None:
+        parquet_kwargs["row_group_size"] = row_group_size
+
+    if partition_by is not None:
+        return write_partitioned_geoparquet(
+            gdf, output_path, partition_by, **parquet_kwargs
+        )
+
+    gdf.to_parquet(str(output_path), **parquet_kwargs)
+    return output_path
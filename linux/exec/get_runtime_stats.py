@@ -0,0 +1,593 @@
+#!/usr/bin/env python
+
+import ast
+import fnmatch
+import math
+import operator
+import os
+import re
+import subprocess
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from functools import cache
+from typing import BinaryIO
+
+from typer import run
+
+READ_BLOCK_SIZE = 64 * 1024
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_TIMESTAMP_GREP = (
+    r"([A-Z][a-z]+ +[A-Z][a-z]+ +[0-9]+ +[0-9]{2}:[0-9]{2}:[0-9]{2} +[A-Z]+ +[0-9]+)"
+)
+DEFAULT_RUNTIME_GREP = r"^real[[:space:]]+([0-9]+m[0-9]+\.[0-9]+s)"
+DEFAULT_RUNTIME_SED = r"s|^([0-9]+)m([0-9]+\.[0-9]+)s$|\1 * 60 + \2|"
+
+# Bracket expression classes don't match newlines here, since grep
+# matches within a single line.
+POSIX_CLASSES = {
+    "[:space:]": r" \t\r\f\v",
+    "[:blank:]": r" \t",
+    "[:digit:]": "0-9",
+    "[:alpha:]": "a-zA-Z",
+    "[:alnum:]": "a-zA-Z0-9",
+    "[:upper:]": "A-Z",
+    "[:lower:]": "a-z",
+    "[:punct:]": re.escape("!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"),
+}
+TIMESTAMP_TZ_REGEX = re.compile(
+    r"^(\w+ +\w+ +\d+ +\d{2}:\d{2}:\d{2}) +([A-Z]+) +(\d+)$"
+)
+# UTC offsets (in hours) of timezone names commonly printed by the `date`
+# program default format
+TZ_OFFSET_HOURS = {
+    "UTC": 0,
+    "GMT": 0,
+    "EST": -5,
+    "EDT": -4,
+    "CST": -6,
+    "CDT": -5,
+    "MST": -7,
+    "MDT": -6,
+    "PST": -8,
+    "PDT": -7,
+    "AKST": -9,
+    "AKDT": -8,
+    "HST": -10,
+    "WET": 0,
+    "WEST": 1,
+    "CET": 1,
+    "CEST": 2,
+    "EET": 2,
+    "EEST": 3,
+}
+TIMESTAMP_FORMATS = ("%a %b %d %H:%M:%S %Y", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M:%S")
+HMS_REGEX = re.compile(r"([0-9]*)-?([0-9]+):([0-9]{2}):([0-9]{2})")
+ARITHMETIC_OPERATORS: dict[type, Callable[[float, float], float]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+
+class StatsMode(str, Enum):
+    TIMESTAMP = "timestamp"
+    TIMESTAMP_FILEMOD = "timestamp-filemod"
+    RUNTIME = "runtime"
+
+
+class RuntimeMatch(str, Enum):
+    FIRST = "first"
+    LAST = "last"
+    ALL = "all"
+
+
+class RuntimeReport(str, Enum):
+    SEPARATE = "separate"
+    SUM = "sum"
+
+
+def compile_grep_pattern(pattern: str) -> re.Pattern[bytes]:
+    """
+    Compile a `grep -E` pattern into a bytes regex that matches within
+    single lines, translating POSIX character classes.
+    """
+    for posix_class, python_class in POSIX_CLASSES.items():
+        pattern = pattern.replace(posix_class, python_class)
+    return re.compile(pattern.encode(), re.MULTILINE)
+
+
+def compile_sed_substitution(expr: str) -> Callable[[str], str]:
+    """
+    Compile a `sed -r` substitution expression like "s|pattern|repl|g" into
+    a function applying it to a string.
+    """
+    if len(expr) < 2 or expr[0] != "s":
+        raise ValueError(
+            f"Only sed substitution expressions are supported, but got: {expr}"
+        )
+    delim = expr[1]
+    parts = re.split(rf"(?<!\\){re.escape(delim)}", expr[2:])
+    if len(parts) != 3:
+        raise ValueError(f"Malformed sed substitution expression: {expr}")
+    pattern, repl, flags = parts
+    regex = compile_grep_pattern(pattern.replace(f"\\{delim}", delim)).pattern.decode()
+    regex_flags = re.IGNORECASE if "I" in flags else 0
+    count = 0 if "g" in flags else 1
+    compiled = re.compile(regex, regex_flags)
+    repl = re.sub(r"\\(\d)", r"\\g<\1>", repl.replace(f"\\{delim}", delim)).replace(
+        "&", r"\g<0>"
+    )
+    return lambda text: compiled.sub(repl, text, count=count)
+
+
+def evaluate_arithmetic(expr: str) -> float:
+    """
+    Evaluate a simple arithmetic expression of numbers, parentheses and
+    + - * / like the `bc` program, without using `eval`.
+    """
+
+    def evaluate(node: ast.AST) -> float:
+        if isinstance(node, ast.Expression):
+            return evaluate(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.BinOp) and type(node.op) in ARITHMETIC_OPERATORS:
+            return ARITHMETIC_OPERATORS[type(node.op)](
+                evaluate(node.left), evaluate(node.right)
+            )
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = evaluate(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        raise ValueError(f"Unsupported arithmetic expression: {expr}")
+
+    return evaluate(ast.parse(expr.strip(), mode="eval"))
+
+
+def hms_to_seconds(text: str) -> int:
+    match = HMS_REGEX.search(text)
+    if match is None:
+        raise ValueError(f"Unable to parse HMS string: {text}")
+    days, hours, minutes, seconds = match.groups()
+    return int(days or 0) * 86400 + int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+@cache
+def parse_timestamp_with_date_program(text: str) -> float:
+    result = subprocess.run(
+        ["date", "-d", text, "+%s"], capture_output=True, text=True, check=True
+    )
+    return float(result.stdout)
+
+
+def parse_timestamp(text: str) -> float:
+    """
+    Convert a timestamp string to seconds since the epoch, parsing the common
+    formats accepted by `date -d` in-process and falling back to calling
+    `date -d` for anything else.
+    Timestamps in the `date` program default format are read in the named
+    timezone, so runtimes spanning a DST change come out right. Timestamps
+    without a timezone are read as local time.
+    """
+    text = text.strip()
+    match = TIMESTAMP_TZ_REGEX.match(text)
+    if match is not None:
+        datetime_text, tz_name, year = match.groups()
+        if tz_name not in TZ_OFFSET_HOURS:
+            return parse_timestamp_with_date_program(text)
+        tz = timezone(timedelta(hours=TZ_OFFSET_HOURS[tz_name]))
+        try:
+            return (
+                datetime.strptime(f"{datetime_text} {year}", TIMESTAMP_FORMATS[0])
+                .replace(tzinfo=tz)
+                .timestamp()
+            )
+        except ValueError:
+            return parse_timestamp_with_date_program(text)
+    for timestamp_format in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(text, timestamp_format).timestamp()
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return parse_timestamp_with_date_program(text)
+
+
+def search_head(
+    fp: BinaryIO, regex: re.Pattern[bytes], block_size: int = READ_BLOCK_SIZE
+) -> re.Match[bytes] | None:
+    """
+    Return the first regex match in a file, reading only as many blocks from
+    the start of the file as needed.
+    """
+    buf = b""
+    while True:
+        block = fp.read(block_size)
+        buf += block
+        # Only search complete lines, unless at the end of the file
+        end = buf.rfind(b"\n") + 1 if block else len(buf)
+        match = regex.search(buf, 0, end)
+        if match is not None or not block:
+            return match
+        buf = buf[end:]
+
+
+def search_tail(
+    fp: BinaryIO, regex: re.Pattern[bytes], block_size: int = READ_BLOCK_SIZE
+) -> re.Match[bytes] | None:
+    """
+    Return the last regex match in a file, reading only as many blocks from
+    the end of the file as needed.
+    """
+    pos = fp.seek(0, os.SEEK_END)
+    buf = b""
+    while pos > 0:
+        read_size = min(block_size, pos)
+        pos -= read_size
+        fp.seek(pos)
+        buf = fp.read(read_size) + buf
+        # The first line of the buffer may be cut off, unless at the start of the file
+        start = 0 if pos == 0 else buf.find(b"\n") + 1
+        if start == 0 and pos > 0:
+            continue
+        last_match = None
+        for last_match in regex.finditer(buf, start):
+            pass
+        if last_match is not None:
+            return last_match
+        buf = buf[:start]
+    return None
+
+
+def iter_file_matches(
+    fp: BinaryIO,
+    regex: re.Pattern[bytes],
+    block_size: int = READ_BLOCK_SIZE,
+) -> Iterator[re.Match[bytes]]:
+    buf = b""
+    while True:
+        block = fp.read(block_size)
+        buf += block
+        end = buf.rfind(b"\n") + 1 if block else len(buf)
+        yield from regex.finditer(buf, 0, end)
+        if not block:
+            return
+        buf = buf[end:]
+
+
+class P2Quantile:
+    """
+    Streaming estimate of a single quantile with the P² algorithm (Jain and
+    Chlamtac, 1985), using constant memory regardless of the number of
+    observations.
+    """
+
+    def __init__(self, p: float) -> None:
+        self.p = p
+        self.heights: list[float] = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float) -> None:
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if heights[i] <= x < heights[i + 1])
+
+        positions = self.positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in range(1, 4):
+            d = self.desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (
+                d <= -1 and positions[i - 1] - positions[i] < -1
+            ):
+                step = 1 if d > 0 else -1
+                height = self.parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (
+                        positions[i + step] - positions[i]
+                    )
+                heights[i] = height
+                positions[i] += step
+
+    def parabolic(self, i: int, step: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> float:
+        heights = self.heights
+        if len(heights) == 5:
+            return heights[2]
+        if not heights:
+            return 0
+        # Exact quantile (with linear interpolation) of the first few values
+        rank = self.p * (len(heights) - 1)
+        lower = math.floor(rank)
+        upper = min(lower + 1, len(heights) - 1)
+        return heights[lower] + (rank - lower) * (heights[upper] - heights[lower])
+
+
+class StreamingStats:
+    """
+    Running count, sum, min/max (with the file they came from), mean and
+    population standard deviation (Welford's method) and approximate
+    quantiles of a stream of values.
+    """
+
+    def __init__(self, quantiles: Iterable[float] = (0.5,)) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.min_ref: str | None = None
+        self.max_ref: str | None = None
+        self.quantiles = {q: P2Quantile(q) for q in quantiles}
+
+    def add(self, value: float, ref: str | None = None) -> None:
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min, self.min_ref = value, ref
+        if value > self.max:
+            self.max, self.max_ref = value, ref
+        for estimator in self.quantiles.values():
+            estimator.add(value)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else 0
+
+    def format_report(self, include_ref: bool = True) -> str:
+        def with_ref(value: float, ref: str | None) -> str:
+            return f"{value:.12g} ({ref})" if include_ref else f"{value:.12g}"
+
+        if self.count == 0:
+            lines = [
+                "cnt: 0",
+                "sum: 0",
+                "min: 0",
+                "max: 0",
+                "med: 0",
+                "avg: 0",
+                "std: 0",
+            ]
+        else:
+            lines = [
+                f"cnt: {self.count}",
+                f"sum: {self.total:.12g}",
+                f"min: {with_ref(self.min, self.min_ref)}",
+                f"max: {with_ref(self.max, self.max_ref)}",
+            ]
+            for q, estimator in self.quantiles.items():
+                name = "med" if q == 0.5 else f"p{q * 100:g}"
+                lines.append(f"{name}: {estimator.value:.12g}")
+            lines += [f"avg: {self.mean:.12g}", f"std: {self.std:.12g}"]
+        return "\n".join(lines)
+
+
+class LogRuntimeParser:
+    """
+    Parse the runtime(s) of a log file in minutes, with regexes and sed
+    expressions compiled once up front.
+    """
+
+    def __init__(
+        self,
+        mode: StatsMode,
+        timestamp_grep: str,
+        timestamp_sed: str | None,
+        runtime_grep: str,
+        runtime_sed: str | None,
+        runtime_is_hms: bool,
+        runtime_match: RuntimeMatch,
+        runtime_report: RuntimeReport,
+    ) -> None:
+        self.mode = mode
+        self.timestamp_regex = compile_grep_pattern(timestamp_grep)
+        self.timestamp_sed = (
+            compile_sed_substitution(timestamp_sed) if timestamp_sed else None
+        )
+        self.runtime_regex = compile_grep_pattern(runtime_grep)
+        self.runtime_sed = (
+            compile_sed_substitution(runtime_sed) if runtime_sed else None
+        )
+        self.runtime_is_hms = runtime_is_hms
+        self.runtime_match = runtime_match
+        self.runtime_report = runtime_report
+
+    @staticmethod
+    def get_match_text(match: re.Match[bytes], sed: Callable[[str], str] | None) -> str:
+        text = (match.group(1) if match.re.groups else match.group(0)).decode(
+            errors="replace"
+        )
+        return sed(text) if sed is not None else text
+
+    def get_timestamp_runtime(self, logfile: str) -> list[float]:
+        with open(logfile, "rb") as fp:
+            start_match = search_head(fp, self.timestamp_regex)
+            if start_match is None:
+                return []
+            if self.mode is StatsMode.TIMESTAMP:
+                end_match = search_tail(fp, self.timestamp_regex)
+                if end_match is None:
+                    return []
+                end_sec = parse_timestamp(
+                    self.get_match_text(end_match, self.timestamp_sed)
+                )
+            else:
+                end_sec = int(os.fstat(fp.fileno()).st_mtime)
+        start_sec = parse_timestamp(
+            self.get_match_text(start_match, self.timestamp_sed)
+        )
+        return [(end_sec - start_sec) / 60]
+
+    def get_reported_runtimes(self, logfile: str) -> list[float]:
+        with open(logfile, "rb") as fp:
+            if self.runtime_match is RuntimeMatch.FIRST:
+                matches = [search_head(fp, self.runtime_regex)]
+            elif self.runtime_match is RuntimeMatch.LAST:
+                matches = [search_tail(fp, self.runtime_regex)]
+            else:
+                matches = list(iter_file_matches(fp, self.runtime_regex))
+
+        runtimes = []
+        for match in matches:
+            if match is None:
+                continue
+            text = self.get_match_text(match, self.runtime_sed)
+            runtime_sec = (
+                hms_to_seconds(text)
+                if self.runtime_is_hms
+                else evaluate_arithmetic(text)
+            )
+            runtimes.append(runtime_sec / 60)
+        if self.runtime_report is RuntimeReport.SUM and runtimes:
+            return [sum(runtimes)]
+        return runtimes
+
+    def get_runtimes(self, logfile: str) -> list[float]:
+        if self.mode is StatsMode.RUNTIME:
+            return self.get_reported_runtimes(logfile)
+        return self.get_timestamp_runtime(logfile)
+
+
+def iter_logfiles(
+    log_path: str, name_regex: re.Pattern[str] | None, max_files: int | None = None
+) -> Iterator[str]:
+    """
+    Recursively yield files under a directory with names matching the regex,
+    or the path itself if it is a file.
+    """
+    if not os.path.isdir(log_path):
+        yield log_path
+        return
+
+    nfiles = 0
+    dir_stack = [log_path]
+    while dir_stack:
+        try:
+            dirents = os.scandir(dir_stack.pop())
+        except OSError:
+            continue
+        with dirents:
+            for entry in dirents:
+                if entry.is_dir(follow_symlinks=False):
+                    dir_stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and (
+                    name_regex is None or name_regex.match(entry.name)
+                ):
+                    yield entry.path
+                    nfiles += 1
+                    if max_files is not None and nfiles >= max_files:
+                        return
+
+
+def get_runtime_stats(
+    log_paths: list[str],
+    logfname_pattern: list[str] | None = None,
+    mode: StatsMode = StatsMode.TIMESTAMP,
+    timestamp_grep: str = DEFAULT_TIMESTAMP_GREP,
+    timestamp_sed: str | None = None,
+    runtime_grep: str = DEFAULT_RUNTIME_GREP,
+    runtime_sed: str | None = DEFAULT_RUNTIME_SED,
+    runtime_is_hms: bool = False,
+    runtime_match: RuntimeMatch = RuntimeMatch.ALL,
+    runtime_report: RuntimeReport = RuntimeReport.SUM,
+    include_ref: bool = True,
+    max_files: int | None = None,
+    quantile: list[float] | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> None:
+    """
+    Calculate and print runtime statistics (in minutes) of all process log
+    files found within one or more directories (or files), with the same
+    modes and options as the `get_runtime_stats` script.
+    Log files are parsed in parallel, and in timestamp modes only the head
+    and tail of each file are read. Statistics are accumulated in a single
+    streaming pass, so the median (and any other `quantile`) is a P²
+    estimate rather than exact.
+    """
+    patterns = logfname_pattern or ["*.log"]
+    name_regex = re.compile(
+        "|".join(fnmatch.translate(pattern) for pattern in patterns)
+    )
+    parser = LogRuntimeParser(
+        mode,
+        timestamp_grep,
+        timestamp_sed,
+        runtime_grep,
+        runtime_sed,
+        runtime_is_hms,
+        runtime_match,
+        runtime_report,
+    )
+    stats = StreamingStats(quantile or [0.5])
+    pattern_str = " ".join(f"'{pattern}'" for pattern in patterns)
+
+    nfiles = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        logfiles = (
+            logfile
+            for log_path in log_paths
+            for logfile in iter_logfiles(log_path, name_regex, max_files)
+        )
+        for logfile in logfiles:
+            pending[executor.submit(parser.get_runtimes, logfile)] = logfile
+            # Keep a bounded number of files in flight
+            if len(pending) < max_workers * 4:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for runtime in future.result():
+                    stats.add(runtime, pending[future])
+                del pending[future]
+                nfiles += 1
+            print(
+                f"Processing log files matching {pattern_str}: ({nfiles})",
+                end="\r",
+                file=sys.stderr,
+            )
+        for future, logfile in pending.items():
+            for runtime in future.result():
+                stats.add(runtime, logfile)
+            nfiles += 1
+    print(f"Processing log files matching {pattern_str}: ({nfiles})", file=sys.stderr)
+
+    print("\nRuntimes are reported in minutes\n")
+    print(stats.format_report(include_ref))
+    if stats.count == 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run(get_runtime_stats)
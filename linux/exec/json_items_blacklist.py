@@ -1,24 +1,7 @@
 #!/usr/bin/env python
 
-import json
 import sys
 
-blacklist_pairs = [
-    tuple(item.strip().strip('"') for item in line.strip().rstrip(",").split(":", 1))
-    for line in sys.stdin.readlines()
-]
+from json_items_filter import FilterMode, json_items_filter
 
-json_obj = json.load(open(sys.argv[1], "r"))
-
-keep_json_item_list = []
-for json_item in json_obj:
-    print_item = True
-    for pair in blacklist_pairs:
-        if pair in json_item.items():
-            print_item = False
-            break
-    if print_item:
-        # print(json.dumps(json_item))
-        keep_json_item_list.append(json_item)
-
-print(json.dumps(keep_json_item_list, indent=2))
+json_items_filter(sys.argv[1], mode=FilterMode.BLACKLIST)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+import json
+import sys
+import textwrap
+from collections.abc import Iterable, Iterator
+from enum import Enum
+from pathlib import Path
+from typing import Any, TextIO
+
+from json_predicate import Matcher, compile_predicate
+from typer import run
+
+READ_CHUNK_SIZE = 1 << 20
+JSON_WHITESPACE = " \t\n\r"
+# Characters that can follow a complete top-level number or literal
+SCALAR_DELIMITERS = JSON_WHITESPACE + ",]"
+
+
+class FilterMode(str, Enum):
+    WHITELIST = "whitelist"
+    BLACKLIST = "blacklist"
+
+
+class OutputFormat(str, Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+
+
+def iter_json_items(fp: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Incrementally parse the elements of a top-level JSON array, or the values
+    of a JSON lines / concatenated JSON stream, reading the input in chunks
+    so that only one element needs to be held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    in_array: bool | None = None
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    while True:
+        while pos < len(buf) and buf[pos] in JSON_WHITESPACE:
+            pos += 1
+        if pos >= len(buf):
+            if eof or not fill():
+                break
+            continue
+
+        char = buf[pos]
+        if in_array is None:
+            in_array = char == "["
+            if in_array:
+                pos += 1
+                continue
+        if in_array and char == ",":
+            pos += 1
+            continue
+        if in_array and char == "]":
+            break
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof or not fill():
+                raise
+            continue
+        # A number (or literal) may be cut off at the end of the buffer, so
+        # only accept one once a delimiter follows it
+        is_scalar = char not in '{["'
+        if (
+            is_scalar
+            and not eof
+            and (end == len(buf) or buf[end] not in SCALAR_DELIMITERS)
+            and fill()
+        ):
+            continue
+        pos = end
+        yield item
+
+
+def read_filter_pairs(lines: Iterable[str]) -> list[tuple[str, str]]:
+    """
+    Parse `"key": "value"` lines (as copied out of a JSON document) into
+    (key, value) pairs, ignoring blank lines.
+    """
+    pairs = []
+    for line in lines:
+        line = line.strip().rstrip(",")
+        if not line:
+            continue
+        key, _, value = line.partition(":")
+        pairs.append((key.strip().strip('"'), value.strip().strip('"')))
+    return pairs
+
+
+def build_pair_index(pairs: Iterable[tuple[str, Any]]) -> dict[str, set[Any]]:
+    index: dict[str, set[Any]] = {}
+    for key, value in pairs:
+        index.setdefault(key, set()).add(value)
+    return index
+
+
+def item_matches_index(item: Any, pair_index: dict[str, set[Any]]) -> bool:
+    if not isinstance(item, dict):
+        return False
+    for key, values in pair_index.items():
+        try:
+            if key in item and item[key] in values:
+                return True
+        except TypeError:
+            # Unhashable values (lists, objects) can't equal any filter value
+            pass
+    return False
+
+
+def get_pair_index_matcher(pair_index: dict[str, set[Any]]) -> Matcher:
+    return lambda item: item_matches_index(item, pair_index)
+
+
+def write_json_items(
+    items: Iterable[Any], fp: TextIO, output_format: OutputFormat = OutputFormat.JSON
+) -> int:
+    """
+    Write items as they arrive, either as an indented JSON array or as one
+    compact JSON document per line. Returns the number of items written.
+    """
+    num_items = 0
+    if output_format == OutputFormat.NDJSON:
+        for item in items:
+            fp.write(json.dumps(item) + "\n")
+            num_items += 1
+        return num_items
+
+    fp.write("[")
+    for item in items:
+        fp.write("," if num_items else "")
+        fp.write("\n" + textwrap.indent(json.dumps(item, indent=2), "  "))
+        num_items += 1
+    fp.write("\n]\n" if num_items else "]\n")
+    return num_items
+
+
+def filter_json_items(
+    items: Iterable[Any],
+    matcher: Matcher,
+    mode: FilterMode = FilterMode.WHITELIST,
+) -> Iterator[Any]:
+    keep_matches = mode == FilterMode.WHITELIST
+    for item in items:
+        if matcher(item) == keep_matches:
+            yield item
+
+
+def json_items_filter(
+    json_file: Path,
+    mode: FilterMode = FilterMode.WHITELIST,
+    pairs_file: Path | None = None,
+    where: str | None = None,
+    output_format: OutputFormat = OutputFormat.JSON,
+) -> None:
+    """
+    Stream the items of a JSON array (or JSON lines) file and print only the
+    items that match (whitelist) or don't match (blacklist) the filter.
+    The filter is either the `where` predicate expression, for example
+    'properties.eo:cloud_cover < 20 and not collection in ["a", "b"]',
+    or else any of the `"key": "value"` pairs given one per line in
+    `pairs_file` (default stdin).
+    Use "-" as `json_file` to read the items from stdin.
+    """
+    if where is not None:
+        matcher = compile_predicate(where)
+    elif pairs_file is not None:
+        with open(pairs_file, "r") as pairs_fp:
+            matcher = get_pair_index_matcher(
+                build_pair_index(read_filter_pairs(pairs_fp))
+            )
+    elif str(json_file) == "-":
+        raise ValueError(
+            "A pairs file or predicate must be provided when reading JSON items from stdin"
+        )
+    else:
+        matcher = get_pair_index_matcher(build_pair_index(read_filter_pairs(sys.stdin)))
+
+    if str(json_file) == "-":
+        write_json_items(
+            filter_json_items(iter_json_items(sys.stdin), matcher, mode),
+            sys.stdout,
+            output_format,
+        )
+        return
+
+    with open(json_file, "r") as json_fp:
+        write_json_items(
+            filter_json_items(iter_json_items(json_fp), matcher, mode),
+            sys.stdout,
+            output_format,
+        )
+
+
+if __name__ == "__main__":
+    run(json_items_filter)
@@ -0,0 +1,285 @@
+import ast
+import operator
+import re
+from collections.abc import Callable
+from typing import Any
+
+Matcher = Callable[[Any], bool]
+
+TOKEN_REGEX = re.compile(
+    r"""\s*(?:
+    (?P<punct>[()\[\],])
+    |(?P<op>==|!=|<=|>=|=~|!~|<|>|=)
+    |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?![^\s()\[\],=!<>]))
+    |(?P<word>[^\s()\[\],=!<>~"']+)
+    )""",
+    re.VERBOSE,
+)
+KEYWORDS = ("and", "or", "not", "in", "exists")
+LITERAL_WORDS: dict[str, Any] = {"true": True, "false": False, "null": None}
+
+ORDER_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_MISSING = object()
+
+
+class PredicateSyntaxError(ValueError):
+    pass
+
+
+def tokenize_predicate(text: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN_REGEX.match(text, pos)
+        if match is None or match.end() == pos:
+            raise PredicateSyntaxError(
+                f"Unexpected character at position {pos} in predicate: {text}"
+            )
+        kind = match.lastgroup
+        assert kind is not None
+        value = match.group(kind)
+        if kind == "word" and value.lower() in KEYWORDS:
+            kind = "keyword"
+            value = value.lower()
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+def compile_key_path(path: str) -> Callable[[Any], Any]:
+    """
+    Compile a dotted key path (e.g. "properties.eo:cloud_cover" or
+    "links.0.rel") into a getter that returns the nested value, or a
+    sentinel if any key along the path is missing.
+    """
+    parts = [int(part) if part.isdigit() else part for part in path.split(".")]
+
+    def get_value(item: Any) -> Any:
+        for part in parts:
+            if isinstance(item, dict):
+                item = item.get(part if isinstance(part, str) else str(part), _MISSING)
+            elif isinstance(item, list) and isinstance(part, int) and part < len(item):
+                item = item[part]
+            else:
+                return _MISSING
+            if item is _MISSING:
+                return _MISSING
+        return item
+
+    return get_value
+
+
+def is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def coerce_to_literal_type(value: Any, literal: Any) -> Any:
+    # Numeric strings compare as numbers against numeric literals
+    if is_number(literal) and isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return _MISSING
+    return value
+
+
+def compile_comparison(getter: Callable[[Any], Any], op: str, literal: Any) -> Matcher:
+    if op in ("=", "=="):
+
+        def matcher(item: Any) -> bool:
+            value = coerce_to_literal_type(getter(item), literal)
+            return (
+                value is not _MISSING
+                and is_number(value) == is_number(literal)
+                and value == literal
+            )
+    elif op == "!=":
+
+        def matcher(item: Any) -> bool:
+            value = coerce_to_literal_type(getter(item), literal)
+            return value is not _MISSING and not (
+                is_number(value) == is_number(literal) and value == literal
+            )
+    elif op in ORDER_OPERATORS:
+        compare = ORDER_OPERATORS[op]
+
+        def matcher(item: Any) -> bool:
+            value = coerce_to_literal_type(getter(item), literal)
+            if is_number(literal):
+                return is_number(value) and compare(value, literal)
+            return (
+                isinstance(value, str)
+                and isinstance(literal, str)
+                and compare(value, literal)
+            )
+    elif op in ("=~", "!~"):
+        if not isinstance(literal, str):
+            raise PredicateSyntaxError(f"Regex operator '{op}' needs a string pattern")
+        regex = re.compile(literal)
+        negate = op == "!~"
+
+        def matcher(item: Any) -> bool:
+            value = getter(item)
+            if value is _MISSING or isinstance(value, (dict, list)):
+                return False
+            return (
+                regex.search(value if isinstance(value, str) else str(value)) is None
+            ) == negate
+    else:
+        raise PredicateSyntaxError(f"Unknown comparison operator: {op}")
+    return matcher
+
+
+def compile_membership(
+    getter: Callable[[Any], Any], literals: list[Any], negate: bool = False
+) -> Matcher:
+    values = frozenset(
+        literal for literal in literals if not isinstance(literal, (dict, list))
+    )
+    has_numbers = any(is_number(literal) for literal in values)
+
+    def matcher(item: Any) -> bool:
+        value = getter(item)
+        if value is _MISSING or isinstance(value, (dict, list)):
+            return False
+        found = value in values
+        if not found and has_numbers and isinstance(value, str):
+            try:
+                found = float(value) in values
+            except ValueError:
+                pass
+        return found != negate
+
+    return matcher
+
+
+class PredicateParser:
+    """
+    Recursive descent parser for filter predicates such as:
+
+        properties.eo:cloud_cover < 20 and (collection in ["a", "b"] or not id =~ "^test")
+
+    Comparison operators are == (or =), !=, <, <=, >, >=, =~ / !~ (regex
+    search), `in` / `not in` (set membership) and `exists`. A comparison on a
+    missing key path is always false.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens = tokenize_predicate(text)
+        self.pos = 0
+
+    def peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self) -> tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise PredicateSyntaxError(f"Unexpected end of predicate: {self.text}")
+        self.pos += 1
+        return token
+
+    def accept(self, kind: str, value: str | None = None) -> bool:
+        token = self.peek()
+        if (
+            token is not None
+            and token[0] == kind
+            and (value is None or token[1] == value)
+        ):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, kind: str, value: str | None = None) -> tuple[str, str]:
+        token = self.next()
+        if token[0] != kind or (value is not None and token[1] != value):
+            raise PredicateSyntaxError(
+                f"Expected {value or kind} but got '{token[1]}' in predicate: {self.text}"
+            )
+        return token
+
+    def parse(self) -> Matcher:
+        matcher = self.parse_or()
+        if self.peek() is not None:
+            raise PredicateSyntaxError(
+                f"Unexpected '{self.next()[1]}' in predicate: {self.text}"
+            )
+        return matcher
+
+    def parse_or(self) -> Matcher:
+        matchers = [self.parse_and()]
+        while self.accept("keyword", "or"):
+            matchers.append(self.parse_and())
+        if len(matchers) == 1:
+            return matchers[0]
+        return lambda item: any(matcher(item) for matcher in matchers)
+
+    def parse_and(self) -> Matcher:
+        matchers = [self.parse_not()]
+        while self.accept("keyword", "and"):
+            matchers.append(self.parse_not())
+        if len(matchers) == 1:
+            return matchers[0]
+        return lambda item: all(matcher(item) for matcher in matchers)
+
+    def parse_not(self) -> Matcher:
+        if self.accept("keyword", "not"):
+            matcher = self.parse_not()
+            return lambda item: not matcher(item)
+        return self.parse_atom()
+
+    def parse_atom(self) -> Matcher:
+        if self.accept("punct", "("):
+            matcher = self.parse_or()
+            self.expect("punct", ")")
+            return matcher
+
+        getter = compile_key_path(self.expect("word")[1])
+        if self.accept("keyword", "exists"):
+            return lambda item: getter(item) is not _MISSING
+        if self.accept("keyword", "not"):
+            self.expect("keyword", "in")
+            return compile_membership(getter, self.parse_list(), negate=True)
+        if self.accept("keyword", "in"):
+            return compile_membership(getter, self.parse_list())
+        op = self.expect("op")[1]
+        return compile_comparison(getter, op, self.parse_literal())
+
+    def parse_list(self) -> list[Any]:
+        self.expect("punct", "[")
+        literals: list[Any] = []
+        if self.accept("punct", "]"):
+            return literals
+        literals.append(self.parse_literal())
+        while self.accept("punct", ","):
+            literals.append(self.parse_literal())
+        self.expect("punct", "]")
+        return literals
+
+    def parse_literal(self) -> Any:
+        kind, value = self.next()
+        if kind == "string":
+            return ast.literal_eval(value)
+        if kind == "number":
+            return float(value) if any(char in value for char in ".eE") else int(value)
+        if kind == "word" and value.lower() in LITERAL_WORDS:
+            return LITERAL_WORDS[value.lower()]
+        raise PredicateSyntaxError(
+            f"Expected a literal value but got '{value}' in predicate: {self.text}"
+        )
+
+
+def compile_predicate(text: str) -> Matcher:
+    """
+    Compile a predicate expression once into a matcher function that takes
+    a parsed JSON item and returns whether it satisfies the predicate.
+    """
+    return PredicateParser(text).parse()
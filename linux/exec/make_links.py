@@ -4,11 +4,15 @@
 
 
 import argparse
+import fnmatch
 import glob
 import os
 import platform
-import subprocess
+import re
 import sys
+import threading
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 
 global ARGV
@@ -16,21 +20,24 @@ PYTHON_EXE = "python"
 
 
 ###### DO NOT MODIFY ######
-FLIST_PREFIX = None
-FLIST_CONTAINS = None
-FLIST_SUFFIX = None
+FLIST_PREFIX: str | None = None
+FLIST_CONTAINS: str | None = None
+FLIST_SUFFIX: str | None = None
+GLOB_PREFIX = ""
+GLOB_SUFFIX = ""
 LINK_TYPE_HARDLINK = 0
 LINK_TYPE_SYMLINK = 1
 DRYRUN = False
 SILENT = False
-CMD_RAW = None
+LINK_BATCH_SIZE = 1000
+LINK_STATUSES = ("created", "already-correct", "replaced", "skipped", "failed")
 ###########################
 
 
 ###### SET ARG DEFAULTS ######
 SRC = r""
 DSTDIR = r""
-FLIST_SRCDIR = r""
+FLIST_SRCDIR: str | None = r""
 DELIM = "|"  # CANNOT BE '>'
 FNAME_PREFIX = ""
 DNAME_PREFIX = ""
@@ -41,26 +48,27 @@ DNAME_SUFFIX = ""
 FNAME_REPLACE = ""
 DNAME_REPLACE = ""
 FLIST_GLOB = False
-DEPTH_LIMIT = "inf"
+DEPTH_LIMIT: float | str = "inf"
 TRANSPLANT_TREE = False
 COLLAPSE_TREE = False
 OVERWRITE = False
 LINK_TYPE = LINK_TYPE_HARDLINK
+THREADS = 8
 ##############################
 
 
 ###### SET EXCLUSIONS ######
-EXCLUDE_DNAMES = [
+EXCLUDE_DNAMES: list[str] | None = [
     "",
 ]
-EXCLUDE_FNAMES = [
+EXCLUDE_FNAMES: list[str] | None = [
     "",
 ]
 # NOTE: The following must be absolute paths.
-EXCLUDE_DPATHS = [
+EXCLUDE_DPATHS: list[str] | None = [
     r"",
 ]
-EXCLUDE_FPATHS = [
+EXCLUDE_FPATHS: list[str] | None = [
     r"",
 ]
 ############################
@@ -74,7 +82,7 @@ EXCLUDE_DNAMES, EXCLUDE_FNAMES = [
 ]
 EXCLUDE_DPATHS, EXCLUDE_FPATHS = [
     [os.path.abspath(os.path.expanduser(path)) for path in exclude_paths]
-    if exclude_paths != [""]
+    if exclude_paths is not None and exclude_paths != [""]
     else None
     for exclude_paths in (EXCLUDE_DPATHS, EXCLUDE_FPATHS)
 ]
@@ -92,6 +100,7 @@ default_transplant_tree = TRANSPLANT_TREE
 default_collapse_tree = COLLAPSE_TREE
 default_flist_glob = FLIST_GLOB
 default_overwrite = OVERWRITE
+default_threads = THREADS
 default_dryrun = DRYRUN
 default_silent = SILENT
 
@@ -122,11 +131,331 @@ default_dreplace = (
 
 
 class SystemSupportError(Exception):
-    def __init__(self, msg=""):
+    def __init__(self, msg: str = "") -> None:
         super(Exception, self).__init__(msg)
 
 
-def main():
+class NameRules:
+    """
+    Include, exclude and rename rules for the names of one kind of
+    directory entry (files or directories), compiled once so that checking
+    a name costs the same no matter how many patterns were given.
+    Prefixes and suffixes become tuples for a single `startswith`/`endswith`
+    call, substrings become one alternation regex, and excluded names and
+    paths become hash sets.
+    """
+
+    def __init__(
+        self,
+        prefixes: Iterable[str] | None = None,
+        contains: Iterable[str] | None = None,
+        suffixes: Iterable[str] | None = None,
+        exclude_names: Iterable[str] | None = None,
+        exclude_paths: Iterable[str] | None = None,
+        replacements: Iterable[Iterable[str]] | None = None,
+    ) -> None:
+        self.prefixes = tuple(prefixes) if prefixes is not None else None
+        self.suffixes = tuple(suffixes) if suffixes is not None else None
+        self.contains_regex = (
+            re.compile("|".join(re.escape(c) for c in contains))
+            if contains is not None
+            else None
+        )
+        self.exclude_names = (
+            frozenset(exclude_names) if exclude_names is not None else None
+        )
+        self.exclude_paths = (
+            frozenset(exclude_paths) if exclude_paths is not None else None
+        )
+        self.replacements = (
+            [tuple(repl_item) for repl_item in replacements]
+            if replacements is not None
+            else None
+        )
+
+    def is_excluded_path(self, path: str) -> bool:
+        return self.exclude_paths is not None and path in self.exclude_paths
+
+    def matches(
+        self,
+        name: str,
+        path: str | None = None,
+        check_prefix: bool = True,
+        check_contains: bool = True,
+        check_suffix: bool = True,
+    ) -> bool:
+        if self.exclude_names is not None and name in self.exclude_names:
+            return False
+        if path is not None and self.is_excluded_path(path):
+            return False
+        if (
+            check_prefix
+            and self.prefixes is not None
+            and not name.startswith(self.prefixes)
+        ):
+            return False
+        if (
+            check_contains
+            and self.contains_regex is not None
+            and self.contains_regex.search(name) is None
+        ):
+            return False
+        return not check_suffix or self.suffixes is None or name.endswith(self.suffixes)
+
+    def replace(self, name: str) -> str:
+        if self.replacements is not None:
+            for repl_orig, repl_new in self.replacements:
+                name = name.replace(repl_orig, repl_new)
+        return name
+
+
+class DirNameIndex:
+    """
+    Cache of the file and subdirectory names in each source directory,
+    read with a single `os.scandir` the first time a directory is needed.
+    File list lines that share a parent directory are then resolved with
+    set lookups and compiled `fnmatch` patterns against the cached names,
+    instead of globbing and stat'ing the directory again for every line.
+    """
+
+    def __init__(self) -> None:
+        self.dir_names: dict[str, tuple[set[str], set[str]]] = {}
+        self.pattern_regexes: dict[str, re.Pattern] = {}
+
+    def get_names(self, dirpath: str) -> tuple[set[str], set[str]]:
+        # Relative paths without a directory part are in the working directory
+        dirpath = dirpath or "."
+        names = self.dir_names.get(dirpath)
+        if names is None:
+            fnames: set[str] = set()
+            dnames: set[str] = set()
+            try:
+                with os.scandir(dirpath) as dirents:
+                    for entry in dirents:
+                        try:
+                            if entry.is_dir():
+                                dnames.add(entry.name)
+                            elif entry.is_file():
+                                fnames.add(entry.name)
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+            names = (fnames, dnames)
+            self.dir_names[dirpath] = names
+        return names
+
+    def isfile(self, path: str) -> bool:
+        dirpath, name = os.path.split(path)
+        return name in self.get_names(dirpath)[0]
+
+    def isdir(self, path: str) -> bool:
+        dirpath, name = os.path.split(os.path.normpath(path))
+        return name in self.get_names(dirpath)[1]
+
+    def glob(self, pattern: str, dirs: bool = False) -> list[str]:
+        dirpath, name_pattern = os.path.split(pattern)
+        if glob.has_magic(dirpath):
+            # Rare case of wildcards in parent directories
+            return [
+                path
+                for path in glob.glob(pattern)
+                if (os.path.isdir(path) if dirs else os.path.isfile(path))
+            ]
+        names = self.get_names(dirpath)[1 if dirs else 0]
+        if not glob.has_magic(name_pattern):
+            return [pattern] if name_pattern in names else []
+
+        regex = self.pattern_regexes.get(name_pattern)
+        if regex is None:
+            regex = re.compile(fnmatch.translate(name_pattern))
+            self.pattern_regexes[name_pattern] = regex
+        # Like glob, only match hidden names with an explicit leading dot
+        match_hidden = name_pattern.startswith(".")
+        return [
+            os.path.join(dirpath, name)
+            for name in sorted(names)
+            if regex.match(name) and (match_hidden or not name.startswith("."))
+        ]
+
+
+class LinkExecutor:
+    """
+    Create links in batches on a pool of worker threads.
+    Each batch is grouped by destination directory, and each pool task
+    creates the links of one directory, opening that directory only for the
+    length of the task so that links are made with `dir_fd`-relative calls
+    instead of resolving the full destination path for every file. At most
+    one directory is open per worker thread.
+    Messages are printed under a lock so lines from workers don't interleave,
+    and the number of links per status is tallied in `status_counts`.
+    """
+
+    def __init__(
+        self,
+        symlink: bool = False,
+        overwrite: bool = False,
+        dryrun: bool = False,
+        verbose: bool = True,
+        threads: int = 1,
+        batch_size: int = LINK_BATCH_SIZE,
+    ) -> None:
+        self.symlink = symlink
+        self.overwrite = overwrite
+        self.dryrun = dryrun
+        self.verbose = verbose
+        self.batch_size = batch_size
+        link_function = os.symlink if symlink else os.link
+        self.use_dir_fd = all(
+            func in os.supports_dir_fd for func in (link_function, os.stat, os.unlink)
+        )
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.batch: list[tuple[str, str]] = []
+        self.batch_lock = threading.Lock()
+        self.created_dirs: set[str] = set()
+        self.created_dirs_lock = threading.Lock()
+        self.status_counts = {status: 0 for status in LINK_STATUSES}
+        self.status_counts_lock = threading.Lock()
+        self.print_lock = threading.Lock()
+
+    def log(self, msg: str) -> None:
+        with self.print_lock:
+            print(msg)
+
+    def submit(self, src_file: str, dst_file: str) -> None:
+        with self.batch_lock:
+            self.batch.append((src_file, dst_file))
+            if len(self.batch) < self.batch_size:
+                return
+            batch, self.batch = self.batch, []
+        self.run_batch(batch)
+
+    def close(self) -> dict[str, int]:
+        with self.batch_lock:
+            batch, self.batch = self.batch, []
+        if batch:
+            self.run_batch(batch)
+        self.pool.shutdown()
+        return self.status_counts
+
+    def make_dirs(self, dstdirs: Iterable[str]) -> None:
+        with self.created_dirs_lock:
+            new_dirs = sorted(set(dstdirs) - self.created_dirs)
+        for dstdir in new_dirs:
+            os.makedirs(dstdir, exist_ok=True)
+        with self.created_dirs_lock:
+            self.created_dirs.update(new_dirs)
+
+    def run_batch(self, batch: list[tuple[str, str]]) -> None:
+        dir_batches: dict[str, list[tuple[str, str]]] = {}
+        for src_file, dst_file in batch:
+            dir_batches.setdefault(os.path.dirname(dst_file), []).append(
+                (src_file, dst_file)
+            )
+        if not self.dryrun:
+            self.make_dirs(dir_batches)
+        for statuses in self.pool.map(self.link_dir_batch, dir_batches.items()):
+            self.count_statuses(statuses)
+
+    def link_dir_batch(self, dir_batch: tuple[str, list[tuple[str, str]]]) -> list[str]:
+        dstdir, items = dir_batch
+        dir_fd = None
+        if self.use_dir_fd and not self.dryrun:
+            try:
+                dir_fd = os.open(dstdir, os.O_RDONLY | os.O_DIRECTORY)
+            except OSError:
+                # Fall back to linking with full destination paths
+                dir_fd = None
+        try:
+            return [
+                self.link_one(src_file, dst_file, dir_fd)
+                for src_file, dst_file in items
+            ]
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+
+    def count_statuses(self, statuses: list[str]) -> None:
+        with self.status_counts_lock:
+            for status in statuses:
+                self.status_counts[status] += 1
+
+    def make_link(self, src_file: str, dst_name: str, dir_fd: int | None) -> None:
+        if self.symlink:
+            os.symlink(src_file, dst_name, dir_fd=dir_fd)
+        else:
+            # Hardlink a source symlink itself (like link(2)), not its target
+            os.link(src_file, dst_name, dst_dir_fd=dir_fd, follow_symlinks=False)
+
+    def link_one(self, src_file: str, dst_file: str, dir_fd: int | None = None) -> str:
+        dst_name = os.path.basename(dst_file) if dir_fd is not None else dst_file
+        try:
+            if self.dryrun:
+                if not os.path.lexists(dst_file):
+                    if self.verbose:
+                        self.log(f"LINKING: {src_file} --> {dst_file}")
+                    return "created"
+            else:
+                try:
+                    self.make_link(src_file, dst_name, dir_fd)
+                    if self.verbose:
+                        self.log(f"LINKING: {src_file} --> {dst_file}")
+                    return "created"
+                except FileExistsError:
+                    pass
+
+            try:
+                # A symlink points at the source, a hardlink is the source
+                dst_stat = os.stat(
+                    dst_name, dir_fd=dir_fd, follow_symlinks=self.symlink
+                )
+                src_stat = os.stat(src_file, follow_symlinks=self.symlink)
+                correct_link = (dst_stat.st_ino, dst_stat.st_dev) == (
+                    src_stat.st_ino,
+                    src_stat.st_dev,
+                )
+            except FileNotFoundError:
+                # Broken symlink
+                correct_link = False
+            if correct_link:
+                if self.verbose:
+                    self.log(f"Correct link already exists: {dst_file}")
+                return "already-correct"
+
+            if self.verbose:
+                action = "overwritten" if self.overwrite else "skipped"
+                self.log(
+                    "File already exists, but is not the correct link "
+                    f"and will be {action}: {dst_file}"
+                )
+            if not self.overwrite:
+                return "skipped"
+            if not self.dryrun:
+                os.unlink(dst_name, dir_fd=dir_fd)
+                self.make_link(src_file, dst_name, dir_fd)
+            if self.verbose:
+                self.log(f"LINKING: {src_file} --> {dst_file}")
+            return "replaced"
+
+        except OSError as e:
+            self.log(f"Failed to link {src_file} --> {dst_file}: {e}")
+            return "failed"
+
+
+# Set up by main()
+ARGV: list[str]
+VERBOSE: bool
+# Filename parts that replace the FLIST_[PREFIX/CONTAINS/SUFFIX] part of
+# file list entries
+LINK_FNAME_PREFIXES: list[str] | None
+LINK_FNAME_CONTAINS: list[str] | None
+LINK_FNAME_SUFFIXES: list[str] | None
+FILE_RULES: NameRules
+DIR_RULES: NameRules
+LINK_EXECUTOR: LinkExecutor
+
+
+def main() -> None:
     parser = argparse.ArgumentParser(
         description=(
             "Clone a file tree with links (recursively), "
@@ -353,6 +682,17 @@ def main():
         ),
     )
 
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=default_threads,
+        help=(
+            "Number of threads used to walk and link source subdirectories in parallel. "
+            "Value of 1 walks the tree sequentially."
+            " (default={})".format(default_threads)
+        ),
+    )
+
     parser.add_argument(
         "--silent",
         action="store_true",
@@ -372,7 +712,7 @@ def main():
     python_version = platform.python_version()
     if system not in system_choices:
         parser.error(
-            "Only supported system types are {}, " "but detected '{}'".format(
+            "Only supported system types are {}, but detected '{}'".format(
                 system_choices, system
             )
         )
@@ -380,11 +720,11 @@ def main():
     global FLIST_SRCDIR, FLIST_GLOB
     global GLOB_PREFIX, GLOB_SUFFIX
     global FLIST_PREFIX, FLIST_CONTAINS, FLIST_SUFFIX
-    global FNAME_PREFIX, FNAME_CONTAINS, FNAME_SUFFIX, FNAME_REPLACE
-    global DNAME_PREFIX, DNAME_CONTAINS, DNAME_SUFFIX, DNAME_REPLACE
+    global LINK_FNAME_PREFIXES, LINK_FNAME_CONTAINS, LINK_FNAME_SUFFIXES
     global DEPTH_LIMIT, COLLAPSE_TREE, TRANSPLANT_TREE
-    global CMD_RAW, LINK_FUNCTION, OVERWRITE, DRYRUN, VERBOSE
+    global LINK_EXECUTOR, OVERWRITE, DRYRUN, VERBOSE, THREADS
     global ARGV, DELIM
+    global FILE_RULES, DIR_RULES
 
     ARGV = sys.argv
 
@@ -401,14 +741,14 @@ def main():
     )
     DELIM = args.delim
     (
-        FNAME_PREFIX,
-        DNAME_PREFIX,
-        FNAME_CONTAINS,
-        DNAME_CONTAINS,
-        FNAME_SUFFIX,
-        DNAME_SUFFIX,
-        FNAME_REPLACE,
-        DNAME_REPLACE,
+        fname_prefixes,
+        dname_prefixes,
+        fname_contains,
+        dname_contains,
+        fname_suffixes,
+        dname_suffixes,
+        fname_replace_args,
+        dname_replace_args,
     ) = [
         s.split(DELIM) if s is not None else None
         for s in (
@@ -433,42 +773,65 @@ def main():
         parser.error("`depth` must be 'inf' (sans quotes) or a positive integer")
     OVERWRITE = args.overwrite
     DRYRUN = args.dryrun
+    THREADS = args.threads
+    if THREADS < 1:
+        parser.error("--threads must be a positive integer")
     VERBOSE = not args.silent
 
-    if FNAME_PREFIX is not None and ">" in FNAME_PREFIX[0]:
-        FLIST_PREFIX, FNAME_PREFIX[0] = FNAME_PREFIX[0].split(">")
-    if FNAME_CONTAINS is not None and ">" in FNAME_CONTAINS[0]:
-        FLIST_CONTAINS, FNAME_CONTAINS[0] = FNAME_CONTAINS[0].split(">")
-    if FNAME_SUFFIX is not None and ">" in FNAME_SUFFIX[0]:
-        FLIST_SUFFIX, FNAME_SUFFIX[0] = FNAME_SUFFIX[0].split(">")
+    if fname_prefixes is not None and ">" in fname_prefixes[0]:
+        FLIST_PREFIX, fname_prefixes[0] = fname_prefixes[0].split(">")
+    if fname_contains is not None and ">" in fname_contains[0]:
+        FLIST_CONTAINS, fname_contains[0] = fname_contains[0].split(">")
+    if fname_suffixes is not None and ">" in fname_suffixes[0]:
+        FLIST_SUFFIX, fname_suffixes[0] = fname_suffixes[0].split(">")
 
     if FLIST_GLOB:
         glob_chars = ["*", "?"]
         GLOB_PREFIX = ""
         GLOB_SUFFIX = ""
-        if FNAME_PREFIX is not None and len(FNAME_PREFIX) == 1:
+        if fname_prefixes is not None and len(fname_prefixes) == 1:
             for char in glob_chars:
-                if char in FNAME_PREFIX[0]:
-                    GLOB_PREFIX = FNAME_PREFIX[0]
-                    FNAME_PREFIX = None
+                if char in fname_prefixes[0]:
+                    GLOB_PREFIX = fname_prefixes[0]
+                    fname_prefixes = None
                     break
-        if FNAME_SUFFIX is not None and len(FNAME_SUFFIX) == 1:
+        if fname_suffixes is not None and len(fname_suffixes) == 1:
             for char in glob_chars:
-                if char in FNAME_SUFFIX[0]:
-                    GLOB_SUFFIX = FNAME_SUFFIX[0]
-                    FNAME_SUFFIX = None
+                if char in fname_suffixes[0]:
+                    GLOB_SUFFIX = fname_suffixes[0]
+                    fname_suffixes = None
                     break
-
-    if FNAME_REPLACE is not None:
-        for i, repl_str in enumerate(FNAME_REPLACE):
-            if ">" not in repl_str:
-                parser.error("--freplace argument must contain '>'")
-            FNAME_REPLACE[i] = repl_str.split(">")
-    if DNAME_REPLACE is not None:
-        for i, repl_str in enumerate(DNAME_REPLACE):
-            if ">" not in repl_str:
-                parser.error("--dreplace argument must contain '>'")
-            DNAME_REPLACE[i] = repl_str.split(">")
+    LINK_FNAME_PREFIXES = fname_prefixes
+    LINK_FNAME_CONTAINS = fname_contains
+    LINK_FNAME_SUFFIXES = fname_suffixes
+
+    fname_replace = None
+    if fname_replace_args is not None:
+        if not all(">" in repl_str for repl_str in fname_replace_args):
+            parser.error("--freplace argument must contain '>'")
+        fname_replace = [repl_str.split(">") for repl_str in fname_replace_args]
+    dname_replace = None
+    if dname_replace_args is not None:
+        if not all(">" in repl_str for repl_str in dname_replace_args):
+            parser.error("--dreplace argument must contain '>'")
+        dname_replace = [repl_str.split(">") for repl_str in dname_replace_args]
+
+    FILE_RULES = NameRules(
+        prefixes=fname_prefixes,
+        contains=fname_contains,
+        suffixes=fname_suffixes,
+        exclude_names=EXCLUDE_FNAMES,
+        exclude_paths=EXCLUDE_FPATHS,
+        replacements=fname_replace,
+    )
+    DIR_RULES = NameRules(
+        prefixes=dname_prefixes,
+        contains=dname_contains,
+        suffixes=dname_suffixes,
+        exclude_names=EXCLUDE_DNAMES,
+        exclude_paths=EXCLUDE_DPATHS,
+        replacements=dname_replace,
+    )
 
     # Validate arguments.
     if os.path.isdir(SRC):
@@ -498,34 +861,30 @@ def main():
     if args.hardlink and args.symlink:
         parser.error("--hardlink and --symlink options are mutually exclusive")
 
-    LINK_FUNCTION = None
-    try:
-        if args.hardlink:
-            LINK_FUNCTION = os.link
-        elif args.symlink:
-            LINK_FUNCTION = os.symlink
-    except AttributeError:
-        print(
-            "Python built-in link function is not available "
+    link_function_name = "link" if args.hardlink else "symlink"
+    if not hasattr(os, link_function_name):
+        raise SystemSupportError(
+            "Python built-in link function os.{}() is not available "
             "on this system ({}) and/or Python version ({})".format(
-                system, python_version
+                link_function_name, system, python_version
             )
         )
-        print("Falling back to external calls to system-level link command")
-    # Set syntax of linking command, to be evaluated before execution.
-    CMD_RAW = get_cmd(system, args)
+    LINK_EXECUTOR = LinkExecutor(
+        symlink=args.symlink,
+        overwrite=OVERWRITE,
+        dryrun=DRYRUN,
+        verbose=VERBOSE,
+        threads=THREADS,
+    )
 
     if not os.path.isdir(DSTDIR) and not DRYRUN:
         os.makedirs(DSTDIR)
 
     if os.path.isdir(SRC):
         if TRANSPLANT_TREE:
-            link_rootdir_name = os.path.basename(os.path.abspath(SRC))
-            if DNAME_REPLACE is not None:
-                for repl_item in DNAME_REPLACE:
-                    link_rootdir_name = link_rootdir_name.replace(
-                        repl_item[0], repl_item[1]
-                    )
+            link_rootdir_name = DIR_RULES.replace(
+                os.path.basename(os.path.abspath(SRC))
+            )
             link_rootdir = os.path.join(DSTDIR, link_rootdir_name)
             if not os.path.isdir(link_rootdir) and not DRYRUN:
                 os.makedirs(link_rootdir)
@@ -535,125 +894,81 @@ def main():
     elif os.path.isfile(SRC):
         link_flist(SRC, DSTDIR)
 
-
-def get_cmd(systype, args):
-    cmd = None
-
-    if systype == "Windows":
-        if args.hardlink:
-            cmd = r"r'mklink /h {0} {1}'.format(dst_file, src_file)"
-        elif args.symlink:
-            cmd = r"r'mklink {0} {1}'.format(dst_file, src_file)"
-
-    elif systype == "Linux":
-        if args.hardlink:
-            cmd = r"r'ln {0} {1}'.format(src_file, dst_file)"
-        elif args.symlink:
-            cmd = r"r'ln -s {0} {1}'.format(src_file, dst_file)"
-
-    elif LINK_FUNCTION is not None:
-        if args.hardlink:
-            cmd = r"r'Linking using built-in function: os.link({0} {1})'.format(src_file, dst_file)"
-        elif args.symlink:
-            cmd = r"r'Linking using built-in function: os.symlink({0} {1})'.format(src_file, dst_file)"
-
-    else:
-        raise SystemSupportError("Detected system type '{}' is not supported")
-
-    return cmd
-
-
-def link_file(src_file, dst_file):
-    if os.path.isfile(dst_file):
-        if os.stat(src_file).st_ino == os.stat(dst_file).st_ino:
-            if VERBOSE:
-                print("Correct link already exists: {}".format(dst_file))
-            return
-        else:
-            if VERBOSE:
-                print(
-                    "File already exists, but is not the correct link and will be {}: {}".format(
-                        "overwritten" if OVERWRITE else "skipped", dst_file
-                    )
+    status_counts = LINK_EXECUTOR.close()
+    if VERBOSE:
+        print(
+            "Link summary: {}".format(
+                ", ".join(
+                    "{}={}".format(status, status_counts[status])
+                    for status in LINK_STATUSES
                 )
-            if OVERWRITE:
-                os.remove(dst_file)
-            else:
-                return
-
-    if LINK_FUNCTION is None or DRYRUN or VERBOSE:
-        cmd = eval(CMD_RAW)
-        if DRYRUN or VERBOSE:
-            # print(cmd)
-            print("LINKING: {} --> {}".format(src_file, dst_file))
-    if not DRYRUN:
-        if LINK_FUNCTION is not None:
-            LINK_FUNCTION(src_file, dst_file)
-        else:
-            subprocess.call(cmd, shell=True)
-
-
-def link_dir(srcdir, dstdir, depth):
-    for dirent in os.listdir(srcdir):
-        src_dirent = os.path.join(srcdir, dirent)
-
-        name_replacements = (
-            DNAME_REPLACE if os.path.isdir(src_dirent) else FNAME_REPLACE
+            )
         )
-        dst_dirent_name = dirent
-        if name_replacements is not None:
-            for repl_item in name_replacements:
-                dst_dirent_name = dst_dirent_name.replace(repl_item[0], repl_item[1])
-        dst_dirent = os.path.join(dstdir, dst_dirent_name)
-
-        if os.path.isdir(src_dirent):
-            if (
-                depth < DEPTH_LIMIT
-                and (EXCLUDE_DNAMES is None or dirent not in EXCLUDE_DNAMES)
-                and (EXCLUDE_DPATHS is None or src_dirent not in EXCLUDE_DPATHS)
-                and (
-                    DNAME_PREFIX is None
-                    or True in (dirent.startswith(dp) for dp in DNAME_PREFIX)
-                )
-                and (
-                    DNAME_CONTAINS is None
-                    or True in (dc in dirent for dc in DNAME_CONTAINS)
-                )
-                and (
-                    DNAME_SUFFIX is None
-                    or True in (dirent.endswith(ds) for ds in DNAME_SUFFIX)
-                )
-            ):
-                # The directory entry is a subdirectory to traverse.
-                if COLLAPSE_TREE:
-                    dst_dirent = dstdir
-                elif not os.path.isdir(dst_dirent) and not DRYRUN:
-                    os.makedirs(dst_dirent)
-                link_dir(src_dirent, dst_dirent, depth + 1)
 
-        else:
-            if (
-                (EXCLUDE_FNAMES is None or dirent not in EXCLUDE_FNAMES)
-                and (EXCLUDE_FPATHS is None or src_dirent not in EXCLUDE_FPATHS)
-                and (
-                    FNAME_PREFIX is None
-                    or True in (dirent.startswith(fp) for fp in FNAME_PREFIX)
-                )
-                and (
-                    FNAME_CONTAINS is None
-                    or True in (fc in dirent for fc in FNAME_CONTAINS)
-                )
-                and (
-                    FNAME_SUFFIX is None
-                    or True in (dirent.endswith(fs) for fs in FNAME_SUFFIX)
-                )
-            ):
+
+def link_file(src_file: str, dst_file: str) -> None:
+    LINK_EXECUTOR.submit(src_file, dst_file)
+
+
+def link_dir(srcdir: str, dstdir: str, depth: int) -> None:
+    if THREADS <= 1:
+        for subdir_args in link_dir_entries(srcdir, dstdir, depth):
+            link_dir(*subdir_args)
+        return
+
+    # Each task links the files of one directory and hands back its
+    # subdirectories, which are submitted as new tasks so that no worker
+    # ever blocks waiting on another.
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        pending = {executor.submit(link_dir_entries, srcdir, dstdir, depth)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for subdir_args in future.result():
+                    pending.add(executor.submit(link_dir_entries, *subdir_args))
+
+
+def link_dir_entries(
+    srcdir: str, dstdir: str, depth: int
+) -> list[tuple[str, str, int]]:
+    subdirs = []
+
+    with os.scandir(srcdir) as dirents:
+        for entry in dirents:
+            dirent = entry.name
+            src_dirent = entry.path
+            # DirEntry caches the file type from the directory read,
+            # so this doesn't cost a stat call on most filesystems.
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                # DEPTH_LIMIT is an int, or "inf" (as configured) / float("inf")
+                if depth < float(DEPTH_LIMIT) and DIR_RULES.matches(dirent, src_dirent):
+                    # The directory entry is a subdirectory to traverse.
+                    if COLLAPSE_TREE:
+                        dst_dirent = dstdir
+                    else:
+                        dst_dirent = os.path.join(dstdir, DIR_RULES.replace(dirent))
+                        if not DRYRUN:
+                            try:
+                                os.makedirs(dst_dirent)
+                            except FileExistsError:
+                                pass
+                    subdirs.append((src_dirent, dst_dirent, depth + 1))
+
+            elif FILE_RULES.matches(dirent, src_dirent):
                 # The directory entry is a file to link.
-                link_file(src_dirent, dst_dirent)
+                link_file(src_dirent, os.path.join(dstdir, FILE_RULES.replace(dirent)))
+
+    return subdirs
 
 
-def link_flist(flist, dstdir):
+def link_flist(flist: str, dstdir: str) -> None:
     dstdir_orig = dstdir
+    src_index = DirNameIndex()
 
     with open(flist, "r") as flist_fp:
         for line_num, line in enumerate(flist_fp):
@@ -677,24 +992,7 @@ def link_flist(flist, dstdir):
             txt_dpath, txt_fname = os.path.split(txt_fpath)
             txt_dname = os.path.basename(txt_dpath)
 
-            if (
-                (EXCLUDE_DNAMES is None or txt_dname not in EXCLUDE_DNAMES)
-                and (EXCLUDE_DPATHS is None or txt_dpath not in EXCLUDE_DPATHS)
-                and (
-                    DNAME_PREFIX is None
-                    or True in (txt_dname.startswith(dp) for dp in DNAME_PREFIX)
-                )
-                and (
-                    DNAME_CONTAINS is None
-                    or True in (dc in txt_dname for dc in DNAME_CONTAINS)
-                )
-                and (
-                    DNAME_SUFFIX is None
-                    or True in (txt_dname.endswith(ds) for ds in DNAME_SUFFIX)
-                )
-            ):
-                pass
-            else:
+            if not DIR_RULES.matches(txt_dname, txt_dpath):
                 continue
 
             if txt_fname == "":
@@ -702,12 +1000,11 @@ def link_flist(flist, dstdir):
                 if FLIST_GLOB:
                     src_dirs_glob = []
                     for dir_pattern in src_dirs:
-                        src_dirs_glob.extend(
-                            [d for d in glob.glob(dir_pattern) if os.path.isdir(d)]
-                        )
+                        src_dirs_glob.extend(src_index.glob(dir_pattern, dirs=True))
                     src_dirs = src_dirs_glob
-                    if EXCLUDE_DPATHS is not None:
-                        src_dirs = [d for d in src_dirs if d not in EXCLUDE_DPATHS]
+                    src_dirs = [
+                        d for d in src_dirs if not DIR_RULES.is_excluded_path(d)
+                    ]
                     if not src_dirs_glob:
                         print(
                             "Glob for directory path pattern '{}' returned 0 matching directories".format(
@@ -724,7 +1021,7 @@ def link_flist(flist, dstdir):
                     # if DRYRUN:
                     #     print(cmd)
                     # subprocess.call(cmd, shell=True)
-                    if not os.path.isdir(d):
+                    if not src_index.isdir(d):
                         print(
                             "Source file list line {}: "
                             "Missing source directory '{}', skipping".format(
@@ -733,14 +1030,9 @@ def link_flist(flist, dstdir):
                         )
                         continue
                     if TRANSPLANT_TREE:
-                        link_rootdir_name = os.path.basename(
-                            os.path.normpath(os.path.abspath(d))
+                        link_rootdir_name = DIR_RULES.replace(
+                            os.path.basename(os.path.normpath(os.path.abspath(d)))
                         )
-                        if DNAME_REPLACE is not None:
-                            for repl_item in DNAME_REPLACE:
-                                link_rootdir_name = link_rootdir_name.replace(
-                                    repl_item[0], repl_item[1]
-                                )
                         link_rootdir = os.path.join(dstdir, link_rootdir_name)
                         if not os.path.isdir(link_rootdir) and not DRYRUN:
                             os.makedirs(link_rootdir)
@@ -760,9 +1052,9 @@ def link_flist(flist, dstdir):
                     )
                     continue
                 txt_fname_suff = txt_fname[repl_index + len(FLIST_PREFIX) :]
-                if FNAME_PREFIX is not None:
+                if LINK_FNAME_PREFIXES is not None:
                     src_fnames = [
-                        link_pref + txt_fname_suff for link_pref in FNAME_PREFIX
+                        link_pref + txt_fname_suff for link_pref in LINK_FNAME_PREFIXES
                     ]
                 else:
                     src_fnames = [txt_fname_suff]
@@ -778,9 +1070,9 @@ def link_flist(flist, dstdir):
                     )
                     continue
                 txt_fname_pref = txt_fname[:repl_index]
-                if FNAME_SUFFIX is not None:
+                if LINK_FNAME_SUFFIXES is not None:
                     src_fnames = [
-                        txt_fname_pref + link_suff for link_suff in FNAME_SUFFIX
+                        txt_fname_pref + link_suff for link_suff in LINK_FNAME_SUFFIXES
                     ]
                 else:
                     src_fnames = [txt_fname_pref]
@@ -788,7 +1080,7 @@ def link_flist(flist, dstdir):
             elif FLIST_CONTAINS is not None:
                 src_fnames = [
                     txt_fname.replace(FLIST_CONTAINS, link_cont)
-                    for link_cont in FNAME_CONTAINS
+                    for link_cont in LINK_FNAME_CONTAINS or []
                 ]
 
             else:
@@ -801,7 +1093,7 @@ def link_flist(flist, dstdir):
                         os.path.join(txt_dpath, GLOB_PREFIX + fname + GLOB_SUFFIX)
                         for fname in src_fnames
                     ]:
-                        src_files_glob = glob.glob(file_pattern)
+                        src_files_glob = src_index.glob(file_pattern)
                         if not src_files_glob:
                             print(
                                 "Glob for file path pattern '{}' returned 0 matching files".format(
@@ -812,30 +1104,17 @@ def link_flist(flist, dstdir):
                             src_files.extend(src_files_glob)
                 else:
                     src_files = [os.path.join(txt_dpath, fname) for fname in src_fnames]
-                if EXCLUDE_FPATHS is not None:
-                    src_files = [f for f in src_files if f not in EXCLUDE_FPATHS]
+                src_files = [f for f in src_files if not FILE_RULES.is_excluded_path(f)]
                 src_fnames = [os.path.basename(f) for f in src_files]
 
             src_files = [
                 os.path.join(txt_dpath, src_fname)
                 for src_fname in src_fnames
-                if (
-                    (EXCLUDE_FNAMES is None or src_fname not in EXCLUDE_FNAMES)
-                    and (
-                        FNAME_PREFIX is None
-                        or FLIST_PREFIX is not None
-                        or True in (src_fname.startswith(fp) for fp in FNAME_PREFIX)
-                    )
-                    and (
-                        FNAME_CONTAINS is None
-                        or FLIST_CONTAINS is not None
-                        or True in (fc in src_fname for fc in FNAME_CONTAINS)
-                    )
-                    and (
-                        FNAME_SUFFIX is None
-                        or FLIST_SUFFIX is not None
-                        or True in (src_fname.endswith(fs) for fs in FNAME_SUFFIX)
-                    )
+                if FILE_RULES.matches(
+                    src_fname,
+                    check_prefix=FLIST_PREFIX is None,
+                    check_contains=FLIST_CONTAINS is None,
+                    check_suffix=FLIST_SUFFIX is None,
                 )
             ]
             if len(src_files) == 0:
@@ -843,7 +1122,7 @@ def link_flist(flist, dstdir):
 
             missing_component = False
             for f in src_files:
-                if not os.path.isfile(f):
+                if not src_index.isfile(f):
                     missing_component = True
                     print(
                         "Source file list line {}: "
@@ -859,16 +1138,12 @@ def link_flist(flist, dstdir):
                 continue
 
             for src_dirent in src_files:
-                if not os.path.isfile(src_dirent):
+                if not src_index.isfile(src_dirent):
                     continue
 
-                dst_dirent_name = os.path.basename(src_dirent)
-                if FNAME_REPLACE is not None:
-                    for repl_item in FNAME_REPLACE:
-                        dst_dirent_name = dst_dirent_name.replace(
-                            repl_item[0], repl_item[1]
-                        )
-                dst_dirent = os.path.join(dstdir, dst_dirent_name)
+                dst_dirent = os.path.join(
+                    dstdir, FILE_RULES.replace(os.path.basename(src_dirent))
+                )
 
                 link_file(src_dirent, dst_dirent)
 
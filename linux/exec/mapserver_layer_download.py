@@ -1,17 +1,620 @@
 #!/usr/bin/env python
 
+import http.client
 import json
+import logging
 import os
-import urllib.request
+import shutil
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from enum import Enum
 from itertools import count
 from pathlib import Path
+from queue import Empty, LifoQueue
+from typing import Any, Self
+from urllib.parse import urlencode, urlsplit
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
-from shapely.geometry import box
+import pyarrow.parquet as pq
+import shapely
+from numpy.typing import NDArray
 
+from geo_output import SpatialSortMethod
+from merge_vector import merge_vector_files
 from typer import run
 
+logger = logging.getLogger(__name__)
+
+
+RETRY_HTTP_STATUS_CODES = (429, 500, 502, 503, 504)
+CHECKPOINT_FILENAME = "checkpoint.json"
+DEFAULT_MAX_TILE_DEPTH = 16
+
+
+class DownloadStrategy(str, Enum):
+    OFFSET = "offset"
+    TILES = "tiles"
+
+
+class LayerRequestError(Exception):
+    pass
+
+
+class LayerQueryClient:
+    """
+    Send GET requests to a map server over a bounded pool of keep-alive
+    connections that can be shared between worker threads, retrying failed
+    requests with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        layer_url: str,
+        max_connections: int = 4,
+        max_retries: int = 5,
+        retry_backoff_seconds: float = 1.0,
+        timeout_seconds: float = 120,
+    ) -> None:
+        url_parts = urlsplit(layer_url.rstrip("/"))
+        if url_parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported layer URL scheme: {url_parts.scheme}")
+        self.scheme = url_parts.scheme
+        self.netloc = url_parts.netloc
+        self.layer_path = url_parts.path
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self._idle_connections: LifoQueue[http.client.HTTPConnection] = LifoQueue()
+        self._connection_slots = threading.BoundedSemaphore(max_connections)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.netloc, timeout=self.timeout_seconds
+            )
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout_seconds)
+
+    def _acquire_connection(self) -> http.client.HTTPConnection:
+        self._connection_slots.acquire()
+        try:
+            return self._idle_connections.get_nowait()
+        except Empty:
+            return self._new_connection()
+
+    def _release_connection(self, conn: http.client.HTTPConnection | None) -> None:
+        if conn is not None:
+            self._idle_connections.put(conn)
+        self._connection_slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle_connections.get_nowait().close()
+            except Empty:
+                break
+
+    def get(self, path_suffix: str = "", params: dict[str, Any] | None = None) -> bytes:
+        url = f"{self.layer_path}{path_suffix}"
+        if params:
+            url = f"{url}?{urlencode(params)}"
+
+        conn: http.client.HTTPConnection | None
+        for attempt in range(self.max_retries + 1):
+            conn = self._acquire_connection()
+            try:
+                conn.request("GET", url, headers={"Connection": "keep-alive"})
+                resp = conn.getresponse()
+                body = resp.read()
+                if resp.status in RETRY_HTTP_STATUS_CODES:
+                    raise LayerRequestError(
+                        f"HTTP {resp.status} {resp.reason} for request: {url}"
+                    )
+                if resp.status >= 400:
+                    self._release_connection(conn)
+                    conn = None
+                    raise ValueError(
+                        f"HTTP {resp.status} {resp.reason} for request: {url}"
+                    )
+                if resp.will_close:
+                    conn.close()
+                    conn = None
+                self._release_connection(conn)
+                return body
+            except (http.client.HTTPException, OSError, LayerRequestError) as exc:
+                if conn is not None:
+                    conn.close()
+                self._release_connection(None)
+                if attempt == self.max_retries:
+                    raise LayerRequestError(
+                        f"Request failed after {attempt + 1} attempts: {url}"
+                    ) from exc
+                backoff_seconds = self.retry_backoff_seconds * 2**attempt
+                logger.warning(
+                    f"Request failed ({exc}), retrying in {backoff_seconds}s: {url}"
+                )
+                time.sleep(backoff_seconds)
+
+        raise AssertionError("unreachable")
+
+    def get_json(
+        self, path_suffix: str = "", params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        data = json.loads(self.get(path_suffix, params))
+        if "error" in data:
+            raise LayerRequestError(
+                f"Map server returned error for request {path_suffix} {params}: {data['error']}"
+            )
+        return data
+
+
+def get_layer_record_count(client: LayerQueryClient) -> int | None:
+    """
+    Ask the layer for its total record count, falling back to the length of
+    the object ID list for servers that don't support `returnCountOnly`.
+    """
+    base_params = {"f": "json", "where": "1=1"}
+    try:
+        return int(
+            client.get_json("/query", {**base_params, "returnCountOnly": "true"})[
+                "count"
+            ]
+        )
+    except (LayerRequestError, KeyError, ValueError):
+        logger.warning(
+            "Layer query with 'returnCountOnly' failed, trying 'returnIdsOnly'"
+        )
+    try:
+        return len(
+            client.get_json("/query", {**base_params, "returnIdsOnly": "true"})[
+                "objectIds"
+            ]
+            or []
+        )
+    except (LayerRequestError, KeyError, ValueError, TypeError):
+        logger.warning(
+            "Layer query with 'returnIdsOnly' failed, falling back to paging until an empty page"
+        )
+    return None
+
+
+def get_float_column(gdf: gpd.GeoDataFrame, field_name: str) -> NDArray[np.float64]:
+    return pd.to_numeric(gdf[field_name], errors="coerce").to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+
+
+def get_object_column(gdf: gpd.GeoDataFrame, field_name: str) -> NDArray[np.object_]:
+    # Shapely only accepts None, not NaN, for missing values
+    values = gdf[field_name].to_numpy(dtype=object, copy=True)
+    values[pd.isna(values)] = None
+    return values
+
+
+def build_geometry_from_columns(
+    gdf: gpd.GeoDataFrame,
+    xmin_ymin_xmax_ymax_fields: tuple[str, str, str, str] | None = None,
+    x_y_fields: tuple[str, str] | None = None,
+    wkt_field: str | None = None,
+    wkb_field: str | None = None,
+) -> gpd.GeoSeries:
+    """
+    Construct feature geometries from attribute columns with vectorized
+    shapely functions, from either bounding box coordinate fields, point
+    coordinate fields, or a WKT/WKB field.
+    Records with missing or invalid values get empty/null geometries.
+    """
+    if xmin_ymin_xmax_ymax_fields:
+        geoms = shapely.box(
+            *(get_float_column(gdf, field) for field in xmin_ymin_xmax_ymax_fields)
+        )
+    elif x_y_fields:
+        geoms = shapely.points(*(get_float_column(gdf, field) for field in x_y_fields))
+    elif wkt_field:
+        geoms = shapely.from_wkt(get_object_column(gdf, wkt_field), on_invalid="warn")
+    elif wkb_field:
+        wkb_values = get_object_column(gdf, wkb_field)
+        geoms = shapely.from_wkb(
+            [bytes.fromhex(v) if isinstance(v, str) else v for v in wkb_values],
+            on_invalid="warn",
+        )
+    else:
+        raise ValueError("No geometry source fields were provided")
+    return gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs)
+
+
+def query_features(
+    client: LayerQueryClient,
+    record_offset_idx: int,
+    records_chunk_size: int,
+    order_by_field: str = "",
+    extra_params: dict[str, Any] | None = None,
+) -> tuple[gpd.GeoDataFrame, bool]:
+    """
+    Query one page of features, returning the page and whether the server
+    reported that more records matched than it returned.
+    """
+    data = client.get_json(
+        "/query",
+        {
+            "f": "geojson",
+            "resultOffset": record_offset_idx,
+            "resultRecordCount": records_chunk_size,
+            "where": "1=1",
+            "orderByFields": order_by_field,
+            "outFields": "*",
+            "returnGeometry": "false",
+            "spatialRel": "esriSpatialRelIntersects",
+            **(extra_params or {}),
+        },
+    )
+    features = data.get("features", [])
+    # The GeoJSON response carries the flag under "properties", the JSON response at the top level
+    exceeded_transfer_limit = bool(
+        data.get("exceededTransferLimit")
+        or (data.get("properties") or {}).get("exceededTransferLimit")
+    )
+    return gpd.GeoDataFrame.from_features(features), exceeded_transfer_limit
+
+
+def get_features_page(
+    client: LayerQueryClient,
+    record_offset_idx: int,
+    records_chunk_size: int,
+    order_by_field: str = "",
+) -> gpd.GeoDataFrame:
+    gdf, _ = query_features(
+        client, record_offset_idx, records_chunk_size, order_by_field
+    )
+    return gdf
+
+
+def map_ordered(
+    func: Callable[[int], gpd.GeoDataFrame],
+    items: Iterable[int],
+    max_workers: int = 4,
+) -> Iterator[tuple[int, gpd.GeoDataFrame]]:
+    """
+    Like `executor.map`, yielding (item, result) pairs in submission order,
+    but with only a bounded number of requests in flight so that results
+    don't pile up in memory ahead of a slow page.
+    """
+    max_pending = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: deque[tuple[int, Future[gpd.GeoDataFrame]]] = deque()
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            if len(pending) >= max_pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+
+
+def iter_features_pages(
+    client: LayerQueryClient,
+    records_chunk_size: int,
+    record_count: int | None,
+    order_by_field: str = "",
+    max_workers: int = 4,
+    skip_offsets: set[int] | None = None,
+) -> Iterator[tuple[int, gpd.GeoDataFrame]]:
+    """
+    Yield (record offset, page) pairs in offset order, skipping any offsets
+    in `skip_offsets`. If the total record count is known, pages are fetched
+    concurrently.
+    """
+    skip_offsets = skip_offsets or set()
+
+    def get_page(record_offset_idx: int) -> gpd.GeoDataFrame:
+        return get_features_page(
+            client, record_offset_idx, records_chunk_size, order_by_field
+        )
+
+    if record_count is None:
+        for record_offset_idx in count(0, records_chunk_size):
+            if record_offset_idx in skip_offsets:
+                continue
+            gdf = get_page(record_offset_idx)
+            if gdf.empty:
+                break
+            yield record_offset_idx, gdf
+        return
+
+    yield from map_ordered(
+        get_page,
+        (
+            record_offset_idx
+            for record_offset_idx in range(0, record_count, records_chunk_size)
+            if record_offset_idx not in skip_offsets
+        ),
+        max_workers=max_workers,
+    )
+
+
+class MapTile:
+    """
+    Node of a quadtree over the layer extent, identified by its path of
+    quadrant digits from the root tile.
+    """
+
+    def __init__(
+        self, xmin: float, ymin: float, xmax: float, ymax: float, path: str = ""
+    ) -> None:
+        self.xmin = xmin
+        self.ymin = ymin
+        self.xmax = xmax
+        self.ymax = ymax
+        self.path = path
+
+    @property
+    def key(self) -> str:
+        return f"tile-{self.path or 'root'}"
+
+    @property
+    def depth(self) -> int:
+        return len(self.path)
+
+    def children(self) -> list["MapTile"]:
+        xmid = (self.xmin + self.xmax) / 2
+        ymid = (self.ymin + self.ymax) / 2
+        return [
+            MapTile(self.xmin, ymid, xmid, self.ymax, f"{self.path}0"),
+            MapTile(xmid, ymid, self.xmax, self.ymax, f"{self.path}1"),
+            MapTile(self.xmin, self.ymin, xmid, ymid, f"{self.path}2"),
+            MapTile(xmid, self.ymin, self.xmax, ymid, f"{self.path}3"),
+        ]
+
+    def envelope_params(
+        self, spatial_reference: dict[str, Any] | None
+    ) -> dict[str, Any]:
+        params: dict[str, Any] = {
+            "geometry": f"{self.xmin},{self.ymin},{self.xmax},{self.ymax}",
+            "geometryType": "esriGeometryEnvelope",
+        }
+        if spatial_reference:
+            params["inSR"] = json.dumps(spatial_reference)
+        return params
+
+
+def get_tile_features(
+    client: LayerQueryClient,
+    tile: MapTile,
+    spatial_reference: dict[str, Any] | None,
+    records_chunk_size: int,
+    order_by_field: str = "",
+    max_tile_depth: int = DEFAULT_MAX_TILE_DEPTH,
+) -> tuple[gpd.GeoDataFrame, bool]:
+    """
+    Query all features intersecting a tile, returning the features and
+    whether the tile holds too many records and should be split instead.
+    Tiles at the maximum depth are never split, and are paged through by
+    offset within the tile envelope.
+    """
+    envelope_params = tile.envelope_params(spatial_reference)
+    gdf, exceeded_transfer_limit = query_features(
+        client, 0, records_chunk_size, order_by_field, extra_params=envelope_params
+    )
+    if not (exceeded_transfer_limit or len(gdf) >= records_chunk_size):
+        return gdf, False
+    if tile.depth < max_tile_depth:
+        return gdf, True
+
+    logger.warning(
+        f"Tile {tile.key} still exceeds the record limit at max depth, paging within the tile"
+    )
+    pages = [gdf]
+    for record_offset_idx in count(records_chunk_size, records_chunk_size):
+        page_gdf, _ = query_features(
+            client,
+            record_offset_idx,
+            records_chunk_size,
+            order_by_field,
+            extra_params=envelope_params,
+        )
+        if page_gdf.empty:
+            break
+        pages.append(page_gdf)
+    return pd.concat(pages, ignore_index=True), False
+
+
+def iter_tile_pages(
+    client: LayerQueryClient,
+    root_tile: MapTile,
+    spatial_reference: dict[str, Any] | None,
+    records_chunk_size: int,
+    order_by_field: str = "",
+    max_workers: int = 4,
+    max_tile_depth: int = DEFAULT_MAX_TILE_DEPTH,
+    skip_keys: set[str] | None = None,
+    split_keys: set[str] | None = None,
+) -> Iterator[tuple[MapTile, gpd.GeoDataFrame | None]]:
+    """
+    Walk a quadtree of envelope queries over the layer extent, fetching
+    tiles concurrently and splitting any tile that hits the server record
+    limit into its four children.
+    Yields (tile, features) for each leaf tile and (tile, None) for each
+    tile that was split. Tiles in `skip_keys` are skipped, and tiles in
+    `split_keys` are split without being fetched again.
+    """
+    skip_keys = skip_keys or set()
+    split_keys = split_keys or set()
+    max_pending = max_workers * 2
+
+    def get_tile(tile: MapTile) -> tuple[gpd.GeoDataFrame, bool]:
+        return get_tile_features(
+            client,
+            tile,
+            spatial_reference,
+            records_chunk_size,
+            order_by_field,
+            max_tile_depth,
+        )
+
+    pending_tiles: deque[MapTile] = deque([root_tile])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures: dict[Future[tuple[gpd.GeoDataFrame, bool]], MapTile] = {}
+        while pending_tiles or futures:
+            while pending_tiles and len(futures) < max_pending:
+                tile = pending_tiles.popleft()
+                if tile.key in split_keys:
+                    pending_tiles.extend(tile.children())
+                elif tile.key not in skip_keys:
+                    futures[executor.submit(get_tile, tile)] = tile
+            if not futures:
+                continue
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                tile = futures.pop(future)
+                gdf, split_tile = future.result()
+                if split_tile:
+                    pending_tiles.extend(tile.children())
+                    yield tile, None
+                else:
+                    yield tile, gdf
+
+
+def get_layer_root_tile(
+    layer_data: dict[str, Any],
+) -> tuple[MapTile, dict[str, Any] | None]:
+    try:
+        extent = layer_data["extent"]
+        root_tile = MapTile(
+            float(extent["xmin"]),
+            float(extent["ymin"]),
+            float(extent["xmax"]),
+            float(extent["ymax"]),
+        )
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError("Layer has no usable extent for tiled download") from exc
+    return root_tile, extent.get("spatialReference")
+
+
+class DownloadCheckpoint:
+    """
+    Record which pages (by offset) or tiles of a layer download have already
+    been written to part files in the staging directory, so an interrupted
+    download can resume where it stopped.
+    """
+
+    def __init__(
+        self,
+        staging_dir: Path,
+        layer_url: str,
+        records_chunk_size: int,
+        strategy: DownloadStrategy = DownloadStrategy.OFFSET,
+    ) -> None:
+        self.staging_dir = Path(staging_dir)
+        self.checkpoint_path = self.staging_dir / CHECKPOINT_FILENAME
+        self.layer_url = layer_url
+        self.records_chunk_size = records_chunk_size
+        self.strategy = DownloadStrategy(strategy)
+        self.completed_keys: set[str] = set()
+        self.split_keys: set[str] = set()
+
+    def load(self) -> None:
+        """
+        Load completed parts from an existing checkpoint for the same layer,
+        page size and strategy, otherwise start over with an empty staging
+        directory.
+        """
+        try:
+            data = json.loads(self.checkpoint_path.read_text())
+            if (
+                data["layer_url"] == self.layer_url
+                and data["records_chunk_size"] == self.records_chunk_size
+                and data.get("strategy", DownloadStrategy.OFFSET.value)
+                == self.strategy.value
+            ):
+                self.completed_keys = set(data["completed_keys"])
+                self.split_keys = set(data.get("split_keys", []))
+                logger.info(
+                    f"Resuming download with {len(self.completed_keys)} parts already completed"
+                )
+                return
+            logger.warning(
+                f"Existing checkpoint does not match this download, starting over: {self.checkpoint_path}"
+            )
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, KeyError):
+            logger.warning(
+                f"Cannot read existing checkpoint, starting over: {self.checkpoint_path}"
+            )
+
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        self.staging_dir.mkdir(parents=True)
+        self.completed_keys = set()
+        self.split_keys = set()
+
+    def save(self) -> None:
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "layer_url": self.layer_url,
+                    "records_chunk_size": self.records_chunk_size,
+                    "strategy": self.strategy.value,
+                    "completed_keys": sorted(self.completed_keys),
+                    "split_keys": sorted(self.split_keys),
+                }
+            )
+        )
+        os.replace(tmp_path, self.checkpoint_path)
+
+    @staticmethod
+    def offset_key(record_offset_idx: int) -> str:
+        return f"{record_offset_idx:012d}"
+
+    @property
+    def completed_offsets(self) -> set[int]:
+        return {int(key) for key in self.completed_keys if key.isdigit()}
+
+    def part_path(self, part_key: str) -> Path:
+        return self.staging_dir / f"part-{part_key}.parquet"
+
+    def write_part(self, part_key: str, gdf: gpd.GeoDataFrame) -> None:
+        if not gdf.empty:
+            part_path = self.part_path(part_key)
+            tmp_path = part_path.with_suffix(".tmp")
+            gdf.to_parquet(str(tmp_path))
+            os.replace(tmp_path, part_path)
+        self.completed_keys.add(part_key)
+        self.save()
+
+    def mark_split(self, part_key: str) -> None:
+        self.split_keys.add(part_key)
+        self.save()
+
+    def completed_part_paths(self) -> list[Path]:
+        return [
+            self.part_path(part_key)
+            for part_key in sorted(self.completed_keys)
+            if self.part_path(part_key).is_file()
+        ]
+
+    def read_completed_values(self, field_name: str) -> set[Any]:
+        values: set[Any] = set()
+        for part_path in self.completed_part_paths():
+            if field_name in pq.read_schema(str(part_path)).names:
+                values.update(
+                    pq.read_table(str(part_path), columns=[field_name])
+                    .column(0)
+                    .to_pylist()
+                )
+        return values
+
 
 def mapserver_layer_download(
     layer_url: str,
@@ -20,12 +623,56 @@ def mapserver_layer_download(
     epsg_code: int | None = None,
     records_chunk_size: int | None = None,
     xmin_ymin_xmax_ymax_fields: tuple[str, str, str, str] | None = None,
+    x_y_fields: tuple[str, str] | None = None,
+    wkt_field: str | None = None,
+    wkb_field: str | None = None,
+    strategy: DownloadStrategy = DownloadStrategy.OFFSET,
+    max_tile_depth: int = DEFAULT_MAX_TILE_DEPTH,
+    spatial_sort: SpatialSortMethod | None = None,
+    write_bbox_covering: bool = False,
+    row_group_size: int | None = None,
+    partition_by: str | None = None,
+    max_workers: int = 4,
+    max_retries: int = 5,
+    retry_backoff_seconds: float = 1.0,
+    keep_staging_dir: bool = False,
 ) -> Path:
+    """
+    Download all records of a map server layer to a vector file.
+    Each page is written to a Parquet part file in a staging directory next
+    to the output path as soon as it arrives, and its offset is recorded in
+    a checkpoint file there. Rerunning an interrupted download resumes from
+    the checkpoint, and the part files are streamed into the final output,
+    except with a spatial sort or partitioning, which need the whole layer
+    in memory.
+    Feature geometries can be built from attribute fields holding bounding
+    box coordinates, point coordinates, or WKT/WKB (hex string or bytes).
+    With the "tiles" strategy, the layer extent is split into a quadtree of
+    envelope queries instead of paging by offset, subdividing any tile that
+    hits the server record limit, and features that intersect more than one
+    tile are de-duplicated by object ID.
+    """
+    geometry_source_args = (
+        xmin_ymin_xmax_ymax_fields,
+        x_y_fields,
+        wkt_field,
+        wkb_field,
+    )
+    if sum(bool(arg) for arg in geometry_source_args) > 1:
+        raise ValueError(
+            "Only one of 'xmin_ymin_xmax_ymax_fields', 'x_y_fields', 'wkt_field', 'wkb_field' may be provided"
+        )
+
     layer_url = layer_url.rstrip("/")
     output_path = Path(output_path)
 
-    with urllib.request.urlopen(f"{layer_url}?f=pjson") as req:  # noqa: S310
-        layer_data = json.load(req)
+    with LayerQueryClient(
+        layer_url,
+        max_connections=max_workers,
+        max_retries=max_retries,
+        retry_backoff_seconds=retry_backoff_seconds,
+    ) as client:
+        layer_data = client.get_json("", {"f": "pjson"})
 
         if output_path.is_dir():
             output_path = output_path / f"{layer_data['name']}{output_path_default_ext}"
@@ -39,30 +686,102 @@ def mapserver_layer_download(
         if records_chunk_size is None and "maxRecordCount" in layer_data:
             records_chunk_size = int(layer_data["maxRecordCount"])
 
-    if records_chunk_size is None:
-        records_chunk_size = 1000
-
-    gdf_list = []
-    for record_offset_idx in count(0, records_chunk_size):
-        get_features_url = f"{layer_url}/query?f=geojson&resultOffset={record_offset_idx}&resultRecordCount={records_chunk_size}&where=1%3D1&orderByFields=&outFields=*&returnGeometry=false&spatialRel=esriSpatialRelIntersects"
-        gdf = gpd.read_file(urllib.request.urlopen(get_features_url))  # noqa: S310
-        if gdf.empty:
-            break
-        gdf_list.append(gdf)
+        if records_chunk_size is None:
+            records_chunk_size = 1000
 
-    gdf = pd.concat(gdf_list).pipe(gpd.GeoDataFrame)
-    if epsg_code is not None:
-        gdf.set_crs(epsg=epsg_code, inplace=True, allow_override=True)
+        # Pages must come back in a stable order for offsets to be consistent
+        # between concurrent requests
+        order_by_field = layer_data.get("objectIdField") or ""
 
-    if xmin_ymin_xmax_ymax_fields:
-        gdf["geometry"] = gdf.apply(
-            lambda row: box(*row[list(xmin_ymin_xmax_ymax_fields)]), axis=1
+        checkpoint = DownloadCheckpoint(
+            output_path.with_name(f"{output_path.name}.parts"),
+            layer_url,
+            records_chunk_size,
+            strategy=strategy,
         )
+        checkpoint.load()
 
-    if str(output_path).lower().endswith((".parquet", ".geoparquet")):
-        gdf.to_parquet(str(output_path))
-    else:
-        gdf.to_file(str(output_path))
+        def prepare_page(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+            if gdf.empty:
+                return gdf
+            if epsg_code is not None:
+                gdf.set_crs(epsg=epsg_code, inplace=True, allow_override=True)
+            if any(geometry_source_args):
+                gdf = gdf.set_geometry(
+                    build_geometry_from_columns(
+                        gdf,
+                        xmin_ymin_xmax_ymax_fields=xmin_ymin_xmax_ymax_fields,
+                        x_y_fields=x_y_fields,
+                        wkt_field=wkt_field,
+                        wkb_field=wkb_field,
+                    )
+                )
+            return gdf
+
+        if strategy == DownloadStrategy.TILES:
+            root_tile, spatial_reference = get_layer_root_tile(layer_data)
+            if not order_by_field:
+                logger.warning(
+                    "Layer has no object ID field, features on tile edges will not be de-duplicated"
+                )
+            seen_object_ids = (
+                checkpoint.read_completed_values(order_by_field)
+                if order_by_field
+                else set()
+            )
+
+            for tile, gdf in iter_tile_pages(
+                client,
+                root_tile,
+                spatial_reference,
+                records_chunk_size,
+                order_by_field=order_by_field,
+                max_workers=max_workers,
+                max_tile_depth=max_tile_depth,
+                skip_keys=checkpoint.completed_keys,
+                split_keys=checkpoint.split_keys,
+            ):
+                if gdf is None:
+                    checkpoint.mark_split(tile.key)
+                    continue
+                if order_by_field in gdf.columns:
+                    gdf = gdf[~gdf[order_by_field].isin(seen_object_ids)]
+                    seen_object_ids.update(gdf[order_by_field].tolist())
+                checkpoint.write_part(tile.key, prepare_page(gdf))
+        else:
+            record_count = get_layer_record_count(client)
+            if record_count is not None:
+                logger.info(
+                    f"Downloading {record_count} records from layer: {layer_url}"
+                )
+
+            for record_offset_idx, gdf in iter_features_pages(
+                client,
+                records_chunk_size,
+                record_count,
+                order_by_field=order_by_field,
+                max_workers=max_workers,
+                skip_offsets=checkpoint.completed_offsets,
+            ):
+                checkpoint.write_part(
+                    DownloadCheckpoint.offset_key(record_offset_idx), prepare_page(gdf)
+                )
+
+    part_paths = checkpoint.completed_part_paths()
+    if not part_paths:
+        raise ValueError(f"No records were downloaded from layer: {layer_url}")
+
+    merge_vector_files(
+        output_path,
+        part_paths,
+        spatial_sort=spatial_sort,
+        write_bbox_covering=write_bbox_covering,
+        row_group_size=row_group_size,
+        partition_by=partition_by,
+    )
+
+    if not keep_staging_dir:
+        shutil.rmtree(checkpoint.staging_dir)
 
     return output_path
 
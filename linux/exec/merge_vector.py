@@ -1,29 +1,386 @@
 #!/usr/bin/env python
 
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Sequence
+from typing import Any
 
 import geopandas as gpd
-import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pyogrio
+import pyogrio.raw
+import pyproj
+import shapely
 
+from geo_output import (
+    BBOX_COVERING_COLUMN,
+    DEFAULT_ROW_GROUP_SIZE,
+    GEOJSON_SUFFIXES,
+    SpatialSortMethod,
+    is_parquet_path,
+    write_geodataframe,
+)
 from typer import run
 
-import asyncio
 
+GEOMETRY_FIELD_NAME = "geometry"
+BBOX_FIELD_NAMES = ("xmin", "ymin", "xmax", "ymax")
 
-async def async_read_file_to_gdf(path: Path | str) -> gpd.GeoDataFrame:
+# Numeric codes with leading zeros (like "007") are kept as strings
+LEADING_ZERO_PATTERN = r"^[-+]?0[0-9]"
+
+PANDAS_NULLABLE_DTYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.uint16(): pd.UInt16Dtype(),
+    pa.uint32(): pd.UInt32Dtype(),
+    pa.uint64(): pd.UInt64Dtype(),
+    pa.float32(): pd.Float32Dtype(),
+    pa.float64(): pd.Float64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+    pa.string(): pd.StringDtype(),
+    pa.large_string(): pd.StringDtype(),
+}
+
+
+def is_string_type(arrow_type: pa.DataType) -> bool:
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+
+@contextmanager
+def open_vector_batches(
+    path: Path | str,
+    batch_size: int = 65536,
+) -> Iterator[tuple[pa.Schema, str, Any, Iterator[pa.RecordBatch]]]:
+    """
+    Open a vector file as a stream of Arrow record batches.
+    Yields a tuple of (schema, geometry column name, CRS, batch iterator),
+    where the geometry column holds WKB.
+    """
     path = Path(path)
-    if path.suffix.lower() in (".parquet", ".geoparquet"):
-        return gpd.read_parquet(str(path))
-    return gpd.read_file(
+
+    if is_parquet_path(path):
+        pf = pq.ParquetFile(str(path))
+        schema = pf.schema_arrow
+        geo_meta = json.loads((schema.metadata or {}).get(b"geo", b"{}"))
+        geometry_name = geo_meta.get("primary_column", GEOMETRY_FIELD_NAME)
+        crs = geo_meta.get("columns", {}).get(geometry_name, {}).get("crs", "OGC:CRS84")
+        try:
+            yield schema, geometry_name, crs, pf.iter_batches(batch_size=batch_size)
+        finally:
+            pf.close()
+        return
+
+    with pyogrio.raw.open_arrow(
         str(path),
-        driver="GeoJSON" if path.suffix.lower() in (".json", ".geojson") else None,
+        driver="GeoJSON" if path.suffix.lower() in GEOJSON_SUFFIXES else None,
+        batch_size=batch_size,
+        use_pyarrow=True,
+    ) as (meta, reader):
+        geometry_name = meta.get("geometry_name") or "wkb_geometry"
+        yield reader.schema, geometry_name, meta.get("crs"), iter(reader)
+
+
+def get_common_arrow_type(type_list: list[pa.DataType]) -> pa.DataType:
+    """
+    Resolve the single Arrow type that all of the given field types can be
+    safely cast to. Numeric types are promoted, and any unresolvable
+    combination falls back to string.
+    """
+    type_list = [t for t in dict.fromkeys(type_list) if not pa.types.is_null(t)]
+    if not type_list:
+        return pa.string()
+    if len(type_list) == 1:
+        return type_list[0]
+    if all(pa.types.is_integer(t) for t in type_list):
+        return pa.int64()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in type_list):
+        return pa.float64()
+    if all(is_string_type(t) for t in type_list):
+        return pa.large_string() if pa.large_string() in type_list else pa.string()
+    try:
+        unified = pa.unify_schemas(
+            [pa.schema([pa.field("f", t)]) for t in type_list],
+            promote_options="permissive",
+        )
+        return unified.field("f").type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+
+
+def any_value_matches(arr: pa.Array, pattern: str) -> bool:
+    return pc.any(pc.match_substring_regex(arr, pattern)).as_py() is True
+
+
+def can_cast(arr: pa.Array, arrow_type: pa.DataType) -> bool:
+    try:
+        pc.cast(arr, arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return False
+    return True
+
+
+def infer_numeric_string_fields(
+    in_vector_paths: list[Path],
+    field_names: list[str],
+    batch_size: int = 65536,
+) -> dict[str, pa.DataType]:
+    """
+    Scan the given string fields across all inputs and return the numeric type
+    that every non-null value in each field can be cast to by Arrow: int64,
+    or else float64 (for values like "+5" or integers outside the int64 range).
+    Fields containing any non-numeric value or any number with leading zeros
+    are left out of the result.
+    """
+    int_fields = set(field_names)
+    float_fields = set(field_names)
+
+    for path in in_vector_paths:
+        if not int_fields and not float_fields:
+            break
+        with open_vector_batches(path, batch_size=batch_size) as (_, _, _, batches):
+            for batch in batches:
+                for name in (int_fields | float_fields) & set(batch.schema.names):
+                    col = batch.column(name)
+                    if not is_string_type(col.type):
+                        continue
+                    if any_value_matches(col, LEADING_ZERO_PATTERN):
+                        int_fields.discard(name)
+                        float_fields.discard(name)
+                        continue
+                    if name in int_fields and not can_cast(col, pa.int64()):
+                        int_fields.discard(name)
+                    if name in float_fields and not can_cast(col, pa.float64()):
+                        float_fields.discard(name)
+
+    return {
+        name: pa.int64() if name in int_fields else pa.float64()
+        for name in field_names
+        if name in int_fields or name in float_fields
+    }
+
+
+def is_same_crs(crs: Any, other_crs: Any) -> bool:
+    # GeoParquet defaults to OGC:CRS84, which only differs from EPSG:4326 in
+    # axis order
+    return pyproj.CRS.from_user_input(crs).equals(
+        pyproj.CRS.from_user_input(other_crs), ignore_axis_order=True
+    )
+
+
+def reconcile_vector_schemas(
+    in_vector_paths: list[Path],
+    convert_obj_to_str: bool = False,
+    cast_numeric_cols: bool = False,
+    batch_size: int = 65536,
+) -> tuple[pa.Schema, Any]:
+    """
+    Determine the output Arrow schema of the merged dataset from the union
+    of all input schemas, so that every input batch is cast to the same types
+    regardless of which inputs happen to contain odd values.
+    All inputs with a CRS must share the same CRS.
+    """
+    field_types: dict[str, list[pa.DataType]] = {}
+    crs = None
+
+    for path in in_vector_paths:
+        with open_vector_batches(path, batch_size=batch_size) as (
+            schema,
+            geometry_name,
+            path_crs,
+            _,
+        ):
+            if crs is None:
+                crs = path_crs
+            elif path_crs is not None and not is_same_crs(crs, path_crs):
+                raise ValueError(
+                    f"CRS of {path} does not match the CRS of the preceding inputs"
+                )
+            for field in schema:
+                if field.name == geometry_name:
+                    continue
+                field_types.setdefault(field.name, []).append(field.type)
+
+    target_types = {
+        name: get_common_arrow_type(types) for name, types in field_types.items()
+    }
+
+    if convert_obj_to_str:
+        for name, arrow_type in target_types.items():
+            if pa.types.is_nested(arrow_type) or pa.types.is_binary(arrow_type):
+                target_types[name] = pa.string()
+
+    if cast_numeric_cols:
+        target_types.update(
+            infer_numeric_string_fields(
+                in_vector_paths,
+                [
+                    name
+                    for name, arrow_type in target_types.items()
+                    if is_string_type(arrow_type)
+                ],
+                batch_size=batch_size,
+            )
+        )
+
+    target_schema = pa.schema(
+        [
+            *(pa.field(name, arrow_type) for name, arrow_type in target_types.items()),
+            pa.field(GEOMETRY_FIELD_NAME, pa.binary()),
+        ]
     )
+    return target_schema, crs
 
 
-async def async_read_files(paths: Sequence[Path | str]) -> list[gpd.GeoDataFrame]:
-    return await asyncio.gather(*(async_read_file_to_gdf(p) for p in paths))
+def cast_array(arr: pa.Array | pa.ChunkedArray, arrow_type: pa.DataType) -> pa.Array:
+    if arr.type == arrow_type:
+        return arr
+    try:
+        return pc.cast(arr, arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        if not is_string_type(arrow_type):
+            raise
+        # Nested types have no Arrow cast kernel to string
+        return pa.array(
+            [
+                None if v is None else json.dumps(v, default=str)
+                for v in arr.to_pylist()
+            ],
+            type=arrow_type,
+        )
+
+
+def cast_batch_to_schema(
+    batch: pa.RecordBatch,
+    target_schema: pa.Schema,
+    geometry_name: str,
+) -> pa.RecordBatch:
+    arrays = []
+    for field in target_schema:
+        source_name = geometry_name if field.name == GEOMETRY_FIELD_NAME else field.name
+        if source_name in batch.schema.names:
+            arrays.append(cast_array(batch.column(source_name), field.type))
+        else:
+            arrays.append(pa.nulls(batch.num_rows, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=target_schema)
+
+
+def iter_merged_batches(
+    in_vector_paths: list[Path],
+    target_schema: pa.Schema,
+    batch_size: int = 65536,
+) -> Iterator[pa.RecordBatch]:
+    for path in in_vector_paths:
+        with open_vector_batches(path, batch_size=batch_size) as (
+            _,
+            geometry_name,
+            _,
+            batches,
+        ):
+            for batch in batches:
+                yield cast_batch_to_schema(batch, target_schema, geometry_name)
+
+
+def get_geoparquet_schema(
+    target_schema: pa.Schema, crs: Any, write_bbox_covering: bool = False
+) -> pa.Schema:
+    geometry_meta: dict[str, Any] = {"encoding": "WKB", "geometry_types": []}
+    if crs is not None:
+        geometry_meta["crs"] = (
+            crs
+            if isinstance(crs, dict)
+            else pyproj.CRS.from_user_input(crs).to_json_dict()
+        )
+    if write_bbox_covering:
+        target_schema = target_schema.append(
+            pa.field(
+                BBOX_COVERING_COLUMN,
+                pa.struct([pa.field(name, pa.float64()) for name in BBOX_FIELD_NAMES]),
+            )
+        )
+        geometry_meta["covering"] = {
+            "bbox": {name: [BBOX_COVERING_COLUMN, name] for name in BBOX_FIELD_NAMES}
+        }
+    geo_meta = {
+        "version": "1.1.0" if write_bbox_covering else "1.0.0",
+        "primary_column": GEOMETRY_FIELD_NAME,
+        "columns": {GEOMETRY_FIELD_NAME: geometry_meta},
+    }
+    return target_schema.with_metadata({b"geo": json.dumps(geo_meta).encode("utf-8")})
+
+
+def add_bbox_covering(batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    geoms = shapely.from_wkb(
+        batch.column(GEOMETRY_FIELD_NAME).to_numpy(zero_copy_only=False)
+    )
+    bounds = shapely.bounds(geoms)
+    bbox = pa.StructArray.from_arrays(
+        [pa.array(bounds[:, i]) for i in range(len(BBOX_FIELD_NAMES))],
+        names=list(BBOX_FIELD_NAMES),
+    )
+    return pa.RecordBatch.from_arrays([*batch.columns, bbox], schema=schema)
+
+
+def write_geoparquet_batches(
+    out_vector_path: Path,
+    batches: Iterator[pa.RecordBatch],
+    target_schema: pa.Schema,
+    crs: Any,
+    write_bbox_covering: bool = False,
+    row_group_size: int | None = None,
+) -> None:
+    schema = get_geoparquet_schema(target_schema, crs, write_bbox_covering)
+    if write_bbox_covering and row_group_size is None:
+        row_group_size = DEFAULT_ROW_GROUP_SIZE
+    with pq.ParquetWriter(str(out_vector_path), schema) as writer:
+        for batch in batches:
+            if write_bbox_covering:
+                batch = add_bbox_covering(batch, schema)
+            writer.write_batch(batch, row_group_size=row_group_size)
+
+
+def get_geometry_types(path: Path) -> set[str]:
+    """
+    Read the geometry types of a vector file from its metadata, without
+    reading any features. An empty set means that the types are unknown.
+    """
+    if is_parquet_path(path):
+        geo_meta = json.loads(
+            (pq.read_schema(str(path)).metadata or {}).get(b"geo", b"{}")
+        )
+        geometry_name = geo_meta.get("primary_column", GEOMETRY_FIELD_NAME)
+        return set(
+            geo_meta.get("columns", {}).get(geometry_name, {}).get("geometry_types")
+            or []
+        )
+    geometry_type = pyogrio.read_info(str(path)).get("geometry_type")
+    return {geometry_type} if geometry_type and geometry_type != "Unknown" else set()
+
+
+def write_ogr_batches(
+    out_vector_path: Path,
+    batches: Iterator[pa.RecordBatch],
+    target_schema: pa.Schema,
+    crs: Any,
+    geometry_type: str = "Unknown",
+) -> None:
+    pyogrio.raw.write_arrow(
+        pa.RecordBatchReader.from_batches(target_schema, batches),
+        str(out_vector_path),
+        driver="GeoJSON"
+        if out_vector_path.suffix.lower() in GEOJSON_SUFFIXES
+        else None,
+        geometry_name=GEOMETRY_FIELD_NAME,
+        geometry_type=geometry_type,
+        crs=None if crs is None else pyproj.CRS.from_user_input(crs).to_wkt(),
+    )
 
 
 def merge_vector_files(
@@ -32,40 +389,78 @@ def merge_vector_files(
     convert_obj_to_str: bool = False,
     convert_all_dtypes: bool = False,
     cast_numeric_cols: bool = False,
+    batch_size: int = 65536,
+    spatial_sort: SpatialSortMethod | None = None,
+    write_bbox_covering: bool = False,
+    row_group_size: int | None = None,
+    partition_by: str | None = None,
 ) -> Path:
+    """
+    Merge vector files into a single output file.
+    Output field types are reconciled once from the union of input schemas,
+    then each input batch is cast to those types as it streams through to
+    the output file, so memory use doesn't grow with the size of the inputs.
+    Only a spatial sort or partitioning needs the full table in memory.
+    """
     out_vector_path = Path(out_vector_path)
 
-    gdf = pd.concat(
-        asyncio.run(async_read_files(in_vector_paths)),
-        ignore_index=True,
-        copy=False,
+    target_schema, crs = reconcile_vector_schemas(
+        in_vector_paths,
+        convert_obj_to_str=convert_obj_to_str,
+        cast_numeric_cols=cast_numeric_cols,
+        batch_size=batch_size,
     )
-    gdf.reset_index(drop=True, inplace=True)
-
-    if convert_all_dtypes:
-        gdf = gdf.convert_dtypes()
+    batches = iter_merged_batches(in_vector_paths, target_schema, batch_size=batch_size)
 
-    if convert_obj_to_str:
-        for col in gdf.columns:
-            if gdf[col].dtype == np.dtype("O"):
-                gdf[col] = gdf[col].astype(str)
-
-    if cast_numeric_cols:
-        for col in gdf.columns:
-            gdf[col] = pd.to_numeric(
-                arg=gdf[col],
-                errors="ignore",
+    # Arrow types are already nullable, so `convert_all_dtypes` has nothing
+    # to do for streamed output
+    if spatial_sort is None and partition_by is None:
+        if is_parquet_path(out_vector_path):
+            write_geoparquet_batches(
+                out_vector_path,
+                batches,
+                target_schema,
+                crs,
+                write_bbox_covering=write_bbox_covering,
+                row_group_size=row_group_size,
+            )
+        else:
+            # Like GeoPandas, only declare a geometry type for the layer if
+            # every feature has the same type
+            geometry_types = set().union(
+                *(get_geometry_types(path) for path in in_vector_paths)
+            )
+            write_ogr_batches(
+                out_vector_path,
+                batches,
+                target_schema,
+                crs,
+                geometry_type=geometry_types.pop()
+                if len(geometry_types) == 1
+                else "Unknown",
             )
+        return out_vector_path
 
-    if out_vector_path.suffix.lower() in (".parquet", ".geoparquet"):
-        gdf.to_parquet(str(out_vector_path))
-    else:
-        gdf.to_file(
-            str(out_vector_path),
-            driver="GeoJSON" if out_vector_path.suffix.lower() in (".json", ".geojson") else None,
-        )
+    table = pa.Table.from_batches(batches, schema=target_schema)
+    df = table.drop_columns([GEOMETRY_FIELD_NAME]).to_pandas(
+        types_mapper=PANDAS_NULLABLE_DTYPES.get if convert_all_dtypes else None,
+    )
+    gdf = gpd.GeoDataFrame(
+        df,
+        geometry=gpd.GeoSeries.from_wkb(
+            table.column(GEOMETRY_FIELD_NAME).to_numpy(zero_copy_only=False)
+        ),
+        crs=crs,
+    )
 
-    return out_vector_path
+    return write_geodataframe(
+        gdf,
+        out_vector_path,
+        spatial_sort=spatial_sort,
+        write_bbox_covering=write_bbox_covering,
+        row_group_size=row_group_size,
+        partition_by=partition_by,
+    )
 
 
 if __name__ == "__main__":
@@ -10,81 +10,131 @@ from xml.etree import ElementTree as ET
 from typer import run
 
 
-def etree_to_dict(t: ET.Element) -> dict[str, Any]:
-    d: dict[str, Any] = {t.tag: {} if t.attrib else None}
-    children = list(t)
-    if children:
-        dd = defaultdict(list)
-        for dc in map(etree_to_dict, children):
-            for k, v in dc.items():
-                dd[k].append(v)
-        d = {t.tag: {k: v[0] if len(v) == 1 else v for k, v in dd.items()}}
-    if t.attrib:
-        d[t.tag].update(("@" + k, v) for k, v in t.attrib.items())
-    if t.text:
-        text = t.text.strip()
-        if children or t.attrib:
-            if text:
-                d[t.tag]["#text"] = text
-        else:
-            d[t.tag] = text
-    return d
-
-
-def dict_to_etree(d: dict[str, Any]) -> ET.Element:
-    def _to_etree(d: dict[str, Any] | str, root: ET.Element) -> None:
-        if not d:
-            pass
-        elif isinstance(d, str):
-            root.text = d
-        elif isinstance(d, dict):
-            for k, v in d.items():
-                assert isinstance(k, str)
-                if k.startswith("#"):
-                    assert k == "#text" and isinstance(v, str)
-                    root.text = v
-                elif k.startswith("@"):
-                    assert isinstance(v, str)
-                    root.set(k[1:], v)
-                elif isinstance(v, list):
-                    for e in v:
-                        _to_etree(e, ET.SubElement(root, k))
-                else:
-                    _to_etree(v, ET.SubElement(root, k))
-        else:
-            assert d == "invalid type", (type(d), d)
-
-    assert isinstance(d, dict) and len(d) == 1
-    tag, body = next(iter(d.items()))
-    node = ET.Element(tag)
-    _to_etree(body, node)
-    return node
-
-
-def merge_etree_dicts(t_dest: dict[str, Any], t_input: dict[str, Any]) -> None:
-    for in_k, in_v in t_input.items():
-        if in_k not in t_dest:
-            t_dest[in_k] = in_v
-        else:
-            dest_v = t_dest[in_k]
-            if in_v == dest_v:
-                pass
-            elif isinstance(in_v, list):
-                for el in in_v:
-                    if el not in dest_v:
-                        dest_v.append(el)
+Fingerprint = tuple[Any, ...]
+
+
+def get_element_fingerprint(elem: ET.Element) -> Fingerprint:
+    """
+    Build a hashable canonical representation of an element subtree, so that
+    equal subtrees (ignoring attribute order and surrounding whitespace) can
+    be found with a set lookup instead of a deep comparison.
+    """
+    return (
+        elem.tag,
+        tuple(sorted(elem.attrib.items())),
+        (elem.text or "").strip(),
+        tuple(get_element_fingerprint(child) for child in elem),
+    )
+
+
+class ElementMerger:
+    """
+    Merge element trees into a destination tree in place, caching the
+    fingerprints of the children of each destination element by tag so
+    that each merge only fingerprints the incoming tree, not the ever
+    growing destination tree.
+    """
+
+    def __init__(self) -> None:
+        self.dest_fingerprints: dict[tuple[int, str], set[Fingerprint]] = {}
+
+    def get_dest_fingerprints(
+        self, dest: ET.Element, tag: str, dest_children: list[ET.Element]
+    ) -> set[Fingerprint]:
+        key = (id(dest), tag)
+        fingerprints = self.dest_fingerprints.get(key)
+        if fingerprints is None:
+            fingerprints = {get_element_fingerprint(child) for child in dest_children}
+            self.dest_fingerprints[key] = fingerprints
+        return fingerprints
+
+    def merge(self, dest: ET.Element, src: ET.Element) -> None:
+        """
+        Merge the `src` element into the `dest` element in place.
+        Missing attributes and text are copied over. Children are matched by
+        tag: a single child with sub-elements on both sides is merged
+        recursively, and otherwise the `src` children that aren't already
+        present in `dest` are added after the last `dest` child with the
+        same tag.
+        """
+        for key, value in src.attrib.items():
+            if key not in dest.attrib:
+                dest.set(key, value)
+        if not (dest.text or "").strip() and (src.text or "").strip():
+            dest.text = src.text
+
+        if len(src) == 0:
+            return
+
+        dest_children_by_tag: dict[str, list[ET.Element]] = defaultdict(list)
+        for child in dest:
+            dest_children_by_tag[child.tag].append(child)
+        src_children_by_tag: dict[str, list[ET.Element]] = defaultdict(list)
+        for child in src:
+            src_children_by_tag[child.tag].append(child)
+
+        added_children_by_tag: dict[str, list[ET.Element]] = {}
+        for tag, src_children in src_children_by_tag.items():
+            dest_children = dest_children_by_tag.get(tag)
+            if not dest_children:
+                added_children_by_tag[tag] = src_children
+            elif (
+                len(dest_children) == 1
+                and len(src_children) == 1
+                and len(dest_children[0])
+                and len(src_children[0])
+            ):
+                # The child is about to change, so its cached fingerprint
+                # (and those of its own children) no longer hold
+                self.dest_fingerprints.pop((id(dest), tag), None)
+                self.merge(dest_children[0], src_children[0])
             else:
-                merge_etree_dicts(dest_v, in_v)
+                seen = self.get_dest_fingerprints(dest, tag, dest_children)
+                added = []
+                for child in src_children:
+                    fingerprint = get_element_fingerprint(child)
+                    if fingerprint not in seen:
+                        seen.add(fingerprint)
+                        added.append(child)
+                if added:
+                    added_children_by_tag[tag] = added
+
+        if not added_children_by_tag:
+            return
+
+        merged_children = []
+        last_child_of_tag = {
+            id(children[-1]): tag for tag, children in dest_children_by_tag.items()
+        }
+        for child in dest:
+            merged_children.append(child)
+            last_tag = last_child_of_tag.get(id(child))
+            if last_tag is not None and last_tag in added_children_by_tag:
+                merged_children.extend(added_children_by_tag.pop(last_tag))
+        for added in added_children_by_tag.values():
+            merged_children.extend(added)
+        dest[:] = merged_children
 
 
 def merge_xml_files(
-    *in_xml_paths: Path,
+    in_xml_paths: list[Path],
 ) -> None:
-    base_tree_dict = etree_to_dict(ET.parse(sys.argv[1]).getroot())
-    for xml_fp in in_xml_paths:
-        merge_etree_dicts(base_tree_dict, etree_to_dict(ET.parse(xml_fp).getroot()))
+    """
+    Merge XML files in the given order and write the result to stdout.
+    The result depends on the merge order (merging is not associative), so
+    the files are merged one after another. A later file can still add to any element of the merged tree, so the
+    whole tree is held in memory and only written out once all files have
+    been merged.
+    """
+    if not in_xml_paths:
+        raise ValueError("No input XML files were provided")
+
+    merger = ElementMerger()
+    base_root = ET.parse(in_xml_paths[0]).getroot()
+    for xml_fp in in_xml_paths[1:]:
+        merger.merge(base_root, ET.parse(xml_fp).getroot())
 
-    tree = ET.ElementTree(dict_to_etree(base_tree_dict))
+    tree = ET.ElementTree(base_root)
     ET.indent(tree, space="    ")
 
     with os.fdopen(sys.stdout.fileno(), "wb", closefd=False) as stdout:
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import rasterio as rio
+import rasterio.shutil
+from grid2tif import round_float_values_for_compression
+from rasterio.io import MemoryFile
+from typer import run
+
+logger = logging.getLogger(__name__)
+
+
+OUTFILE_DEFAULT_SUFFIX = "round-cog.tif"
+DEFAULT_MAX_MEMORY_MB = 4096
+COG_CREATION_OPTIONS = {
+    "BIGTIFF": "YES",
+    "OVERVIEWS": "IGNORE_EXISTING",
+    "RESAMPLING": "BILINEAR",
+    "COMPRESS": "LZW",
+    "PREDICTOR": "3",
+}
+# Fast compression for the temporary GeoTIFF staged on disk, which is read
+# back once by the COG driver
+TMP_CREATION_OPTIONS = {
+    "compress": "deflate",
+    "zlevel": 1,
+}
+
+
+def get_default_output_path(dem_path: Path) -> Path:
+    return dem_path.with_name(f"{dem_path.stem}_{OUTFILE_DEFAULT_SUFFIX}")
+
+
+def write_rounded_dem(src: rio.DatasetReader, dst: rio.io.DatasetWriter) -> None:
+    """
+    Copy a DEM block by block, rounding float values to the nearest 1/128
+    in place and leaving NoData pixels untouched.
+    """
+    is_float = np.issubdtype(np.dtype(src.dtypes[0]), np.floating)
+    nodata = src.nodata
+    for _, window in src.block_windows(1):
+        arr = src.read(1, window=window)
+        if is_float:
+            nodata_mask = None if nodata is None or np.isnan(nodata) else arr == nodata
+            round_float_values_for_compression(arr, inplace=True)
+            if nodata_mask is not None:
+                arr[nodata_mask] = nodata
+        dst.write(arr, 1, window=window)
+
+
+def optimize_dem_file(
+    dem_path: Path,
+    output_path: Path | None = None,
+    num_threads: str = "ALL_CPUS",
+    max_memory_mb: int = DEFAULT_MAX_MEMORY_MB,
+) -> Path:
+    """
+    Write a COG copy of a single-band DEM with values rounded to 1/128 for
+    better LZW compression.
+    The source is read once, but this is not a single pass: the COG driver
+    needs a complete source to build overviews from, so the rounded blocks
+    are first staged uncompressed in memory (up to `max_memory_mb` per DEM)
+    or else in a compressed temporary GeoTIFF next to the output, and the
+    COG is then copied from there with multithreaded compression.
+    """
+    dem_path = Path(dem_path)
+    output_path = (
+        get_default_output_path(dem_path) if output_path is None else Path(output_path)
+    )
+    if output_path.exists():
+        logger.warning(f"Output file exists and will be overwritten: {output_path}")
+
+    with rio.open(dem_path) as src:
+        if src.count != 1:
+            raise ValueError(
+                f"Expected a single-band DEM, but raster has {src.count} bands: {dem_path}"
+            )
+        profile = src.profile.copy()
+        profile.update(
+            driver="GTiff",
+            tiled=True,
+            blockxsize=512,
+            blockysize=512,
+            compress=None,
+            bigtiff="IF_SAFER",
+        )
+        dem_size_mb = src.width * src.height * np.dtype(src.dtypes[0]).itemsize / 2**20
+        cog_options = {**COG_CREATION_OPTIONS, "NUM_THREADS": num_threads}
+
+        if dem_size_mb <= max_memory_mb:
+            with MemoryFile() as memfile:
+                with memfile.open(**profile) as tmp:
+                    write_rounded_dem(src, tmp)
+                rasterio.shutil.copy(
+                    memfile.name, output_path, driver="COG", **cog_options
+                )
+        else:
+            tmp_path = output_path.with_name(f"{output_path.stem}_tmp.tif")
+            is_float = np.issubdtype(np.dtype(src.dtypes[0]), np.floating)
+            tmp_profile = {
+                **profile,
+                **TMP_CREATION_OPTIONS,
+                "predictor": 3 if is_float else 2,
+                "num_threads": num_threads,
+            }
+            try:
+                with rio.open(tmp_path, "w", **tmp_profile) as tmp:
+                    write_rounded_dem(src, tmp)
+                rasterio.shutil.copy(tmp_path, output_path, driver="COG", **cog_options)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+    return output_path
+
+
+def optimize_dem(
+    dem_paths: list[Path],
+    output_path: Path | None = None,
+    num_threads: str = "ALL_CPUS",
+    max_memory_mb: int = DEFAULT_MAX_MEMORY_MB,
+    max_workers: int = 1,
+) -> None:
+    """
+    Produce rounded COG copies of one or more DEMs, processing up to
+    `max_workers` DEMs at a time.
+    By default each output is created next to its DEM with a filename like
+    "DEMFILE_round-cog.tif". `output_path` may be a file path for a single
+    DEM, or a directory for many.
+    """
+    if len(dem_paths) > 1 and output_path is not None and not output_path.is_dir():
+        raise ValueError(
+            f"Output path must be a directory for multiple DEMs: {output_path}"
+        )
+
+    def get_output_path(dem_path: Path) -> Path | None:
+        if output_path is not None and output_path.is_dir():
+            return output_path / get_default_output_path(dem_path).name
+        return output_path
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                optimize_dem_file,
+                dem_path,
+                get_output_path(dem_path),
+                num_threads,
+                max_memory_mb,
+            )
+            for dem_path in dem_paths
+        ]
+        for dem_path, future in zip(dem_paths, futures):
+            print(f"Created rounded COG: {dem_path} -> {future.result()}")
+
+
+if __name__ == "__main__":
+    run(optimize_dem)
@@ -0,0 +1,636 @@
+#!/usr/bin/env python
+
+import glob
+import logging
+import os
+import stat
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import IO, BinaryIO, NamedTuple
+
+from typer import run
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_COMPRESS_LEVEL = 6
+DEFAULT_MAX_WORKERS = os.cpu_count() or 1
+DEFAULT_MAX_ARCHIVES = 4
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+# Compressed member data is kept in memory before being spooled to a
+# temporary file, up to this total over all pending members of all archives
+SPOOL_MEMORY_LIMIT = 1024 * 1024 * 1024
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+ALREADY_COMPRESSED_EXTS = frozenset(
+    {
+        ".zip",
+        ".gz",
+        ".tgz",
+        ".bz2",
+        ".xz",
+        ".zst",
+        ".7z",
+        ".rar",
+        ".jpg",
+        ".jpeg",
+        ".png",
+        ".jp2",
+        ".laz",
+    }
+)
+TIFF_EXTS = frozenset({".tif", ".tiff"})
+TIFF_TAG_COMPRESSION = 259
+TIFF_COMPRESSION_NONE = 1
+ZIP_FLAG_UTF8 = 0x800
+ZIP_EXTRA_ZIP64 = 0x0001
+ZIP_VERSION_DEFAULT = 20
+ZIP_VERSION_ZIP64 = 45
+ZIP_CREATE_SYSTEM_UNIX = 3
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_FILECOUNT_LIMIT = (1 << 16) - 1
+# Header layouts and signatures from the ZIP APPNOTE (as used by `zipfile`)
+ZIP_STRUCT_FILE_HEADER = "<4s2B4HL2L2H"
+ZIP_SIG_FILE_HEADER = b"PK\003\004"
+ZIP_STRUCT_CENTRAL_DIR = "<4s4B4HL2L5H2L"
+ZIP_SIG_CENTRAL_DIR = b"PK\001\002"
+ZIP_STRUCT_END_ARCHIVE64 = "<4sQ2H2L4Q"
+ZIP_SIG_END_ARCHIVE64 = b"PK\006\006"
+ZIP_STRUCT_END_ARCHIVE64_LOCATOR = "<4sLQL"
+ZIP_SIG_END_ARCHIVE64_LOCATOR = b"PK\006\007"
+ZIP_STRUCT_END_ARCHIVE = "<4s4H2LH"
+ZIP_SIG_END_ARCHIVE = b"PK\005\006"
+
+
+class ZipMember(NamedTuple):
+    name: str
+    src_path: str | None
+    mtime: float
+    mode: int
+    file_size: int
+
+
+class CompressedMember(NamedTuple):
+    member: ZipMember
+    compress_type: int
+    crc: int
+    compress_size: int
+    data: IO[bytes] | None
+
+
+def get_tiff_compression(path: str) -> int | None:
+    """
+    Read the Compression tag of the first IFD of a classic or BigTIFF file,
+    or return None if the file isn't a TIFF.
+    """
+    with open(path, "rb") as fp:
+        header = fp.read(16)
+        if header[:2] == b"II":
+            endian = "<"
+        elif header[:2] == b"MM":
+            endian = ">"
+        else:
+            return None
+        (magic,) = struct.unpack(f"{endian}H", header[2:4])
+        if magic == 42:
+            (ifd_offset,) = struct.unpack(f"{endian}I", header[4:8])
+            count_format, entry_size, value_offset = "H", 12, 8
+        elif magic == 43:
+            (ifd_offset,) = struct.unpack(f"{endian}Q", header[8:16])
+            count_format, entry_size, value_offset = "Q", 20, 12
+        else:
+            return None
+        fp.seek(ifd_offset)
+        count_bytes = fp.read(struct.calcsize(count_format))
+        (num_entries,) = struct.unpack(f"{endian}{count_format}", count_bytes)
+        entries = fp.read(num_entries * entry_size)
+    for i in range(0, len(entries) - entry_size + 1, entry_size):
+        (tag,) = struct.unpack(f"{endian}H", entries[i : i + 2])
+        if tag == TIFF_TAG_COMPRESSION:
+            return struct.unpack(
+                f"{endian}H", entries[i + value_offset : i + value_offset + 2]
+            )[0]
+    return TIFF_COMPRESSION_NONE
+
+
+def is_already_compressed(path: str) -> bool:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ALREADY_COMPRESSED_EXTS:
+        return True
+    if ext in TIFF_EXTS:
+        try:
+            compression = get_tiff_compression(path)
+        except (OSError, struct.error):
+            return False
+        return compression not in (None, TIFF_COMPRESSION_NONE)
+    return False
+
+
+def compress_member(
+    member: ZipMember,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+    spool_max_size: int = SPOOL_MAX_SIZE,
+) -> CompressedMember | None:
+    """
+    Deflate a file into a temporary file spooled in memory up to
+    `spool_max_size` bytes, or leave it to be stored as-is if it's a
+    directory, already compressed, or doesn't shrink.
+    Returns None (with a warning) if the file can't be read.
+    """
+    if member.src_path is None or is_already_compressed(member.src_path):
+        return CompressedMember(member, zipfile.ZIP_STORED, 0, member.file_size, None)
+
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    with ExitStack() as stack:
+        spool = stack.enter_context(
+            tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+        )
+        crc = 0
+        file_size = 0
+        try:
+            with open(member.src_path, "rb") as src_fp:
+                while chunk := src_fp.read(COPY_CHUNK_SIZE):
+                    crc = zlib.crc32(chunk, crc)
+                    file_size += len(chunk)
+                    spool.write(compressor.compress(chunk))
+        except OSError as e:
+            logger.warning(f"Skipping unreadable file: {e}")
+            return None
+        spool.write(compressor.flush())
+
+        compress_size = spool.tell()
+        if compress_size >= file_size:
+            return CompressedMember(
+                member, zipfile.ZIP_STORED, 0, member.file_size, None
+            )
+        # Keep the spool open for the archive writer, which closes it
+        stack.pop_all()
+    spool.seek(0)
+    return CompressedMember(
+        member._replace(file_size=file_size),
+        zipfile.ZIP_DEFLATED,
+        crc,
+        compress_size,
+        spool,
+    )
+
+
+def get_dos_datetime(mtime: float) -> tuple[int, int]:
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    dostime = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dosdate = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dostime, dosdate
+
+
+class ZipArchiveWriter:
+    """
+    Minimal ZIP (and ZIP64) writer that assembles an archive from member
+    data that was already deflated elsewhere, which `zipfile` can't do.
+    Stored members are copied straight from their source file, with the
+    CRC patched into the local header afterwards.
+    """
+
+    def __init__(self, fp: BinaryIO) -> None:
+        self.fp = fp
+        self.central_dir: list[bytes] = []
+
+    def write_member(self, compressed: CompressedMember) -> None:
+        member = compressed.member
+        name = member.name.encode("utf-8")
+        dostime, dosdate = get_dos_datetime(member.mtime)
+        is_zip64 = member.file_size >= ZIP64_LIMIT
+        extract_version = ZIP_VERSION_ZIP64 if is_zip64 else ZIP_VERSION_DEFAULT
+        header_offset = self.fp.tell()
+
+        def pack_local_header(crc: int, compress_size: int, file_size: int) -> bytes:
+            extra = b""
+            if is_zip64:
+                extra = struct.pack(
+                    "<HHQQ", ZIP_EXTRA_ZIP64, 16, file_size, compress_size
+                )
+                compress_size = file_size = 0xFFFFFFFF
+            return (
+                struct.pack(
+                    ZIP_STRUCT_FILE_HEADER,
+                    ZIP_SIG_FILE_HEADER,
+                    extract_version,
+                    0,
+                    ZIP_FLAG_UTF8,
+                    compressed.compress_type,
+                    dostime,
+                    dosdate,
+                    crc,
+                    compress_size,
+                    file_size,
+                    len(name),
+                    len(extra),
+                )
+                + name
+                + extra
+            )
+
+        crc, compress_size, file_size = (
+            compressed.crc,
+            compressed.compress_size,
+            member.file_size,
+        )
+        local_header = pack_local_header(crc, compress_size, file_size)
+        self.fp.write(local_header)
+
+        if compressed.data is not None:
+            with compressed.data:
+                while chunk := compressed.data.read(COPY_CHUNK_SIZE):
+                    self.fp.write(chunk)
+        elif member.src_path is not None:
+            crc = 0
+            file_size = 0
+            with open(member.src_path, "rb") as src_fp:
+                while chunk := src_fp.read(COPY_CHUNK_SIZE):
+                    crc = zlib.crc32(chunk, crc)
+                    file_size += len(chunk)
+                    self.fp.write(chunk)
+            if file_size != member.file_size:
+                raise RuntimeError(
+                    f"File changed size while being archived: {member.src_path}"
+                )
+            compress_size = file_size
+            end_offset = self.fp.tell()
+            self.fp.seek(header_offset)
+            self.fp.write(pack_local_header(crc, compress_size, file_size))
+            self.fp.seek(end_offset)
+
+        self.central_dir.append(
+            self.pack_central_dir_entry(
+                name,
+                compressed.compress_type,
+                dostime,
+                dosdate,
+                crc,
+                compress_size,
+                file_size,
+                member.mode,
+                header_offset,
+                is_zip64,
+            )
+        )
+
+    @staticmethod
+    def pack_central_dir_entry(
+        name: bytes,
+        compress_type: int,
+        dostime: int,
+        dosdate: int,
+        crc: int,
+        compress_size: int,
+        file_size: int,
+        mode: int,
+        header_offset: int,
+        is_zip64: bool,
+    ) -> bytes:
+        zip64_fields = []
+        if is_zip64:
+            zip64_fields += [file_size, compress_size]
+            file_size = compress_size = 0xFFFFFFFF
+        if header_offset >= ZIP64_LIMIT:
+            zip64_fields.append(header_offset)
+            header_offset = 0xFFFFFFFF
+        extra = b""
+        if zip64_fields:
+            extra = struct.pack(
+                f"<HH{len(zip64_fields)}Q",
+                ZIP_EXTRA_ZIP64,
+                8 * len(zip64_fields),
+                *zip64_fields,
+            )
+        extract_version = ZIP_VERSION_ZIP64 if zip64_fields else ZIP_VERSION_DEFAULT
+        # MS-DOS directory attribute in the low byte, Unix mode in the high bytes
+        external_attr = (mode << 16) | (0x10 if name.endswith(b"/") else 0)
+        return (
+            struct.pack(
+                ZIP_STRUCT_CENTRAL_DIR,
+                ZIP_SIG_CENTRAL_DIR,
+                ZIP_VERSION_ZIP64,
+                ZIP_CREATE_SYSTEM_UNIX,
+                extract_version,
+                0,
+                ZIP_FLAG_UTF8,
+                compress_type,
+                dostime,
+                dosdate,
+                crc,
+                compress_size,
+                file_size,
+                len(name),
+                len(extra),
+                0,
+                0,
+                0,
+                external_attr,
+                header_offset,
+            )
+            + name
+            + extra
+        )
+
+    def close(self) -> None:
+        central_dir_offset = self.fp.tell()
+        for entry in self.central_dir:
+            self.fp.write(entry)
+        central_dir_size = self.fp.tell() - central_dir_offset
+        num_entries = len(self.central_dir)
+
+        if (
+            num_entries >= ZIP_FILECOUNT_LIMIT
+            or central_dir_offset >= ZIP64_LIMIT
+            or central_dir_size >= ZIP64_LIMIT
+        ):
+            zip64_end_offset = self.fp.tell()
+            self.fp.write(
+                struct.pack(
+                    ZIP_STRUCT_END_ARCHIVE64,
+                    ZIP_SIG_END_ARCHIVE64,
+                    44,
+                    ZIP_VERSION_ZIP64,
+                    ZIP_VERSION_ZIP64,
+                    0,
+                    0,
+                    num_entries,
+                    num_entries,
+                    central_dir_size,
+                    central_dir_offset,
+                )
+            )
+            self.fp.write(
+                struct.pack(
+                    ZIP_STRUCT_END_ARCHIVE64_LOCATOR,
+                    ZIP_SIG_END_ARCHIVE64_LOCATOR,
+                    0,
+                    zip64_end_offset,
+                    1,
+                )
+            )
+            num_entries = min(num_entries, 0xFFFF)
+            central_dir_size = min(central_dir_size, 0xFFFFFFFF)
+            central_dir_offset = min(central_dir_offset, 0xFFFFFFFF)
+
+        self.fp.write(
+            struct.pack(
+                ZIP_STRUCT_END_ARCHIVE,
+                ZIP_SIG_END_ARCHIVE,
+                0,
+                0,
+                num_entries,
+                num_entries,
+                central_dir_size,
+                central_dir_offset,
+                0,
+            )
+        )
+
+
+def get_zip_member(path: str, name: str) -> ZipMember | None:
+    """
+    Get the archive member for a path, following symlinks like `zip -r`.
+    Returns None (with a warning) for dangling symlinks and unreadable files.
+    """
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        logger.warning(f"Skipping entry that can't be accessed: {e}")
+        return None
+    if stat.S_ISDIR(st.st_mode):
+        return ZipMember(f"{name}/", None, st.st_mtime, st.st_mode, 0)
+    if not os.access(path, os.R_OK):
+        logger.warning(f"Skipping unreadable file: {path}")
+        return None
+    return ZipMember(name, path, st.st_mtime, st.st_mode, st.st_size)
+
+
+def iter_zip_members(working_dir: str, dirent_names: list[str]) -> Iterator[ZipMember]:
+    """
+    Yield the archive members for entries of a working directory like
+    `zip -r` does, recursing into directories and following symlinks to
+    directories. A symlink back to one of its own parent directories is
+    added as an empty entry, so symlink cycles aren't followed forever.
+    Entries that can't be accessed are skipped with a warning.
+    """
+
+    def get_dir_id(path: str) -> tuple[int, int] | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def warn_walk_error(e: OSError) -> None:
+        logger.warning(f"Skipping directory that can't be read: {e}")
+
+    for dirent_name in dirent_names:
+        dirent_path = os.path.join(working_dir, dirent_name)
+        member = get_zip_member(dirent_path, dirent_name)
+        if member is None:
+            continue
+        yield member
+        dir_id = get_dir_id(dirent_path)
+        if member.src_path is not None or dir_id is None:
+            continue
+        # (st_dev, st_ino) of each directory from the walk top down to a
+        # directory still to be walked
+        dir_ancestors = {dirent_path: frozenset([dir_id])}
+        for root, dirnames, filenames in os.walk(
+            dirent_path, onerror=warn_walk_error, followlinks=True
+        ):
+            dirnames.sort()
+            ancestors = dir_ancestors.pop(root, frozenset())
+            rel_root = os.path.relpath(root, working_dir)
+            for dirname in list(dirnames):
+                dir_path = os.path.join(root, dirname)
+                dir_member = get_zip_member(dir_path, os.path.join(rel_root, dirname))
+                if dir_member is not None:
+                    yield dir_member
+                dir_id = get_dir_id(dir_path)
+                if dir_member is None or dir_id is None:
+                    dirnames.remove(dirname)
+                elif dir_id in ancestors:
+                    logger.warning(
+                        f"Not recursing into symlink to a parent directory: {dir_path}"
+                    )
+                    dirnames.remove(dirname)
+                else:
+                    dir_ancestors[dir_path] = ancestors | {dir_id}
+            for filename in sorted(filenames):
+                file_member = get_zip_member(
+                    os.path.join(root, filename), os.path.join(rel_root, filename)
+                )
+                if file_member is not None:
+                    yield file_member
+
+
+def get_archive_sources(
+    src_path: str, force_glob: bool = False
+) -> tuple[str, list[str]]:
+    """
+    Resolve a SRC_PATH argument into the working directory and the names of
+    its entries to archive, in the same way as the `quickzip` script.
+    """
+    if src_path.endswith("/"):
+        working_dir, basename = src_path, ""
+    else:
+        working_dir, basename = os.path.dirname(src_path), os.path.basename(src_path)
+
+    if not os.path.exists(src_path) or src_path.endswith("/") or force_glob:
+        pattern = os.path.join(glob.escape(working_dir), f"{glob.escape(basename)}*")
+        dirent_names = sorted(
+            os.path.basename(path.rstrip("/")) for path in glob.glob(pattern)
+        )
+    else:
+        dirent_names = [basename]
+    if not dirent_names:
+        raise ValueError(
+            f"Cannot find any files/dirs matching SRC_PATH argument: {src_path.rstrip('*')}*"
+        )
+    return working_dir, dirent_names
+
+
+def get_dst_zipfile(src_path: str, zipfile_path: str | None, zip_ext: str) -> str:
+    if zipfile_path is None:
+        return f"{os.path.abspath(src_path.rstrip('/')).rstrip('.')}{zip_ext}"
+    if os.path.isdir(zipfile_path):
+        return os.path.join(
+            zipfile_path,
+            f"{os.path.basename(src_path.rstrip('/')).rstrip('.')}{zip_ext}",
+        )
+    return zipfile_path
+
+
+def write_archive(
+    dst_zipfile: str,
+    sources: list[tuple[str, list[str]]],
+    member_executor: ThreadPoolExecutor,
+    max_pending: int,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+    spool_max_size: int = SPOOL_MAX_SIZE,
+) -> tuple[int, int]:
+    """
+    Build a zipfile from members deflated in parallel on the member thread
+    pool, writing them in order as they finish with at most `max_pending`
+    members in flight.
+    The archive is written to a temporary file next to the destination and
+    renamed into place when complete.
+    Returns the number of members and the number of those that are stored
+    without compression.
+    """
+    num_members = 0
+    num_stored = 0
+    tmp_zipfile = f"{dst_zipfile}.tmp{os.getpid()}"
+    try:
+        with open(tmp_zipfile, "wb") as fp:
+            writer = ZipArchiveWriter(fp)
+            pending: deque[Future[CompressedMember | None]] = deque()
+
+            def write_next() -> None:
+                nonlocal num_members, num_stored
+                compressed = pending.popleft().result()
+                if compressed is None:
+                    return
+                writer.write_member(compressed)
+                num_members += 1
+                num_stored += (
+                    compressed.compress_type == zipfile.ZIP_STORED
+                    and compressed.member.src_path is not None
+                )
+
+            for working_dir, dirent_names in sources:
+                for member in iter_zip_members(working_dir, dirent_names):
+                    pending.append(
+                        member_executor.submit(
+                            compress_member, member, compress_level, spool_max_size
+                        )
+                    )
+                    if len(pending) >= max_pending:
+                        write_next()
+            while pending:
+                write_next()
+            writer.close()
+        os.replace(tmp_zipfile, dst_zipfile)
+    except BaseException:
+        if os.path.exists(tmp_zipfile):
+            os.remove(tmp_zipfile)
+        raise
+    return num_members, num_stored
+
+
+def quickzip(
+    src_paths: list[str],
+    zipfile_path: str | None = None,
+    zip_ext: str = ".zip",
+    force_glob: bool = False,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_archives: int = DEFAULT_MAX_ARCHIVES,
+) -> None:
+    """
+    Zip batches of files and/or folders like the `quickzip` script, using
+    all cores: members of each zipfile are deflated in parallel, and up to
+    `max_archives` separate zipfiles are built at the same time.
+    Files that are already compressed (.zip, .gz, ... and GeoTIFFs with
+    internal compression) are stored without recompression.
+    Unlike `zip`, an existing zipfile is replaced rather than updated.
+    In-memory buffers of deflated members are limited to a total of
+    `SPOOL_MEMORY_LIMIT` bytes, beyond which they spill to temporary files.
+    """
+    archives: dict[str, list[tuple[str, list[str]]]] = {}
+    for src_path in src_paths:
+        dst_zipfile = get_dst_zipfile(src_path, zipfile_path, zip_ext)
+        archives.setdefault(dst_zipfile, []).append(
+            get_archive_sources(src_path, force_glob)
+        )
+
+    max_pending = max_workers * 2
+    spool_max_size = min(
+        SPOOL_MAX_SIZE, SPOOL_MEMORY_LIMIT // (max_pending * max_archives)
+    )
+
+    with (
+        ThreadPoolExecutor(max_workers=max_workers) as member_executor,
+        ThreadPoolExecutor(max_workers=max_archives) as archive_executor,
+    ):
+        futures = {
+            dst_zipfile: archive_executor.submit(
+                write_archive,
+                dst_zipfile,
+                sources,
+                member_executor,
+                max_pending,
+                compress_level,
+                spool_max_size,
+            )
+            for dst_zipfile, sources in archives.items()
+        }
+        failed = False
+        for dst_zipfile, future in futures.items():
+            try:
+                num_members, num_stored = future.result()
+            except (OSError, RuntimeError) as e:
+                print(f"Failed to write zipfile {dst_zipfile}: {e}", file=sys.stderr)
+                failed = True
+                continue
+            print(
+                f"Wrote zipfile: {dst_zipfile} ({num_members} members, {num_stored} stored without compression)"
+            )
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run(quickzip)
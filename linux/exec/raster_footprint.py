@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+import logging
+from pathlib import Path
+from typing import Any
+
+import geopandas as gpd
+import numpy as np
+import rasterio as rio
+import rasterio.features
+import shapely
+from geo_output import write_geodataframe
+from grid2tif import get_valid_data_mask
+from numpy.typing import NDArray
+from shapely.geometry.base import BaseGeometry
+from typer import run
+
+logger = logging.getLogger(__name__)
+
+
+def open_raster_level(
+    raster_path: Path, overview_level: int | None = None
+) -> rio.DatasetReader:
+    """
+    Open a raster at full resolution, or at one of its existing overview
+    levels (0 is the first overview) so that only the overview is read.
+    """
+    if overview_level is None:
+        return rio.open(raster_path)
+    with rio.open(raster_path) as ds:
+        num_overviews = len(ds.overviews(1))
+    if not 0 <= overview_level < num_overviews:
+        raise ValueError(
+            f"Overview level {overview_level} not available, raster has {num_overviews} overviews"
+        )
+    return rio.open(raster_path, overview_level=overview_level)
+
+
+def read_valid_data_mask(ds: rio.DatasetReader, band: int = 1) -> NDArray[np.bool_]:
+    """
+    Read the GDAL valid data mask of a raster band block by block, which
+    accounts for nodata values, alpha bands and internal mask bands alike.
+    """
+    mask = np.zeros((ds.height, ds.width), dtype=bool)
+    for _, window in ds.block_windows(band):
+        row_slice, col_slice = window.toslices()
+        mask[row_slice, col_slice] = ds.read_masks(band, window=window) > 0
+    return mask
+
+
+def polygonize_mask(
+    mask: NDArray[np.bool_],
+    transform: rio.Affine,
+    simplify_tolerance: float = 0,
+) -> BaseGeometry:
+    """
+    Dissolve the valid (True) regions of a mask into a single geometry,
+    optionally simplified with the given tolerance in CRS units.
+    """
+    mask_uint8 = mask.astype(np.uint8)
+    polygons = [
+        shapely.geometry.shape(geom)
+        for geom, _ in rasterio.features.shapes(
+            mask_uint8, mask=mask, transform=transform
+        )
+    ]
+    footprint = shapely.union_all(polygons) if polygons else shapely.Polygon()
+    if simplify_tolerance > 0 and not footprint.is_empty:
+        footprint = shapely.make_valid(
+            footprint.simplify(simplify_tolerance, preserve_topology=True)
+        )
+    return footprint
+
+
+def get_raster_footprint(
+    raster_path: Path,
+    overview_level: int | None = None,
+    band: int = 1,
+    erode_pixels: int = 0,
+    erode_ignores_holes: bool = False,
+    fill_holes: bool = False,
+    simplify_tolerance: float | None = None,
+) -> tuple[BaseGeometry, Any]:
+    """
+    Compute the valid-data footprint of a raster in memory, returning the
+    footprint geometry and the raster CRS.
+    Erosion and hole filling are applied in pixels of the level being read.
+    The default `simplify_tolerance` is the pixel size of that level.
+    """
+    with open_raster_level(Path(raster_path), overview_level) as ds:
+        mask = read_valid_data_mask(ds, band=band)
+        transform = ds.transform
+        crs = ds.crs
+
+    if erode_pixels > 0 or fill_holes:
+        mask = get_valid_data_mask(
+            mask.view(np.uint8),
+            nodata_value=0,
+            erode_pixels=erode_pixels,
+            erode_ignores_holes=erode_ignores_holes,
+            fill_holes=fill_holes,
+        )
+
+    if simplify_tolerance is None:
+        simplify_tolerance = abs(transform.a)
+
+    return polygonize_mask(mask, transform, simplify_tolerance), crs
+
+
+def raster_footprint(
+    raster_path: Path,
+    output_path: Path | None = None,
+    overview_level: int | None = None,
+    band: int = 1,
+    erode_pixels: int = 0,
+    erode_ignores_holes: bool = False,
+    fill_holes: bool = False,
+    simplify_tolerance: float | None = None,
+) -> Path:
+    """
+    Write the valid-data footprint of a raster to a single-feature vector
+    file (default is `<raster stem>_coverage.geojson` next to the raster),
+    with the same filename fields as the `raster_coverage` script.
+    """
+    raster_path = Path(raster_path)
+    output_path = (
+        raster_path.with_name(f"{raster_path.stem}_coverage.geojson")
+        if output_path is None
+        else Path(output_path)
+    )
+
+    footprint, crs = get_raster_footprint(
+        raster_path,
+        overview_level=overview_level,
+        band=band,
+        erode_pixels=erode_pixels,
+        erode_ignores_holes=erode_ignores_holes,
+        fill_holes=fill_holes,
+        simplify_tolerance=simplify_tolerance,
+    )
+    if footprint.is_empty:
+        logger.warning(f"Raster has no valid data pixels: {raster_path}")
+
+    gdf = gpd.GeoDataFrame(
+        {
+            "srcfile": [raster_path.name],
+            "srcf_stem": [raster_path.stem],
+            "outfile": [output_path.name],
+            "outf_stem": [output_path.stem],
+        },
+        geometry=[footprint],
+        crs=crs,
+    )
+    return write_geodataframe(gdf, output_path)
+
+
+if __name__ == "__main__":
+    run(raster_footprint)
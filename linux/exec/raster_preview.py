@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import rasterio as rio
+from numpy.typing import NDArray
+from rasterio.enums import Resampling
+from typer import run
+
+logger = logging.getLogger(__name__)
+
+
+RESAMPLING_SYNONYMS = {
+    "near": Resampling.nearest,
+    "nearest": Resampling.nearest,
+    "bilinear": Resampling.bilinear,
+    "linear": Resampling.bilinear,
+    "cubic": Resampling.cubic,
+    "bicubic": Resampling.cubic,
+}
+OUTPUT_CREATION_OPTIONS = {"tiled": True, "bigtiff": "IF_SAFER", "compress": "LZW"}
+# Overview levels beyond 3 sometimes can't be trusted
+DEFAULT_MAX_OVERVIEW_LEVEL = 3
+
+HILLSHADE_Z_FACTOR = 3
+HILLSHADE_AZIMUTH = 315
+HILLSHADE_ALTITUDE = 45
+
+
+def get_resampling(resampling: str) -> Resampling:
+    try:
+        return RESAMPLING_SYNONYMS[resampling.lower()]
+    except KeyError:
+        return Resampling[resampling.lower()]
+
+
+def get_preview_overview_level(
+    ds: rio.DatasetReader,
+    res: float,
+    max_overview_level: int = DEFAULT_MAX_OVERVIEW_LEVEL,
+) -> int | None:
+    """
+    Pick the coarsest existing overview that is still at least as fine as the
+    target resolution, or None if the full resolution raster must be read.
+    """
+    target_factor = res / max(abs(ds.res[0]), abs(ds.res[1]))
+    overview_level = None
+    for level, factor in enumerate(ds.overviews(1)[: max_overview_level + 1]):
+        if factor > target_factor:
+            break
+        overview_level = level
+    return overview_level
+
+
+def read_preview_array(
+    raster_path: Path,
+    res: float | None = None,
+    resampling: Resampling = Resampling.nearest,
+    max_overview_level: int = DEFAULT_MAX_OVERVIEW_LEVEL,
+) -> tuple[np.ma.MaskedArray, dict[str, Any]]:
+    """
+    Read band 1 of a raster at (about) the target resolution from the closest
+    existing overview, returning the masked array and a matching profile.
+    """
+    with rio.open(raster_path) as ds:
+        profile = ds.profile.copy()
+        if res is None:
+            return ds.read(1, masked=True), profile
+        out_width = max(1, round(ds.width * abs(ds.res[0]) / res))
+        out_height = max(1, round(ds.height * abs(ds.res[1]) / res))
+        transform = ds.transform * rio.Affine.scale(
+            ds.width / out_width, ds.height / out_height
+        )
+        overview_level = get_preview_overview_level(ds, res, max_overview_level)
+
+    open_kwargs = {} if overview_level is None else {"overview_level": overview_level}
+    with rio.open(raster_path, **open_kwargs) as ds:
+        arr = ds.read(
+            1, out_shape=(out_height, out_width), resampling=resampling, masked=True
+        )
+
+    profile.update(width=out_width, height=out_height, transform=transform)
+    return arr, profile
+
+
+def scale_to_byte(arr: np.ma.MaskedArray) -> NDArray[np.uint8]:
+    """
+    Linearly stretch the valid values of an array from their min and max to
+    the range 0-255, like `gdal_translate -ot Byte -scale min max 0 255`.
+    As there, masked values also become 0, the same as the minimum.
+    """
+    valid = arr.compressed()
+    out = np.zeros(arr.shape, dtype=np.uint8)
+    if valid.size == 0:
+        return out
+    vmin, vmax = float(valid.min()), float(valid.max())
+    scale = 255 / (vmax - vmin) if vmax > vmin else 0
+    scaled = np.rint((arr.filled(vmin).astype(np.float64) - vmin) * scale)
+    out[:] = np.clip(scaled, 0, 255)
+    return out
+
+
+def compute_hillshade(
+    arr: np.ma.MaskedArray,
+    res_x: float,
+    res_y: float,
+    z_factor: float = HILLSHADE_Z_FACTOR,
+    azimuth: float = HILLSHADE_AZIMUTH,
+    altitude: float = HILLSHADE_ALTITUDE,
+) -> NDArray[np.uint8]:
+    """
+    Compute a hillshade with Horn's slope method like `gdaldem hillshade
+    -compute_edges`, as Byte values 1-255 with 0 as nodata.
+    """
+    elev = np.pad(np.ma.filled(arr.astype(np.float64), np.nan), 1, mode="edge")
+    a, b, c = elev[:-2, :-2], elev[:-2, 1:-1], elev[:-2, 2:]
+    d, f = elev[1:-1, :-2], elev[1:-1, 2:]
+    g, h, i = elev[2:, :-2], elev[2:, 1:-1], elev[2:, 2:]
+
+    dzdx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8 * res_x)
+    dzdy = ((g + 2 * h + i) - (a + 2 * b + c)) / (8 * res_y)
+
+    slope = np.arctan(z_factor * np.hypot(dzdx, dzdy))
+    aspect = np.arctan2(dzdy, -dzdx)
+    zenith = math.radians(90 - altitude)
+    azimuth_math = math.radians(360 - azimuth + 90)
+
+    shade = np.cos(zenith) * np.cos(slope) + np.sin(zenith) * np.sin(slope) * np.cos(
+        azimuth_math - aspect
+    )
+    out = np.clip(np.rint(1 + 254 * shade), 1, 255)
+    out[np.isnan(out) | np.ma.getmaskarray(arr)] = 0
+    return out.astype(np.uint8)
+
+
+def write_preview_raster(
+    output_path: Path,
+    arr: NDArray[Any],
+    profile: dict[str, Any],
+    nodata: float | None,
+) -> None:
+    profile = {
+        **profile,
+        **OUTPUT_CREATION_OPTIONS,
+        "driver": "GTiff",
+        "count": 1,
+        "dtype": arr.dtype.name,
+        "nodata": nodata,
+    }
+    profile.pop("blockxsize", None)
+    profile.pop("blockysize", None)
+    with rio.open(output_path, "w", **profile) as ds:
+        ds.write(arr, 1)
+
+
+def get_default_output_paths(
+    raster_path: Path,
+    res_meters: float | None,
+    thumb: bool,
+    output_dir: Path | None,
+    hillshade_dir: Path | None,
+) -> tuple[Path, Path]:
+    out_dir = output_dir or raster_path.parent
+    shade_dir = hillshade_dir or raster_path.parent
+    if res_meters is None:
+        return (
+            out_dir / f"{raster_path.stem}_thumb{raster_path.suffix}",
+            shade_dir / f"{raster_path.stem}_shade{raster_path.suffix}",
+        )
+
+    res_str = f"{res_meters:g}m"
+    out_stem = (
+        raster_path.stem
+        if raster_path.stem.endswith(res_str)
+        else f"{raster_path.stem}_{res_str}"
+    )
+    if thumb:
+        out_stem = f"{out_stem}_thumb"
+    return (
+        out_dir / f"{out_stem}{raster_path.suffix}",
+        shade_dir / f"{raster_path.stem}_{res_str}_shade{raster_path.suffix}",
+    )
+
+
+def make_raster_preview(
+    raster_path: Path,
+    output_path: Path | None,
+    hillshade_path: Path | None,
+    res_meters: float | None = 10,
+    resampling: Resampling = Resampling.nearest,
+    thumb: bool = False,
+    overwrite: bool = False,
+    max_overview_level: int = DEFAULT_MAX_OVERVIEW_LEVEL,
+) -> list[Path]:
+    """
+    Write a downsampled (or Byte-stretched thumbnail) raster and/or a
+    hillshade raster from a single read of the closest overview.
+    Existing outputs are skipped unless `overwrite` is set.
+    """
+    todo_output = output_path is not None and (overwrite or not output_path.exists())
+    todo_hillshade = hillshade_path is not None and (
+        overwrite or not hillshade_path.exists()
+    )
+    if not (todo_output or todo_hillshade):
+        logger.info(f"Skipping raster with existing outputs: {raster_path}")
+        return []
+
+    arr, profile = read_preview_array(
+        raster_path, res_meters, resampling, max_overview_level
+    )
+    written = []
+
+    if todo_output and output_path is not None:
+        if thumb:
+            # As gdal_translate does for a source nodata value (like -9999)
+            # that is out of the Byte range, set the nodata value to 0
+            write_preview_raster(
+                output_path,
+                scale_to_byte(arr),
+                profile,
+                nodata=None if profile.get("nodata") is None else 0,
+            )
+        else:
+            write_preview_raster(
+                output_path,
+                arr.filled(profile.get("nodata") or 0),
+                profile,
+                profile.get("nodata"),
+            )
+        written.append(output_path)
+
+    if todo_hillshade and hillshade_path is not None:
+        transform = profile["transform"]
+        shade = compute_hillshade(arr, abs(transform.a), abs(transform.e))
+        write_preview_raster(hillshade_path, shade, profile, nodata=0)
+        written.append(hillshade_path)
+
+    return written
+
+
+def raster_preview(
+    src_paths: list[Path],
+    res_meters: float = 10,
+    resampling: str = "near",
+    output_path: Path | None = None,
+    thumb: bool = False,
+    hillshade: bool = False,
+    hillshade_path: Path | None = None,
+    no_resample: bool = False,
+    keep_downsampled: bool = False,
+    overwrite: bool = False,
+    max_overview_level: int = DEFAULT_MAX_OVERVIEW_LEVEL,
+    max_workers: int = 4,
+) -> None:
+    """
+    Create downsampled previews, Byte-stretched thumbnails (`thumb`) and/or
+    hillshades of many rasters concurrently, with the same default output
+    names as the `preview_rasters` script.
+    Each raster is read once from its closest existing overview at the
+    target resolution, and stretch statistics and hillshade are computed
+    in memory from that read. `output_path` and `hillshade_path` may be
+    file paths for a single source raster or directories for many.
+    With `no_resample`, rasters are read at full resolution and only a
+    thumbnail or hillshade is written.
+    """
+    if hillshade_path is not None:
+        hillshade = True
+    if thumb and hillshade:
+        raise ValueError("'thumb' and 'hillshade' options are mutually exclusive")
+    if len(src_paths) > 1:
+        for path in (output_path, hillshade_path):
+            if path is not None and not path.is_dir():
+                raise ValueError(
+                    f"Output path must be a directory for multiple source files: {path}"
+                )
+
+    res = None if no_resample else res_meters
+    write_output = not hillshade or keep_downsampled or output_path is not None
+    jobs = []
+    for src_path in src_paths:
+        default_output_path, default_hillshade_path = get_default_output_paths(
+            src_path,
+            res,
+            thumb,
+            output_path if output_path is not None and output_path.is_dir() else None,
+            hillshade_path
+            if hillshade_path is not None and hillshade_path.is_dir()
+            else None,
+        )
+        job_output_path = (
+            output_path
+            if output_path is not None and not output_path.is_dir()
+            else default_output_path
+        )
+        job_hillshade_path = (
+            hillshade_path
+            if hillshade_path is not None and not hillshade_path.is_dir()
+            else default_hillshade_path
+        )
+        jobs.append(
+            (
+                src_path,
+                job_output_path
+                if write_output and (res is not None or thumb)
+                else None,
+                job_hillshade_path if hillshade else None,
+            )
+        )
+
+    resampling_method = get_resampling(resampling)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                make_raster_preview,
+                src_path,
+                job_output_path,
+                job_hillshade_path,
+                res_meters=res,
+                resampling=resampling_method,
+                thumb=thumb,
+                overwrite=overwrite,
+                max_overview_level=max_overview_level,
+            )
+            for src_path, job_output_path, job_hillshade_path in jobs
+        ]
+        for (src_path, _, _), future in zip(jobs, futures):
+            for written_path in future.result():
+                print(f"Created preview raster: {src_path} -> {written_path}")
+
+
+if __name__ == "__main__":
+    run(raster_preview)
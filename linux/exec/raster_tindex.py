@@ -16,6 +16,7 @@ import shapely.geometry
 from pydantic import BaseModel, ConfigDict, field_validator
 from shapely import get_coordinates
 
+from geo_output import write_geodataframe
 from typer import run
 
 logger = logging.getLogger(__name__)
@@ -216,7 +217,9 @@ class AllowAnythingModel(BaseModel):
     model_config: ConfigDict = ConfigDict(extra="allow")  # type: ignore [misc]
 
 
-def get_stats_metadata_dict(ds: rio.DatasetReader, approx_stats: bool = False) -> dict[str, Any]:
+def get_stats_metadata_dict(
+    ds: rio.DatasetReader, approx_stats: bool = False
+) -> dict[str, Any]:
     # Calculate GDAL statistics.
     # Suppress `StatisticsError`, which can be caused by raster pixels being all
     # (or nearly all, if `approx_stats=True`) NoData values.
@@ -225,15 +228,21 @@ def get_stats_metadata_dict(ds: rio.DatasetReader, approx_stats: bool = False) -
     except rio.errors.StatisticsError as exc:
         logger.exception(str(exc))
         if approx_stats:
-            logger.warning(f"`approx_stats={approx_stats}`, meaning raster might actually contain some valid pixels")
-        logger.warning("Due to stats calc failure, stats fields will be left null in output tindex file")
+            logger.warning(
+                f"`approx_stats={approx_stats}`, meaning raster might actually contain some valid pixels"
+            )
+        logger.warning(
+            "Due to stats calc failure, stats fields will be left null in output tindex file"
+        )
 
     # Get GDAL band 1 info, which should contain only the stats info we just calculated.
     # It won't exist if stats calculation failed with suppressed error.
     try:
         stats = ds.tags(1)
         if "STATISTICS_MINIMUM" not in stats:
-            raise ValueError("Stats field 'STATISTICS_MINIMUM' not found in dataset `ds.tags(1)`")
+            raise ValueError(
+                "Stats field 'STATISTICS_MINIMUM' not found in dataset `ds.tags(1)`"
+            )
     except (IndexError, ValueError):
         return {
             "STATISTICS_APPROXIMATE": approx_stats,
@@ -244,12 +253,16 @@ def get_stats_metadata_dict(ds: rio.DatasetReader, approx_stats: bool = False) -
             "STATISTICS_VALID_PERCENT": None,
         }
 
-    stats_approximate = str(stats.pop("STATISTICS_APPROXIMATE", approx_stats)).lower() in (
+    stats_approximate = str(
+        stats.pop("STATISTICS_APPROXIMATE", approx_stats)
+    ).lower() in (
         "yes",
         "true",
     )
 
-    dtype_cast_func = int if np.issubdtype(np.dtype(ds.dtypes[0]), np.integer) else float
+    dtype_cast_func = (
+        int if np.issubdtype(np.dtype(ds.dtypes[0]), np.integer) else float
+    )
 
     def cast_numeric_or_string(value: str | float) -> str | int | float:
         try:
@@ -291,18 +304,32 @@ def write_raster_tindex_geojson(
     set_missing_crs_in_meta: bool = False,
     add_fieldname_prefix: str | None = "_",
     add_fieldname_prefix_to_extra_data: bool = False,
+    write_bbox_covering: bool = False,
+    footprint: bool = False,
+    footprint_overview_level: int | None = None,
+    footprint_erode_pixels: int = 0,
+    footprint_fill_holes: bool = False,
+    footprint_simplify_tolerance: float | None = None,
 ) -> Path:
     """
     Create a GeoJSON tile index ("tindex") file representation of the
     input raster containing a single feature, with the raster bounding box
     as geometry and extracted raster metadata as attribute fields.
+    If `footprint` is set, the geometry is instead the valid-data footprint
+    of the raster, computed from the chosen overview level if provided.
     """
     extra_data = json.loads(extra_data_str) if extra_data_str else None
 
     raster_path = Path(raster_path)
-    output_path = raster_path.with_suffix(".geojson") if output_path is None else Path(output_path)
+    output_path = (
+        raster_path.with_suffix(".geojson")
+        if output_path is None
+        else Path(output_path)
+    )
     if output_path.is_file() and output_path.samefile(raster_path):
-        raise ValueError("Default path for output file is the same as input raster path")
+        raise ValueError(
+            "Default path for output file is the same as input raster path"
+        )
 
     if add_fieldname_prefix is None:
         add_fieldname_prefix = ""
@@ -313,9 +340,24 @@ def write_raster_tindex_geojson(
     with rio.open(raster_path) as ds:
         # Get raster full extent bounding box
         bbox = shapely.geometry.box(*ds.bounds)
+        geometry = bbox
+        if footprint:
+            # Imported here so that plain tindex runs don't need the scipy
+            # and grid2tif dependencies of the footprint engine
+            from raster_footprint import get_raster_footprint
+
+            geometry, _ = get_raster_footprint(
+                raster_path,
+                overview_level=footprint_overview_level,
+                erode_pixels=footprint_erode_pixels,
+                fill_holes=footprint_fill_holes,
+                simplify_tolerance=footprint_simplify_tolerance,
+            )
 
         # Get CRS to use for calculations
-        use_crs = ds.crs or (rio.CRS.from_epsg(missing_crs_epsg_code) if missing_crs_epsg_code else None)
+        use_crs = ds.crs or (
+            rio.CRS.from_epsg(missing_crs_epsg_code) if missing_crs_epsg_code else None
+        )
 
         # Calculate statistics and get GDAL stats metadata
         stats = get_stats_metadata_dict(ds, approx_stats=approx_stats)
@@ -347,10 +389,12 @@ def write_raster_tindex_geojson(
         if use_crs and pixel_dx and pixel_dy:
             crs_unit = get_crs_horizontal_unit(pyproj.CRS(use_crs))
             if crs_unit == "degree":
-                pixel_dx_meters, pixel_dy_meters = get_approx_spacing_from_degrees_to_meters(
-                    bbox_deg=bbox,
-                    dx_deg=pixel_dx,
-                    dy_deg=pixel_dy,
+                pixel_dx_meters, pixel_dy_meters = (
+                    get_approx_spacing_from_degrees_to_meters(
+                        bbox_deg=bbox,
+                        dx_deg=pixel_dx,
+                        dy_deg=pixel_dy,
+                    )
                 )
             elif crs_unit in UNIT_IN_METERS:
                 pixel_dx_meters = pixel_dx * UNIT_IN_METERS[crs_unit]
@@ -413,7 +457,9 @@ def write_raster_tindex_geojson(
             export_meta.pop("COMPRESSION", None)
 
         # Rename fields
-        export_meta.pop("count", None)  # Already set "band_count" in `export_meta` above
+        export_meta.pop(
+            "count", None
+        )  # Already set "band_count" in `export_meta` above
 
         added_extra_data = False
 
@@ -422,7 +468,9 @@ def write_raster_tindex_geojson(
             if extra_data and add_fieldname_prefix_to_extra_data:
                 export_meta = {**export_meta, **extra_data}
                 added_extra_data = True
-            export_meta = {f"{add_fieldname_prefix}{k}": v for k, v in export_meta.items()}
+            export_meta = {
+                f"{add_fieldname_prefix}{k}": v for k, v in export_meta.items()
+            }
 
         # Add extra data
         if extra_data and not added_extra_data:
@@ -430,7 +478,9 @@ def write_raster_tindex_geojson(
 
         # Run the metadata through a pydantic model for some sanitizing
         export_meta_model = (
-            AllowAnythingModel(**export_meta) if add_fieldname_prefix else RasterTindexMetadata(**export_meta)
+            AllowAnythingModel(**export_meta)
+            if add_fieldname_prefix
+            else RasterTindexMetadata(**export_meta)
         )
 
         # Assemble data frame with raster bounding box and metadata,
@@ -445,7 +495,7 @@ def write_raster_tindex_geojson(
                 ),
                 # Set geometry in the `data` arg dict because there may be a bug in
                 # setting through the `geometry` arg when `crs` is None.
-                "geometry": bbox,
+                "geometry": geometry,
             },
             crs=use_crs,
         )
@@ -453,20 +503,19 @@ def write_raster_tindex_geojson(
         # If the raster has a CRS, convert the bbox geometry to WGS84 and set derived metadata values
         if gdf.crs:
             gdf.to_crs(crs=rio.CRS.from_epsg(4326), inplace=True)
-            gdf[f"{add_fieldname_prefix}center_lon"], gdf[f"{add_fieldname_prefix}center_lat"] = (
-                get_coordinates(get_geoseries_centroid(gdf.geometry).values[0]).flatten()
-            )
+            (
+                gdf[f"{add_fieldname_prefix}center_lon"],
+                gdf[f"{add_fieldname_prefix}center_lat"],
+            ) = get_coordinates(
+                get_geoseries_centroid(gdf.geometry).values[0]
+            ).flatten()
 
         # Write out the geodataframe to file
         gdf.reset_index(drop=True, inplace=True)
         try:
-            if output_path.suffix.lower() in (".parquet", ".geoparquet"):
-                gdf.to_parquet(str(output_path))
-            else:
-                gdf.to_file(
-                    str(output_path),
-                    driver="GeoJSON" if output_path.suffix.lower() in (".json", ".geojson") else None,
-                )
+            write_geodataframe(
+                gdf, output_path, write_bbox_covering=write_bbox_covering
+            )
         except Exception:
             output_path.unlink(missing_ok=True)
             raise
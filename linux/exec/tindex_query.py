@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+
+import json
+import operator
+import re
+import sys
+from collections.abc import Callable
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+import geopandas as gpd
+import pyarrow.dataset as ds
+import pyogrio
+import pyproj
+import shapely
+from geo_output import BBOX_COVERING_COLUMN, is_parquet_path
+from shapely.geometry.base import BaseGeometry
+from typer import run
+
+# Filename fields written by 'gdaltindex', 'raster_tindex.py' and 'gdaltindex_vrt.py'
+FILENAME_FIELD_CANDIDATES = ("location", "_filename", "filename", "sourceFilename")
+
+WHERE_CLAUSE_REGEX = re.compile(r"^\s*([^\s<>=!]+)\s*(==|=|!=|<=|>=|<|>)\s*(.+?)\s*$")
+WHERE_OPERATORS: dict[str, Callable[[Any, Any], Any]] = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class QueryOutputFormat(str, Enum):
+    FILENAMES = "filenames"
+    GEOJSONSEQ = "geojsonseq"
+
+
+def parse_where_value(value: str) -> str | int | float:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"'):
+        return value[1:-1]
+    for cast_func in (int, float):
+        try:
+            return cast_func(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_where_clause(clause: str) -> tuple[str, str, str | int | float]:
+    match = WHERE_CLAUSE_REGEX.match(clause)
+    if match is None:
+        raise ValueError(
+            f"Cannot parse attribute filter (expected 'FIELD OP VALUE'): {clause}"
+        )
+    field_name, op, value = match.groups()
+    return field_name, op, parse_where_value(value)
+
+
+def get_where_expression(where_clauses: list[str]) -> ds.Expression | None:
+    expr = None
+    for clause in where_clauses:
+        field_name, op, value = parse_where_clause(clause)
+        clause_expr = WHERE_OPERATORS[op](ds.field(field_name), value)
+        expr = clause_expr if expr is None else expr & clause_expr
+    return expr
+
+
+def get_where_sql(where_clauses: list[str]) -> str | None:
+    sql_clauses = []
+    for clause in where_clauses:
+        field_name, op, value = parse_where_clause(clause)
+        value_sql = f"'{value}'" if isinstance(value, str) else str(value)
+        sql_clauses.append(f'"{field_name}" {"=" if op == "==" else op} {value_sql}')
+    return " AND ".join(sql_clauses) if sql_clauses else None
+
+
+def get_geoparquet_geometry_meta(dataset: ds.Dataset) -> tuple[str, dict[str, Any]]:
+    geo_meta = json.loads((dataset.schema.metadata or {}).get(b"geo", b"{}"))
+    geometry_name = geo_meta.get("primary_column", "geometry")
+    return geometry_name, geo_meta.get("columns", {}).get(geometry_name, {})
+
+
+def get_bbox_expression(
+    geometry_meta: dict[str, Any],
+    schema_names: list[str],
+    aoi_bounds: tuple[float, float, float, float],
+) -> ds.Expression | None:
+    """
+    Build a scan filter that keeps rows whose bbox covering column intersects
+    the AOI bounds. Parquet row groups whose bbox column statistics fall
+    outside the AOI are skipped without being read.
+    """
+    covering = geometry_meta.get("covering", {}).get("bbox")
+    if covering is None:
+        if BBOX_COVERING_COLUMN not in schema_names:
+            return None
+        covering = {
+            key: [BBOX_COVERING_COLUMN, key] for key in ("xmin", "ymin", "xmax", "ymax")
+        }
+
+    xmin, ymin, xmax, ymax = aoi_bounds
+    return (
+        (ds.field(*covering["xmin"]) <= xmax)
+        & (ds.field(*covering["xmax"]) >= xmin)
+        & (ds.field(*covering["ymin"]) <= ymax)
+        & (ds.field(*covering["ymax"]) >= ymin)
+    )
+
+
+def get_filename_field(
+    field_names: list[str], filename_field: str | None
+) -> str | None:
+    if filename_field is not None:
+        if filename_field not in field_names:
+            raise ValueError(
+                f"Filename field '{filename_field}' not found in tindex fields"
+            )
+        return filename_field
+    return next(
+        (name for name in FILENAME_FIELD_CANDIDATES if name in field_names), None
+    )
+
+
+def read_aoi_geometry(
+    aoi: str | None,
+    bbox: tuple[float, float, float, float] | None,
+    aoi_crs: str | None,
+    tindex_crs: pyproj.CRS | None,
+) -> BaseGeometry:
+    """
+    Get the AOI as a single geometry in the tindex CRS, from either a vector
+    file path, a WKT string, or bounding box coordinates.
+    """
+    if bbox is not None:
+        aoi_geoseries = gpd.GeoSeries([shapely.box(*bbox)], crs=aoi_crs or tindex_crs)
+    elif aoi is not None and Path(aoi).exists():
+        aoi_geoseries = gpd.read_file(aoi).geometry
+        if aoi_geoseries.crs is None and aoi_crs is not None:
+            aoi_geoseries = aoi_geoseries.set_crs(aoi_crs)
+    elif aoi is not None:
+        aoi_geoseries = gpd.GeoSeries(
+            [shapely.from_wkt(aoi)], crs=aoi_crs or tindex_crs
+        )
+    else:
+        raise ValueError("Either an AOI or a bbox must be provided")
+
+    if tindex_crs is not None and aoi_geoseries.crs is not None:
+        aoi_geoseries = aoi_geoseries.to_crs(tindex_crs)
+    return aoi_geoseries.union_all()
+
+
+def scan_parquet_tindex(
+    tindex_path: Path,
+    aoi_bounds: tuple[float, float, float, float],
+    where_expr: ds.Expression | None,
+    columns: list[str] | None,
+) -> tuple[gpd.GeoDataFrame, str]:
+    dataset = ds.dataset(str(tindex_path), format="parquet", partitioning="hive")
+    geometry_name, geometry_meta = get_geoparquet_geometry_meta(dataset)
+
+    scan_filter = get_bbox_expression(geometry_meta, dataset.schema.names, aoi_bounds)
+    if where_expr is not None:
+        scan_filter = where_expr if scan_filter is None else scan_filter & where_expr
+
+    if columns is not None:
+        columns = list(dict.fromkeys([*columns, geometry_name]))
+    table = dataset.to_table(columns=columns, filter=scan_filter)
+
+    crs = geometry_meta.get("crs", "OGC:CRS84")
+    df = table.drop_columns([geometry_name]).to_pandas()
+    gdf = gpd.GeoDataFrame(
+        df,
+        geometry=gpd.GeoSeries.from_wkb(
+            table.column(geometry_name).to_numpy(zero_copy_only=False),
+            index=df.index,
+        ),
+        crs=crs,
+    )
+    return gdf, geometry_name
+
+
+def get_tindex_crs(tindex_path: Path) -> pyproj.CRS | None:
+    if is_parquet_path(tindex_path) or tindex_path.is_dir():
+        dataset = ds.dataset(str(tindex_path), format="parquet", partitioning="hive")
+        _, geometry_meta = get_geoparquet_geometry_meta(dataset)
+        crs = geometry_meta.get("crs", "OGC:CRS84")
+    else:
+        crs = pyogrio.read_info(str(tindex_path)).get("crs")
+    return pyproj.CRS.from_user_input(crs) if crs is not None else None
+
+
+def query_tindex(
+    tindex_path: Path,
+    aoi_geom: BaseGeometry,
+    where: list[str] | None = None,
+    columns: list[str] | None = None,
+    predicate: str = "intersects",
+) -> gpd.GeoDataFrame:
+    """
+    Return the tindex features that satisfy the spatial predicate against the
+    AOI geometry and all of the attribute filters.
+    For (Geo)Parquet inputs, row groups are first pruned on the bbox covering
+    columns and the attribute filters are pushed down into the Parquet scan.
+    An STR-tree is then built over only the remaining rows for the exact test.
+    """
+    tindex_path = Path(tindex_path)
+    where = where or []
+    aoi_bounds: tuple[float, float, float, float] = aoi_geom.bounds
+
+    if is_parquet_path(tindex_path) or tindex_path.is_dir():
+        gdf, _ = scan_parquet_tindex(
+            tindex_path, aoi_bounds, get_where_expression(where), columns
+        )
+    else:
+        gdf = pyogrio.read_dataframe(
+            str(tindex_path),
+            bbox=aoi_bounds,
+            where=get_where_sql(where),
+            columns=columns,
+        )
+
+    if gdf.empty:
+        return gdf
+
+    tree = shapely.STRtree(gdf.geometry.values)
+    match_idx = tree.query(aoi_geom, predicate=predicate)
+    match_idx.sort()
+    return gdf.iloc[match_idx]
+
+
+def tindex_query(
+    tindex_path: Path,
+    aoi: str | None = None,
+    bbox: tuple[float, float, float, float] | None = None,
+    aoi_crs: str | None = None,
+    where: list[str] | None = None,
+    predicate: str = "intersects",
+    output_format: QueryOutputFormat = QueryOutputFormat.FILENAMES,
+    filename_field: str | None = None,
+    filename_prefix_dir: Path | None = None,
+) -> None:
+    """
+    Print the raster filenames (one per line, for 'gdalbuildvrt -input_file_list'
+    or 'xargs') or GeoJSON features of all tindex/footprint features matching
+    the AOI and attribute filters.
+    The AOI is given as a vector file path or WKT string (`aoi`), or as
+    XMIN YMIN XMAX YMAX coordinates (`bbox`), in `aoi_crs` if the AOI
+    doesn't define its own CRS (default is the tindex CRS).
+    Attribute filters (`where`) look like 'FIELD OP VALUE'.
+    """
+    tindex_path = Path(tindex_path)
+    aoi_geom = read_aoi_geometry(aoi, bbox, aoi_crs, get_tindex_crs(tindex_path))
+
+    gdf = query_tindex(tindex_path, aoi_geom, where=where, predicate=predicate)
+
+    if output_format == QueryOutputFormat.GEOJSONSEQ:
+        for feature in gdf.iterfeatures(na="null", drop_id=True):
+            # Timestamp/date attribute values aren't JSON serializable
+            sys.stdout.write(json.dumps(feature, default=str) + "\n")
+        return
+
+    field = get_filename_field(list(gdf.columns), filename_field)
+    if field is None:
+        raise ValueError(
+            f"Could not find a filename field among: {', '.join(FILENAME_FIELD_CANDIDATES)}"
+        )
+    for filename in gdf[field]:
+        if filename_prefix_dir is not None and not Path(filename).is_absolute():
+            filename = str(filename_prefix_dir / filename)
+        sys.stdout.write(f"{filename}\n")
+
+
+if __name__ == "__main__":
+    run(tindex_query)
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+EXEC_DIR = Path(__file__).resolve().parent.parent / "exec"
+
+# Make the exec/ engine modules importable by the tests
+sys.path.insert(0, str(EXEC_DIR))
+
+
+def run_script(
+    script_name: str,
+    *args: str,
+    bin_dirs: list[Path] | None = None,
+    env: dict[str, str] | None = None,
+    check: bool = True,
+) -> subprocess.CompletedProcess:
+    """
+    Run a script from the exec/ folder. Any `bin_dirs` (with stub programs)
+    come first on the PATH, followed by the folder of the Python interpreter
+    running the tests, so that engine scripts find the same packages.
+    """
+    path_dirs = [str(bin_dir) for bin_dir in bin_dirs or []]
+    path_dirs += [str(Path(sys.executable).parent), os.environ["PATH"]]
+    script_env = dict(os.environ, PATH=os.pathsep.join(path_dirs), **(env or {}))
+    proc = subprocess.run(
+        [str(EXEC_DIR / script_name), *args],
+        capture_output=True,
+        text=True,
+        env=script_env,
+        check=False,
+    )
+    if check and proc.returncode != 0:
+        pytest.fail(
+            f"{script_name} exited with status {proc.returncode}\nstdout:\n{proc.stdout}\nstderr:\n{proc.stderr}"
+        )
+    return proc
+
+
+def write_stub(bin_dir: Path, name: str, script: str) -> Path:
+    """Write an executable bash stub program named `name` into `bin_dir`."""
+    stub_path = bin_dir / name
+    stub_path.write_text(f"#!/bin/bash\n{script}\n")
+    stub_path.chmod(0o755)
+    return stub_path
+
+
+@pytest.fixture
+def bin_dir(tmp_path: Path) -> Path:
+    """Folder for stub programs that tests put in front of the PATH."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    return bin_dir
@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+
+import pytest
+from cleanup_local import parse_find_ls_line
+from conftest import run_script, write_stub
+
+NODES = ["node1", "node2"]
+
+
+@pytest.fixture
+def cluster(tmp_path: Path, bin_dir: Path) -> Path:
+    """
+    Stub 'pbsnodes' and 'ssh' programs for a two node cluster, where the
+    "NODE" part of the cleanup folder path runs the remote command against
+    a local folder for each node.
+    """
+    nodes_dir = tmp_path / "nodes"
+    for node in NODES:
+        (nodes_dir / node / "sub").mkdir(parents=True)
+        (nodes_dir / node / "a.tif").write_bytes(b"x" * 100)
+        (nodes_dir / node / "sub" / "b c.tif").write_bytes(b"x" * 50)
+        (nodes_dir / node / "keep.txt").write_bytes(b"x" * 10)
+    write_stub(bin_dir, "pbsnodes", 'printf "%s up\\n" ' + " ".join(NODES))
+    write_stub(
+        bin_dir,
+        "ssh",
+        'args=("$@"); node="${args[-2]}"; cmd="${args[-1]}"\n'
+        f'eval "${{cmd//NODE/{nodes_dir}/$node}}"',
+    )
+    return nodes_dir
+
+
+def run_cleanup(tmp_path: Path, bin_dir: Path, *args: str) -> dict:
+    home_dir = tmp_path / "home"
+    home_dir.mkdir(exist_ok=True)
+    run_script(
+        "cleanup_local",
+        "ssh",
+        "--cleanup-dir=NODE",
+        "--find-args",
+        '-name "*.tif"',
+        *args,
+        bin_dirs=[bin_dir],
+        env={"HOME": str(home_dir), "USER": Path.home().owner()},
+    )
+    (report_file,) = home_dir.glob("cleanup_local_*_report.json")
+    report = json.loads(report_file.read_text())
+    report_file.unlink()
+    return report
+
+
+def test_wrapper_ssh_dryrun_estimate(
+    cluster: Path, tmp_path: Path, bin_dir: Path
+) -> None:
+    report = run_cleanup(tmp_path, bin_dir, "--ssh-dryrun", "-j", "2")
+
+    assert report["estimate"] is True
+    assert report["total_files"] == 4
+    assert report["total_bytes"] == 300
+    assert [node["node"] for node in report["nodes"]] == NODES
+    assert (cluster / "node1" / "a.tif").exists()
+
+
+def test_wrapper_ssh_cleanup(cluster: Path, tmp_path: Path, bin_dir: Path) -> None:
+    report = run_cleanup(tmp_path, bin_dir)
+
+    assert report["failed_nodes"] == []
+    node1_paths = sorted(file["path"] for file in report["nodes"][0]["files"])
+    assert node1_paths == [
+        str(cluster / "node1" / "a.tif"),
+        str(cluster / "node1" / "sub" / "b c.tif"),
+    ]
+    assert not list(cluster.rglob("*.tif"))
+    assert len(list(cluster.rglob("keep.txt"))) == 2
+
+
+def test_parse_find_ls_line() -> None:
+    line = " 13541424      8 -rw-r--r--   1 user  group   5000 Oct 19 09:46 /tmp/a\\ b\\303\\251.bin\n"
+    removed_file = parse_find_ls_line(line)
+
+    assert removed_file is not None
+    assert removed_file.path == "/tmp/a bé.bin"
+    assert removed_file.size == 5000
+    assert not removed_file.is_dir
@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+
+import cp_parallel
+import pytest
+from conftest import run_script
+from cp_parallel import copy_file_data, get_copy_jobs
+
+
+@pytest.fixture
+def src_files(tmp_path: Path) -> list[Path]:
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    paths = []
+    for i, size in enumerate([0, 1_000, 300_000]):
+        path = src_dir / f"f{i}.bin"
+        path.write_bytes(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize(
+    "disabled", [(), ("copy_file_range",), ("copy_file_range", "sendfile")]
+)
+def test_copy_file_data(
+    src_files: list[Path],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    disabled: tuple[str, ...],
+) -> None:
+    for name in disabled:
+        monkeypatch.delattr(os, name, raising=False)
+    monkeypatch.setattr(cp_parallel, "COPY_CHUNK_SIZE", 4096)
+    src_path = src_files[2]
+    dst_path = tmp_path / "dst.bin"
+    src_fd = os.open(src_path, os.O_RDONLY)
+    dst_fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT)
+    try:
+        copy_file_data(src_fd, dst_fd, src_path.stat().st_size)
+    finally:
+        os.close(src_fd)
+        os.close(dst_fd)
+
+    assert dst_path.read_bytes() == src_path.read_bytes()
+
+
+def test_cp_p_jobs(src_files: list[Path], tmp_path: Path) -> None:
+    dst_dir = tmp_path / "new" / "dst"
+    proc = run_script("cp_p", "--jobs=2", *map(str, src_files), f"{dst_dir}/")
+
+    assert "3 copied" in proc.stderr
+    for src_path in src_files:
+        dst_path = dst_dir / src_path.name
+        assert dst_path.read_bytes() == src_path.read_bytes()
+        assert dst_path.stat().st_mtime_ns == src_path.stat().st_mtime_ns
+
+    proc = run_script("cp_p", "--jobs=2", *map(str, src_files), f"{dst_dir}/")
+    assert "3 skipped" in proc.stderr
+
+
+def test_cp_pp_jobs_target_directory(src_files: list[Path], tmp_path: Path) -> None:
+    dst_dir = tmp_path / "dst"
+    run_script(
+        "cp_pp", "-j", "2", "--prefix=x_", "-t", str(dst_dir), *map(str, src_files)
+    )
+
+    for src_path in src_files:
+        assert (dst_dir / f"x_{src_path.name}").read_bytes() == src_path.read_bytes()
+
+
+def test_get_copy_jobs_duplicate_destination(tmp_path: Path) -> None:
+    src_paths = []
+    for src_dir in ("s1", "s2"):
+        (tmp_path / src_dir).mkdir()
+        src_paths.append(tmp_path / src_dir / "x.bin")
+        src_paths[-1].write_bytes(src_dir.encode())
+    dst_dir = tmp_path / "d"
+
+    jobs, _ = get_copy_jobs([str(src_paths[0]), str(src_paths[0]), f"{dst_dir}/"])
+    assert jobs == [(str(src_paths[0]), str(dst_dir / "x.bin"))]
+
+    with pytest.raises(ValueError, match="Will not overwrite just-created"):
+        get_copy_jobs([*map(str, src_paths), f"{dst_dir}/"])
+
+    proc = run_script(
+        "cp_p", "-j", "4", *map(str, src_paths), f"{dst_dir}/", check=False
+    )
+    assert proc.returncode != 0
+    assert not (dst_dir / "x.bin").exists()
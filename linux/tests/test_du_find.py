@@ -0,0 +1,164 @@
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import du_snapshot
+import pytest
+from conftest import run_script
+from du_find import compile_name_matcher, get_disk_usage, get_outermost_paths
+from du_snapshot import DiskUsageSnapshot, get_snapshot_disk_usage
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    root = tmp_path / "tree"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "c").mkdir()
+    (root / "a" / "f1").write_bytes(os.urandom(100_000))
+    (root / "a" / "b" / "f2.txt").write_bytes(os.urandom(5_000))
+    (root / "c" / "f3.txt").write_bytes(os.urandom(30_000))
+    os.link(root / "c" / "f3.txt", root / "hl.txt")
+    return root
+
+
+def get_du_kib(*paths: Path) -> int:
+    proc = subprocess.run(
+        ["du", "-sck", *map(str, paths)], capture_output=True, text=True, check=True
+    )
+    return int(proc.stdout.splitlines()[-1].split()[0])
+
+
+def test_compile_name_matcher() -> None:
+    matcher = compile_name_matcher(["*.txt", "f?"])
+
+    assert matcher is not None
+    assert matcher("f2.txt")
+    assert matcher("f1")
+    assert not matcher("f10")
+
+
+def test_get_disk_usage_shared_visited_dirs(tree: Path) -> None:
+    seen_inodes: set[tuple[int, int]] = set()
+    visited_dirs: set[tuple[int, int]] = set()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        usages = [
+            get_disk_usage(
+                str(path), executor, seen_inodes=seen_inodes, visited_dirs=visited_dirs
+            )
+            for path in (tree / "a", tree, tree / "c")
+        ]
+
+    assert usages[2] == 0
+    assert sum(usages) == get_du_kib(tree) * 1024
+
+
+def test_get_outermost_paths() -> None:
+    assert get_outermost_paths(["x/a", "x", "x/", "y", "x/c", "y"]) == ["x", "y"]
+
+
+@pytest.mark.parametrize("order", [(".", "a", "c"), ("a", ".", "c")])
+def test_wrapper_sum_overlapping_paths(tree: Path, order: tuple[str, ...]) -> None:
+    paths = [str(tree / path) for path in order]
+    proc = run_script("du_find", "-s", "-K", *paths)
+
+    assert proc.stdout.strip() == str(get_du_kib(tree))
+
+
+def test_wrapper_snapshot_sum_overlapping_paths(tree: Path, tmp_path: Path) -> None:
+    snapshot = str(tmp_path / "snapshot.db")
+    paths = [str(tree / "a"), str(tree), str(tree / "c")]
+    proc = run_script("du_find", "-s", "-K", f"--snapshot={snapshot}", *paths)
+    proc_only = run_script(
+        "du_find", "-s", "-K", f"--snapshot={snapshot}", "--snapshot-only", *paths
+    )
+
+    assert proc.stdout.strip() == proc_only.stdout.strip() == str(get_du_kib(tree))
+
+
+def test_wrapper_name_filter(tree: Path) -> None:
+    proc = run_script("du_find", "-K", "-n", "*.txt", str(tree), str(tree / "a"))
+
+    assert proc.stdout.split() == [
+        str(get_du_kib(tree / "a" / "b" / "f2.txt", tree / "c" / "f3.txt")),
+        str(tree),
+        str(get_du_kib(tree / "a" / "b" / "f2.txt")),
+        str(tree / "a"),
+    ]
+
+
+def get_snapshot_usages(tree: Path, snapshot_path: Path) -> tuple[int, int]:
+    """Refresh the snapshot of a tree, then query it without walking."""
+    with (
+        ThreadPoolExecutor(max_workers=4) as executor,
+        DiskUsageSnapshot(snapshot_path) as snapshot,
+    ):
+        usage = get_snapshot_disk_usage(str(tree), executor, snapshot)
+        return usage, snapshot.query_disk_usage(str(tree))
+
+
+def test_snapshot_incremental_refresh(tree: Path, tmp_path: Path) -> None:
+    snapshot_path = tmp_path / "snapshot.db"
+    changes = [
+        lambda: None,
+        lambda: (tree / "a" / "new").mkdir(),
+        lambda: (tree / "a" / "new" / "f4").write_bytes(os.urandom(20_000)),
+        lambda: (tree / "a" / "b").rename(tree / "c" / "b2"),
+        lambda: (tree / "c" / "b2" / "f2.txt").unlink(),
+        lambda: subprocess.run(["rm", "-r", str(tree / "a")], check=True),
+    ]
+    for change in changes:
+        change()
+        usages = get_snapshot_usages(tree, snapshot_path)
+        assert usages == (get_du_kib(tree) * 1024,) * 2
+
+    with DiskUsageSnapshot(snapshot_path) as snapshot:
+        assert snapshot.query_disk_usage(str(tree / "c" / "b2")) == (
+            get_du_kib(tree / "c" / "b2") * 1024
+        )
+        with pytest.raises(ValueError, match="not in snapshot"):
+            snapshot.query_disk_usage(str(tree / "a"))
+
+
+def test_snapshot_interrupted_walk(
+    tree: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    snapshot_path = tmp_path / "snapshot.db"
+    summarize_directory = du_snapshot.summarize_directory
+
+    def fail_in_subdir(dir_path: str) -> du_snapshot.DirSummary:
+        if dir_path == str(tree / "a"):
+            raise KeyboardInterrupt
+        return summarize_directory(dir_path)
+
+    monkeypatch.setattr(du_snapshot, "summarize_directory", fail_in_subdir)
+    with pytest.raises(KeyboardInterrupt):
+        get_snapshot_usages(tree, snapshot_path)
+    monkeypatch.undo()
+
+    assert get_snapshot_usages(tree, snapshot_path) == (get_du_kib(tree) * 1024,) * 2
+
+
+def test_snapshot_unreadable_subdir(
+    tree: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    snapshot_path = tmp_path / "snapshot.db"
+    scandir = os.scandir
+
+    def fail_in_subdir(path: str) -> "os._ScandirIterator[str]":
+        if path == str(tree / "a"):
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(du_snapshot.os, "scandir", fail_in_subdir)
+    with (
+        ThreadPoolExecutor(max_workers=4) as executor,
+        DiskUsageSnapshot(snapshot_path) as snapshot,
+    ):
+        get_snapshot_disk_usage(str(tree), executor, snapshot)
+        # The unread directory must not be answered from the snapshot
+        with pytest.raises(ValueError, match="incomplete"):
+            snapshot.query_disk_usage(str(tree))
+    monkeypatch.undo()
+
+    assert get_snapshot_usages(tree, snapshot_path) == (get_du_kib(tree) * 1024,) * 2
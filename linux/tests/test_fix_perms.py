@@ -0,0 +1,74 @@
+import shutil
+import stat
+from pathlib import Path
+
+import pytest
+from conftest import run_script
+from fix_perms import compile_symbolic_mode
+
+
+def get_mode(path: Path) -> int:
+    return stat.S_IMODE(path.lstat().st_mode)
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    root = tmp_path / "tree"
+    (root / "sub").mkdir(parents=True)
+    (root / "data.txt").touch(mode=0o600)
+    (root / "run.sh").touch(mode=0o700)
+    (root / "sub" / "notes.txt").touch(mode=0o600)
+    (root / "link").symlink_to("data.txt")
+    root.chmod(0o700)
+    (root / "sub").chmod(0o700)
+    return root
+
+
+@pytest.mark.parametrize(
+    ("spec", "mode", "is_dir", "expected"),
+    [
+        ("u=rwX,g=rwX,o=rX", 0o600, False, 0o664),
+        ("u=rwX,g=rwX,o=rX", 0o700, False, 0o775),
+        ("u=rwX,g=rwX,o=rX", 0o700, True, 0o775),
+        ("u=rwx,g=rwx,o=rx,g+s", 0o700, True, 0o2775),
+        ("u=rw,g=r,o=", 0o2775, True, 0o2640),
+        ("u=rw,g=r,o=,g-s", 0o2775, True, 0o640),
+        ("g-w,o-rwx", 0o777, False, 0o750),
+    ],
+)
+def test_compile_symbolic_mode(
+    spec: str, mode: int, is_dir: bool, expected: int
+) -> None:
+    assert compile_symbolic_mode(spec)(mode, is_dir) == expected
+
+
+def test_wrapper_runs_engine(tree: Path) -> None:
+    proc = run_script("fix_perms", "--add-group-s", "folders", "775", str(tree))
+
+    assert "Changed perms of 5 of 6 entries" in proc.stdout
+    assert get_mode(tree) == 0o2775
+    assert get_mode(tree / "sub") == 0o2775
+    assert get_mode(tree / "data.txt") == 0o664
+    assert get_mode(tree / "run.sh") == 0o775
+    assert get_mode(tree / "sub" / "notes.txt") == 0o664
+
+
+def test_wrapper_engine_matches_find(tree: Path, tmp_path: Path) -> None:
+    find_tree = tmp_path / "find_tree"
+    shutil.copytree(tree, find_tree, symlinks=True)
+    run_script("fix_perms", "--remove-file-x", "770", str(tree))
+    run_script("fix_perms", "--remove-file-x", "--use-find", "770", str(find_tree))
+
+    for path in tree.rglob("*"):
+        assert get_mode(path) == get_mode(find_tree / path.relative_to(tree)), path
+
+
+def test_wrapper_identify(tree: Path) -> None:
+    proc = run_script("fix_perms", "-i", "-n", "*.txt", "775", str(tree))
+
+    assert set(proc.stdout.splitlines()) >= {
+        str(tree / "data.txt"),
+        str(tree / "sub" / "notes.txt"),
+    }
+    assert str(tree / "run.sh") not in proc.stdout
+    assert get_mode(tree / "data.txt") == 0o600
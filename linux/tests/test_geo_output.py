@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pyarrow.dataset as ds
+import pytest
+from geo_output import (
+    get_quadkey_distance,
+    get_utm_zone,
+    sort_geodataframe_spatially,
+    write_geodataframe,
+)
+from shapely.geometry import Point, box
+
+
+@pytest.fixture
+def gdf() -> gpd.GeoDataFrame:
+    # Alternate features between two UTM zones, so that neither partition is
+    # a contiguous run of rows
+    return gpd.GeoDataFrame(
+        {"name": [f"f{i}" for i in range(8)]},
+        geometry=[box((i % 2) * 10, i, (i % 2) * 10 + 1, i + 1) for i in range(8)],
+        crs="EPSG:4326",
+    )
+
+
+def test_get_utm_zone(gdf: gpd.GeoDataFrame) -> None:
+    assert get_utm_zone(gdf.geometry).tolist() == ["31N", "32N"] * 4
+    assert get_utm_zone(gpd.GeoSeries([Point(-70.5, -20)])).tolist() == ["19S"]
+
+
+def test_get_quadkey_distance() -> None:
+    geoseries = gpd.GeoSeries([Point(0, 0), Point(1, 1), Point(0, 1), Point(1, 0)])
+
+    # Top-left, top-right, bottom-left, bottom-right in quadkey order
+    assert np.argsort(get_quadkey_distance(geoseries, level=1)).tolist() == [
+        2,
+        1,
+        0,
+        3,
+    ]
+
+
+def test_sort_geodataframe_spatially_hilbert(gdf: gpd.GeoDataFrame) -> None:
+    sorted_gdf = sort_geodataframe_spatially(gdf, "hilbert")
+
+    assert sorted(sorted_gdf["name"]) == sorted(gdf["name"])
+    assert sorted_gdf.index.tolist() == list(range(len(gdf)))
+    # Features in the same zone end up next to each other
+    assert get_utm_zone(sorted_gdf.geometry).tolist() in (
+        ["31N"] * 4 + ["32N"] * 4,
+        ["32N"] * 4 + ["31N"] * 4,
+    )
+
+
+def test_sort_geodataframe_spatially_quadkey(gdf: gpd.GeoDataFrame) -> None:
+    sorted_gdf = sort_geodataframe_spatially(gdf, "quadkey")
+
+    # Top-left, top-right, bottom-left, then bottom-right quadrant
+    assert sorted_gdf["name"].tolist() == [
+        "f6",
+        "f4",
+        "f7",
+        "f5",
+        "f2",
+        "f0",
+        "f3",
+        "f1",
+    ]
+    assert sorted_gdf.index.tolist() == list(range(len(gdf)))
+
+
+def test_write_partitioned_round_trip(gdf: gpd.GeoDataFrame, tmp_path: Path) -> None:
+    output_dir = write_geodataframe(
+        gdf, tmp_path / "parts", partition_by="utm_zone", write_bbox_covering=True
+    )
+
+    assert sorted(path.name for path in output_dir.iterdir()) == [
+        "utm_zone=31N",
+        "utm_zone=32N",
+    ]
+    dataset = ds.dataset(str(output_dir), format="parquet", partitioning="hive")
+    assert "__index_level_0__" not in dataset.schema.names
+
+    read_gdf = gpd.read_parquet(output_dir).sort_values("name", ignore_index=True)
+    assert read_gdf["name"].tolist() == gdf["name"].tolist()
+    assert read_gdf["utm_zone"].astype(str).tolist() == ["31N", "32N"] * 4
+    assert read_gdf.geometry.geom_equals(gdf.geometry).all()
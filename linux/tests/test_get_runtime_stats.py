@@ -0,0 +1,50 @@
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from conftest import run_script
+from get_runtime_stats import parse_timestamp
+
+
+@pytest.fixture
+def utc_host(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_parse_timestamp_across_dst_change(utc_host: None) -> None:
+    start_sec = parse_timestamp("Sat Mar 12 23:00:00 CST 2022")
+    end_sec = parse_timestamp("Sun Mar 13 04:00:00 CDT 2022")
+
+    assert (end_sec - start_sec) / 60 == 240
+    assert parse_timestamp("Sun Mar 13 09:00:00 UTC 2022") == end_sec
+
+
+def test_parse_timestamp_formats(utc_host: None) -> None:
+    expected_sec = parse_timestamp("2022-03-13 09:00:00")
+
+    assert parse_timestamp("03/13/2022 09:00:00") == expected_sec
+    assert parse_timestamp("Sun Mar 13 09:00:00 2022") == expected_sec
+    assert parse_timestamp("2022-03-13T09:00:00") == expected_sec
+
+
+def test_wrapper_runs_engine(tmp_path: Path) -> None:
+    log_dir = tmp_path / "logs"
+    (log_dir / "sub").mkdir(parents=True)
+    (log_dir / "a.log").write_text(
+        "Sat Mar 12 23:00:00 CST 2022 start\nworking\nSun Mar 13 04:00:00 CDT 2022 end\n"
+    )
+    (log_dir / "sub" / "b.log").write_text(
+        "Sun Mar 13 10:00:00 UTC 2022 start\nSun Mar 13 10:30:00 UTC 2022 end\n"
+    )
+    (log_dir / "c.txt").write_text("Sun Mar 13 10:00:00 UTC 2022\n")
+    proc = run_script("get_runtime_stats", str(log_dir))
+
+    lines = proc.stdout.splitlines()
+    assert "cnt: 2" in lines
+    assert "sum: 270" in lines
+    assert f"max: 240 ({log_dir / 'a.log'})" in lines
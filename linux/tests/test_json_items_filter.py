@@ -0,0 +1,42 @@
+import json
+import subprocess
+import sys
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from conftest import EXEC_DIR
+from json_items_filter import iter_json_items
+
+ARRAY_TEXT = '[1.5e10, true,null ,-2,{"a": [1, "]"]}, "x,y"]'
+ARRAY_ITEMS = [1.5e10, True, None, -2, {"a": [1, "]"]}, "x,y"]
+LINES_TEXT = '1.5e10\n-3 22\n{"b": 1}\nfalse'
+LINES_ITEMS = [1.5e10, -3, 22, {"b": 1}, False]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 1 << 20])
+def test_iter_json_items_chunk_boundaries(chunk_size: int) -> None:
+    assert list(iter_json_items(StringIO("[1.5e10]"), chunk_size)) == [1.5e10]
+    assert list(iter_json_items(StringIO(ARRAY_TEXT), chunk_size)) == ARRAY_ITEMS
+    assert list(iter_json_items(StringIO(LINES_TEXT), chunk_size)) == LINES_ITEMS
+
+
+def test_iter_json_items_invalid() -> None:
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_items(StringIO("[1, 2x]"), chunk_size=2))
+
+
+def test_whitelist_script(tmp_path: Path) -> None:
+    json_file = tmp_path / "items.json"
+    json_file.write_text(
+        json.dumps([{"id": 1, "c": "a"}, {"id": 2, "c": "b"}, {"id": 3, "c": "a"}])
+    )
+    proc = subprocess.run(
+        [sys.executable, str(EXEC_DIR / "json_items_whitelist.py"), str(json_file)],
+        input='"c": "a",\n',
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert [item["id"] for item in json.loads(proc.stdout)] == [1, 3]
@@ -0,0 +1,132 @@
+import json
+import subprocess
+import sys
+from typing import Any
+
+import pytest
+from conftest import EXEC_DIR
+from json_predicate import PredicateSyntaxError, compile_predicate
+
+ITEMS: list[Any] = [
+    {
+        "id": "a1",
+        "collection": "dem",
+        "properties": {"eo:cloud_cover": 5, "gsd": "2.0", "flag": True},
+        "links": [{"rel": "self"}],
+    },
+    {
+        "id": "test-b2",
+        "collection": "ortho",
+        "properties": {"eo:cloud_cover": 35.5, "gsd": 0.5, "flag": False},
+        "links": [],
+    },
+    {"id": "c3", "collection": "dem", "properties": {"eo:cloud_cover": None}},
+    "not an object",
+]
+
+
+def get_matching_ids(predicate: str) -> list[str]:
+    matcher = compile_predicate(predicate)
+    return [
+        item["id"] if isinstance(item, dict) else item
+        for item in ITEMS
+        if matcher(item)
+    ]
+
+
+@pytest.mark.parametrize(
+    ("predicate", "ids"),
+    [
+        ("properties.eo:cloud_cover < 20", ["a1"]),
+        ("properties.eo:cloud_cover >= 5.0", ["a1", "test-b2"]),
+        # Numeric strings compare as numbers against numeric literals
+        ("properties.gsd == 2", ["a1"]),
+        ("properties.gsd < 1", ["test-b2"]),
+        ("properties.eo:cloud_cover = null", ["c3"]),
+        # A boolean never equals a number
+        ("properties.flag = 1", []),
+        ("properties.flag = true", ["a1"]),
+        ("collection != 'dem'", ["test-b2"]),
+        ("collection > 'e'", ["test-b2"]),
+        ("links.0.rel = 'self'", ["a1"]),
+        ("links.0.rel exists", ["a1"]),
+        ("links exists and not links.0 exists", ["test-b2"]),
+        ('id =~ "^test"', ["test-b2"]),
+        ('id !~ "^test"', ["a1", "c3"]),
+        ("collection in ['ortho', 'lidar']", ["test-b2"]),
+        ("collection not in ['ortho']", ["a1", "c3"]),
+        ("properties.gsd in [2, 3]", ["a1"]),
+        ("collection in []", []),
+    ],
+)
+def test_comparisons(predicate: str, ids: list[str]) -> None:
+    assert get_matching_ids(predicate) == ids
+
+
+@pytest.mark.parametrize(
+    ("predicate", "ids"),
+    [
+        ("collection = 'dem' and properties.eo:cloud_cover < 20", ["a1"]),
+        ("collection = 'ortho' or id = 'c3'", ["test-b2", "c3"]),
+        # "and" binds tighter than "or"
+        ("id = 'c3' or collection = 'dem' and id = 'x'", ["c3"]),
+        ("(id = 'c3' or collection = 'dem') and id = 'a1'", ["a1"]),
+        # Negation also matches items that don't have the key path at all
+        ("not collection = 'dem'", ["test-b2", "not an object"]),
+        (
+            "NOT (collection = 'dem' AND properties.flag = true)",
+            ["test-b2", "c3", "not an object"],
+        ),
+    ],
+)
+def test_boolean_operators(predicate: str, ids: list[str]) -> None:
+    assert get_matching_ids(predicate) == ids
+
+
+def test_missing_key_path() -> None:
+    matcher = compile_predicate("properties.eo:cloud_cover != 5")
+
+    assert [matcher(item) for item in ITEMS] == [False, True, True, False]
+    assert not compile_predicate("missing = 1")(ITEMS[0])
+    assert compile_predicate("not missing = 1")(ITEMS[0])
+    assert not compile_predicate("id.x exists")(ITEMS[0])
+
+
+@pytest.mark.parametrize(
+    "predicate",
+    [
+        "",
+        "id",
+        "id = ",
+        "id = 'a' and",
+        "(id = 'a'",
+        "id = 'a')",
+        "id in ['a'",
+        "id = other",
+        "id =~ 5",
+        "id = 'a' ; x",
+    ],
+)
+def test_syntax_errors(predicate: str) -> None:
+    with pytest.raises(PredicateSyntaxError):
+        compile_predicate(predicate)
+
+
+def test_filter_script_where() -> None:
+    proc = subprocess.run(
+        [
+            sys.executable,
+            str(EXEC_DIR / "json_items_filter.py"),
+            "-",
+            "--mode",
+            "blacklist",
+            "--where",
+            "properties.eo:cloud_cover < 20",
+        ],
+        input="\n".join(json.dumps(item) for item in ITEMS[:3]),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert [item["id"] for item in json.loads(proc.stdout)] == ["test-b2", "c3"]
@@ -0,0 +1,88 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from conftest import EXEC_DIR
+
+MAKE_LINKS = str(EXEC_DIR / "make_links.py")
+
+
+def run_make_links(*args: str, max_open_files: int | None = None) -> str:
+    cmd = [sys.executable, MAKE_LINKS, *args]
+    if max_open_files is not None:
+        cmd = ["bash", "-c", f'ulimit -n {max_open_files} && exec "$@"', "-", *cmd]
+    proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return proc.stdout
+
+
+def test_wide_tree_within_open_file_limit(tmp_path: Path) -> None:
+    src_dir = tmp_path / "src"
+    for i in range(600):
+        (src_dir / f"d{i}").mkdir(parents=True)
+        (src_dir / f"d{i}" / "file.txt").touch()
+
+    stdout = run_make_links(
+        "--src",
+        str(src_dir),
+        "--dst",
+        str(tmp_path / "dst"),
+        "--silent",
+        max_open_files=64,
+    )
+
+    assert stdout == ""
+    assert len(list((tmp_path / "dst").rglob("file.txt"))) == 600
+
+
+def test_dryrun_reports_existing_files(tmp_path: Path) -> None:
+    src_dir = tmp_path / "src"
+    dst_dir = tmp_path / "dst"
+    src_dir.mkdir()
+    dst_dir.mkdir()
+    for name in ("linked.txt", "other.txt", "new.txt"):
+        (src_dir / name).touch()
+    (dst_dir / "linked.txt").hardlink_to(src_dir / "linked.txt")
+    (dst_dir / "other.txt").touch()
+
+    stdout = run_make_links("--src", str(src_dir), "--dst", str(dst_dir), "--dryrun")
+
+    assert f"Correct link already exists: {dst_dir / 'linked.txt'}" in stdout
+    assert f"will be skipped: {dst_dir / 'other.txt'}" in stdout
+    assert f"LINKING: {src_dir / 'new.txt'} --> {dst_dir / 'new.txt'}" in stdout
+    assert "created=1, already-correct=1, replaced=0, skipped=1" in stdout
+    assert not (dst_dir / "new.txt").exists()
+
+
+def test_flist_relative_paths_without_dir(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.tif").touch()
+    (tmp_path / "flist.txt").write_text("a.tif\n")
+
+    stdout = run_make_links("--src", "flist.txt", "--dst", "dst")
+
+    assert "Missing source file" not in stdout
+    assert (tmp_path / "dst" / "a.tif").exists()
+
+
+def test_hardlinks_source_symlinks_themselves(tmp_path: Path) -> None:
+    src_dir = tmp_path / "src"
+    dst_dir = tmp_path / "dst"
+    src_dir.mkdir()
+    (src_dir / "file.txt").write_text("x")
+    (src_dir / "link.txt").symlink_to("file.txt")
+    (src_dir / "broken.txt").symlink_to("missing.txt")
+
+    stdout = run_make_links("--src", str(src_dir), "--dst", str(dst_dir))
+    assert "created=3, already-correct=0, replaced=0, skipped=0" in stdout
+
+    for name in ("link.txt", "broken.txt"):
+        dst_path = dst_dir / name
+        assert dst_path.is_symlink()
+        assert dst_path.lstat().st_ino == (src_dir / name).lstat().st_ino
+    assert (dst_dir / "link.txt").read_text() == "x"
+
+    stdout = run_make_links("--src", str(src_dir), "--dst", str(dst_dir))
+    assert "created=0, already-correct=3, replaced=0, skipped=0" in stdout
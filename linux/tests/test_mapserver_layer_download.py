@@ -0,0 +1,318 @@
+import json
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, ClassVar
+from urllib.parse import parse_qs, urlsplit
+
+import geopandas as gpd
+import pytest
+from mapserver_layer_download import (
+    CHECKPOINT_FILENAME,
+    DownloadStrategy,
+    LayerQueryClient,
+    LayerRequestError,
+    build_geometry_from_columns,
+    get_layer_record_count,
+    mapserver_layer_download,
+)
+
+
+class LayerHandler(BaseHTTPRequestHandler):
+    """
+    Serves queued (status, JSON body) responses for each request path, or an
+    empty JSON object once the queue for a path runs out.
+    """
+
+    protocol_version = "HTTP/1.1"
+    path_responses: ClassVar[dict[str, list[tuple[int, dict]]]] = {}
+    requests: ClassVar[list[str]] = []
+    client_ports: ClassVar[set[int]] = set()
+
+    def do_GET(self) -> None:
+        self.requests.append(self.path)
+        self.client_ports.add(self.client_address[1])
+        queue = self.path_responses.get(self.path.split("?")[0], [])
+        status, data = queue.pop(0) if queue else (200, {})
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def layer_url() -> Iterator[str]:
+    LayerHandler.path_responses = {}
+    LayerHandler.requests = []
+    LayerHandler.client_ports = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LayerHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/rest/services/x/MapServer/0"
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_json_reuses_connection(layer_url: str) -> None:
+    LayerHandler.path_responses["/rest/services/x/MapServer/0/query"] = [
+        (200, {"count": 7})
+    ] * 3
+    with LayerQueryClient(layer_url, max_connections=1) as client:
+        for _ in range(3):
+            assert client.get_json("/query", {"where": "1=1", "f": "json"}) == {
+                "count": 7
+            }
+
+    assert (
+        LayerHandler.requests
+        == ["/rest/services/x/MapServer/0/query?where=1%3D1&f=json"] * 3
+    )
+    assert len(LayerHandler.client_ports) == 1
+
+
+def test_get_retries_server_errors(layer_url: str) -> None:
+    LayerHandler.path_responses["/rest/services/x/MapServer/0"] = [
+        (503, {}),
+        (502, {}),
+        (200, {"name": "layer"}),
+    ]
+    with LayerQueryClient(layer_url, retry_backoff_seconds=0) as client:
+        assert client.get_json() == {"name": "layer"}
+
+    assert len(LayerHandler.requests) == 3
+
+
+def test_get_fails_after_max_retries(layer_url: str) -> None:
+    LayerHandler.path_responses["/rest/services/x/MapServer/0"] = [(500, {})] * 3
+    with (
+        LayerQueryClient(layer_url, max_retries=2, retry_backoff_seconds=0) as client,
+        pytest.raises(LayerRequestError, match="after 3 attempts"),
+    ):
+        client.get()
+
+
+def test_get_client_error_not_retried(layer_url: str) -> None:
+    LayerHandler.path_responses["/rest/services/x/MapServer/0"] = [(404, {})]
+    with LayerQueryClient(layer_url, retry_backoff_seconds=0) as client:
+        with pytest.raises(ValueError, match="HTTP 404"):
+            client.get()
+        assert client.get_json() == {}
+
+    assert len(LayerHandler.requests) == 2
+
+
+def test_get_json_error_response(layer_url: str) -> None:
+    LayerHandler.path_responses["/rest/services/x/MapServer/0"] = [
+        (200, {"error": {"code": 400}})
+    ]
+    with (
+        LayerQueryClient(layer_url) as client,
+        pytest.raises(LayerRequestError, match="returned error"),
+    ):
+        client.get_json()
+
+
+def test_get_layer_record_count_falls_back_to_ids(layer_url: str) -> None:
+    LayerHandler.path_responses["/rest/services/x/MapServer/0/query"] = [
+        (200, {"error": {"code": 400}}),
+        (200, {"objectIds": [1, 2, 3]}),
+    ]
+    with LayerQueryClient(layer_url) as client:
+        assert get_layer_record_count(client) == 3
+
+
+def test_unsupported_scheme() -> None:
+    with pytest.raises(ValueError, match="Unsupported layer URL scheme"):
+        LayerQueryClient("ftp://example.com/layer")
+
+
+class FakeLayerHandler(BaseHTTPRequestHandler):
+    """
+    Serves a layer of point records with "x" and "y" attributes, answering
+    offset and envelope queries like an ArcGIS map server with a record
+    limit. Queries at any offset in `fail_offsets` get an HTTP 500 response.
+    """
+
+    protocol_version = "HTTP/1.1"
+    layer_path = "/rest/services/x/MapServer/0"
+    records: ClassVar[list[dict[str, Any]]] = []
+    max_record_count = 3
+    fail_offsets: ClassVar[set[int]] = set()
+    queries: ClassVar[list[dict[str, str]]] = []
+
+    def query(self, params: dict[str, str]) -> tuple[int, dict[str, Any]]:
+        self.queries.append(params)
+        if params.get("returnCountOnly") == "true":
+            return 200, {"count": len(self.records)}
+        offset = int(params["resultOffset"])
+        if offset in self.fail_offsets:
+            return 500, {}
+        records = self.records
+        if "geometry" in params:
+            xmin, ymin, xmax, ymax = map(float, params["geometry"].split(","))
+            records = [
+                r for r in records if xmin <= r["x"] <= xmax and ymin <= r["y"] <= ymax
+            ]
+        limit = min(int(params["resultRecordCount"]), self.max_record_count)
+        return 200, {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": None, "properties": r}
+                for r in records[offset : offset + limit]
+            ],
+            "properties": {"exceededTransferLimit": offset + limit < len(records)},
+        }
+
+    def do_GET(self) -> None:
+        url_parts = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url_parts.query).items()}
+        if url_parts.path == self.layer_path:
+            status, data = (
+                200,
+                {
+                    "name": "points",
+                    "maxRecordCount": self.max_record_count,
+                    "objectIdField": "OBJECTID",
+                    "sourceSpatialReference": {"latestWkid": 4326},
+                    "extent": {"xmin": 0, "ymin": 0, "xmax": 8, "ymax": 8},
+                },
+            )
+        else:
+            status, data = self.query(params)
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def fake_layer_url() -> Iterator[str]:
+    # Records on the tile edges at x=4 and y=4 are returned for more than
+    # one tile
+    FakeLayerHandler.records = [
+        {"OBJECTID": i + 1, "x": float(x), "y": float(y)}
+        for i, (x, y) in enumerate(
+            [(1, 1), (1, 7), (2, 2), (3, 6), (4, 4), (4, 1), (6, 6), (7, 3), (7, 7)]
+        )
+    ]
+    FakeLayerHandler.fail_offsets = set()
+    FakeLayerHandler.queries = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLayerHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}{FakeLayerHandler.layer_path}"
+    server.shutdown()
+    server.server_close()
+
+
+def get_downloaded_points(output_path: Path) -> list[tuple[int, str]]:
+    gdf = gpd.read_parquet(output_path)
+    return sorted(zip(gdf["OBJECTID"], gdf.geometry.to_wkt()))
+
+
+def get_expected_points() -> list[tuple[int, str]]:
+    return [
+        (r["OBJECTID"], f"POINT ({r['x']:g} {r['y']:g})")
+        for r in FakeLayerHandler.records
+    ]
+
+
+def test_download_resumes_from_checkpoint(fake_layer_url: str, tmp_path: Path) -> None:
+    output_path = tmp_path / "points.parquet"
+    FakeLayerHandler.fail_offsets = {6}
+    with pytest.raises(LayerRequestError):
+        mapserver_layer_download(
+            fake_layer_url,
+            output_path,
+            x_y_fields=("x", "y"),
+            max_workers=1,
+            max_retries=0,
+        )
+
+    checkpoint = json.loads(
+        (tmp_path / "points.parquet.parts" / CHECKPOINT_FILENAME).read_text()
+    )
+    assert checkpoint["completed_keys"] == ["000000000000", "000000000003"]
+
+    FakeLayerHandler.fail_offsets = set()
+    FakeLayerHandler.queries = []
+    mapserver_layer_download(
+        fake_layer_url, output_path, x_y_fields=("x", "y"), max_workers=1
+    )
+
+    # Only the pages that weren't written before are downloaded again
+    assert sorted(
+        int(query["resultOffset"])
+        for query in FakeLayerHandler.queries
+        if "resultOffset" in query
+    ) == [6]
+    assert get_downloaded_points(output_path) == get_expected_points()
+    assert not (tmp_path / "points.parquet.parts").exists()
+
+
+def test_build_geometry_from_columns() -> None:
+    gdf = gpd.GeoDataFrame(
+        {
+            "xmin": [0, None, "1"],
+            "ymin": [0, 0, "2"],
+            "xmax": [1, 1, "3"],
+            "ymax": [2, 1, "x"],
+            "wkt": ["POINT (1 2)", None, "LINESTRING (0 0, 1 1)"],
+        },
+        geometry=[None] * 3,
+    )
+
+    boxes = build_geometry_from_columns(
+        gdf, xmin_ymin_xmax_ymax_fields=("xmin", "ymin", "xmax", "ymax")
+    )
+    assert boxes[0].wkt == "POLYGON ((1 0, 1 2, 0 2, 0 0, 1 0))"
+    # Missing and non-numeric coordinates give null geometries
+    assert boxes.isna().tolist() == [False, True, True]
+    points = build_geometry_from_columns(gdf, x_y_fields=("xmax", "ymin"))
+    assert points.to_wkt().tolist() == ["POINT (1 0)", "POINT (1 0)", "POINT (3 2)"]
+    geoms = build_geometry_from_columns(gdf, wkt_field="wkt")
+    assert geoms.to_wkt().fillna("").tolist() == [
+        "POINT (1 2)",
+        "",
+        "LINESTRING (0 0, 1 1)",
+    ]
+    gdf["wkb"] = geoms.to_wkb(hex=True)
+    assert build_geometry_from_columns(gdf, wkb_field="wkb").equals(geoms)
+
+
+@pytest.mark.parametrize("max_tile_depth", [0, 16])
+def test_download_tiles(
+    fake_layer_url: str, tmp_path: Path, max_tile_depth: int
+) -> None:
+    output_path = tmp_path / "points.parquet"
+    mapserver_layer_download(
+        fake_layer_url,
+        output_path,
+        x_y_fields=("x", "y"),
+        strategy=DownloadStrategy.TILES,
+        max_tile_depth=max_tile_depth,
+        keep_staging_dir=True,
+    )
+
+    # Each record is downloaded once, however many tiles it touches
+    assert get_downloaded_points(output_path) == get_expected_points()
+    checkpoint = json.loads(
+        (tmp_path / "points.parquet.parts" / CHECKPOINT_FILENAME).read_text()
+    )
+    if max_tile_depth:
+        assert "tile-root" in checkpoint["split_keys"]
+    else:
+        # Too dense a tile at the maximum depth is paged through by offset
+        assert checkpoint["split_keys"] == []
+        assert checkpoint["completed_keys"] == ["tile-root"]
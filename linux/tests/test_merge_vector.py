@@ -0,0 +1,130 @@
+import json
+from pathlib import Path
+
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from shapely.geometry import Point
+
+pyogrio = pytest.importorskip("pyogrio")
+
+from merge_vector import merge_vector_files
+
+
+def write_points(path: Path, crs: str = "EPSG:4326", **columns: list) -> Path:
+    num_rows = len(next(iter(columns.values())))
+    gdf = gpd.GeoDataFrame(
+        columns, geometry=[Point(i, i) for i in range(num_rows)], crs=crs
+    )
+    if path.suffix == ".geojson":
+        gdf.to_file(path, driver="GeoJSON")
+    else:
+        gdf.to_parquet(path)
+    return path
+
+
+def test_cast_numeric_cols(tmp_path: Path) -> None:
+    in_paths = [
+        write_points(
+            tmp_path / "a.parquet",
+            ints=["1", "-3"],
+            signed=["+5", "6"],
+            big=["12345678901234567890", "1"],
+            codes=["007", "120"],
+            names=["x", "1"],
+        ),
+        write_points(
+            tmp_path / "b.parquet",
+            ints=["2", None],
+            signed=["7", "8"],
+            big=["2", "3"],
+            codes=["121", "122"],
+            names=["y", "z"],
+        ),
+    ]
+
+    out_path = merge_vector_files(
+        tmp_path / "merged.parquet", in_paths, cast_numeric_cols=True
+    )
+
+    merged = gpd.read_parquet(out_path)
+    schema = pq.read_schema(out_path)
+    assert schema.field("ints").type == pa.int64()
+    assert schema.field("signed").type == pa.float64()
+    assert schema.field("big").type == pa.float64()
+    assert pa.types.is_large_string(schema.field("codes").type)
+    assert pa.types.is_large_string(schema.field("names").type)
+    assert merged["signed"].tolist() == [5.0, 6.0, 7.0, 8.0]
+    assert merged["codes"].tolist() == ["007", "120", "121", "122"]
+
+
+def test_crs_mismatch(tmp_path: Path) -> None:
+    in_paths = [
+        write_points(tmp_path / "a.parquet", names=["x"]),
+        write_points(tmp_path / "b.parquet", crs="EPSG:32633", names=["y"]),
+    ]
+
+    with pytest.raises(ValueError, match="does not match the CRS"):
+        merge_vector_files(tmp_path / "merged.parquet", in_paths)
+    assert not (tmp_path / "merged.parquet").exists()
+
+
+def test_crs_axis_order_only_differs(tmp_path: Path) -> None:
+    in_paths = [
+        write_points(tmp_path / "a.parquet", crs="OGC:CRS84", names=["x"]),
+        write_points(tmp_path / "b.geojson", names=["y"]),
+    ]
+
+    out_path = merge_vector_files(tmp_path / "merged.parquet", in_paths)
+
+    merged = gpd.read_parquet(out_path)
+    assert merged.crs.equals("OGC:CRS84")
+    assert merged["names"].tolist() == ["x", "y"]
+
+
+def test_stream_gpkg_output(tmp_path: Path) -> None:
+    in_paths = [
+        write_points(tmp_path / "a.parquet", names=["x", "y"]),
+        write_points(tmp_path / "b.geojson", names=["z"]),
+    ]
+
+    out_path = merge_vector_files(tmp_path / "merged.gpkg", in_paths)
+
+    info = pyogrio.read_info(out_path)
+    assert info["geometry_type"] == "Point"
+    assert info["crs"] == "EPSG:4326"
+    merged = gpd.read_file(out_path)
+    assert merged["names"].tolist() == ["x", "y", "z"]
+    assert merged.geometry.to_wkt().tolist() == [
+        "POINT (0 0)",
+        "POINT (1 1)",
+        "POINT (0 0)",
+    ]
+
+
+def test_stream_bbox_covering(tmp_path: Path) -> None:
+    in_paths = [
+        write_points(tmp_path / "a.parquet", names=["x", "y"]),
+        write_points(tmp_path / "b.parquet", names=["z"]),
+    ]
+
+    out_path = merge_vector_files(
+        tmp_path / "merged.parquet", in_paths, write_bbox_covering=True
+    )
+
+    geo_meta = json.loads(pq.read_schema(out_path).metadata[b"geo"])
+    assert geo_meta["version"] == "1.1.0"
+    assert geo_meta["columns"]["geometry"]["covering"]["bbox"]["xmin"] == [
+        "bbox",
+        "xmin",
+    ]
+    bbox_table = pq.read_table(out_path, columns=["bbox"])
+    assert bbox_table.column("bbox").to_pylist()[1] == {
+        "xmin": 1.0,
+        "ymin": 1.0,
+        "xmax": 1.0,
+        "ymax": 1.0,
+    }
+    merged = gpd.read_parquet(out_path, bbox=(0.5, 0.5, 2, 2))
+    assert merged["names"].tolist() == ["y"]
@@ -0,0 +1,80 @@
+import subprocess
+import sys
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+from conftest import EXEC_DIR
+from merge_xml import ElementMerger, get_element_fingerprint
+
+INPUT_XMLS = {
+    "a.xml": "<r><x><a/></x></r>",
+    "b.xml": "<r><z/></r>",
+    "c.xml": "<r><x><c/></x></r>",
+    "d.xml": "<r><x><d/></x><x><e/></x></r>",
+}
+
+
+def run_merge_xml(*args: str) -> str:
+    proc = subprocess.run(
+        [sys.executable, str(EXEC_DIR / "merge_xml.py"), *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return "".join(proc.stdout.split())
+
+
+def test_merge_in_argument_order(tmp_path: Path) -> None:
+    xml_paths = []
+    for name, xml in INPUT_XMLS.items():
+        (tmp_path / name).write_text(xml)
+        xml_paths.append(str(tmp_path / name))
+
+    merged = run_merge_xml(*xml_paths)
+
+    assert merged.endswith("<r><x><a/><c/></x><x><d/></x><x><e/></x><z/></r>")
+    # Once d.xml has added a second x element, c.xml is no longer merged into
+    # the first one, so the result depends on the order
+    assert run_merge_xml(*xml_paths[:2], xml_paths[3], xml_paths[2]).endswith(
+        "<r><x><a/></x><x><d/></x><x><e/></x><x><c/></x><z/></r>"
+    )
+
+
+def merge_xml_strings(*xmls: str) -> str:
+    merger = ElementMerger()
+    base_root = ET.fromstring(xmls[0])
+    for xml in xmls[1:]:
+        merger.merge(base_root, ET.fromstring(xml))
+    return ET.tostring(base_root, encoding="unicode")
+
+
+def test_get_element_fingerprint() -> None:
+    assert get_element_fingerprint(
+        ET.fromstring('<k a="1" b="2"> x <c/></k>')
+    ) == get_element_fingerprint(ET.fromstring('<k b="2" a="1">x<c/></k>'))
+    assert get_element_fingerprint(
+        ET.fromstring("<k><c/><d/></k>")
+    ) != get_element_fingerprint(ET.fromstring("<k><d/><c/></k>"))
+
+
+def test_merge_deduplicates_children() -> None:
+    merged = merge_xml_strings(
+        '<r v="1"><k>a</k><k>b</k></r>',
+        '<r w="2"><k> b </k><k>c</k><k>c</k></r>',
+        "<r><k>a</k><k>d</k><t>x</t></r>",
+    )
+
+    assert merged == '<r v="1" w="2"><k>a</k><k>b</k><k>c</k><k>d</k><t>x</t></r>'
+
+
+def test_merge_refreshes_fingerprints_of_changed_children() -> None:
+    merged = merge_xml_strings(
+        "<r><x><a/></x></r>",
+        # Only duplicates, but fingerprints the existing <x>
+        "<r><x><a/></x><x><a/></x></r>",
+        # Merged into the existing <x> in place
+        "<r><x><b/></x></r>",
+        "<r><x><a/><b/></x><x><a/></x></r>",
+    )
+
+    assert merged == "<r><x><a /><b /></x><x><a /></x></r>"
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from conftest import EXEC_DIR, run_script
+
+
+def test_wrapper_python_dryrun(tmp_path: Path) -> None:
+    demfile = tmp_path / "dem.tif"
+    demfile.touch()
+    proc = run_script("optimize_dem", "--python", "--dryrun", "-nt", "4", str(demfile))
+
+    assert proc.stdout.strip() == (
+        f'"{EXEC_DIR}/optimize_dem.py" "{demfile}"'
+        f' --output-path "{tmp_path / "dem_round-cog.tif"}" --num-threads 4'
+    )
+
+
+def test_wrapper_python_engine(tmp_path: Path) -> None:
+    rio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_origin
+
+    demfile = tmp_path / "dem.tif"
+    rng = np.random.default_rng(0)
+    dem = rng.uniform(0, 1000, (600, 700)).astype(np.float32)
+    dem[:10, :10] = -9999
+    with rio.open(
+        demfile,
+        "w",
+        driver="GTiff",
+        width=dem.shape[1],
+        height=dem.shape[0],
+        count=1,
+        dtype="float32",
+        nodata=-9999,
+        crs="EPSG:3413",
+        transform=from_origin(0, 0, 2, 2),
+    ) as dst:
+        dst.write(dem, 1)
+    run_script("optimize_dem", "--python", str(demfile))
+
+    with rio.open(tmp_path / "dem_round-cog.tif") as src:
+        out = src.read(1)
+        assert src.nodata == -9999
+        assert src.overviews(1)
+    assert np.array_equal(out[:10, :10], dem[:10, :10])
+    valid = dem != -9999
+    assert np.array_equal(out[valid] * 128, np.round(out[valid] * 128))
+    assert np.abs(out[valid] - dem[valid]).max() <= 1 / 256
+
+
+def test_optimize_dem_file_disk_staging(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    rio = pytest.importorskip("rasterio")
+    import optimize_dem
+    from rasterio.transform import from_origin
+
+    demfile = tmp_path / "dem.tif"
+    dem = np.linspace(0, 100, 256 * 256, dtype=np.float32).reshape(256, 256)
+    with rio.open(
+        demfile,
+        "w",
+        driver="GTiff",
+        width=256,
+        height=256,
+        count=1,
+        dtype="float32",
+        crs="EPSG:3413",
+        transform=from_origin(0, 0, 2, 2),
+    ) as dst:
+        dst.write(dem, 1)
+
+    staged_compression = []
+    copy = optimize_dem.rasterio.shutil.copy
+
+    def check_staged_copy(src_path: Path, *args: object, **kwargs: object) -> None:
+        with rio.open(src_path) as staged:
+            staged_compression.append(staged.compression)
+        copy(src_path, *args, **kwargs)
+
+    monkeypatch.setattr(optimize_dem.rasterio.shutil, "copy", check_staged_copy)
+    output_path = optimize_dem.optimize_dem_file(demfile, max_memory_mb=0)
+
+    assert staged_compression == [rio.enums.Compression.deflate]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "dem.tif",
+        "dem_round-cog.tif",
+    ]
+    with rio.open(output_path) as src:
+        assert np.array_equal(src.read(1), np.round(dem * 128) / 128)
@@ -0,0 +1,95 @@
+import gzip
+import os
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from conftest import run_script
+from quickzip import ZipMember, compress_member, write_archive
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    root = tmp_path / "src"
+    (root / "sub").mkdir(parents=True)
+    (tmp_path / "ext").mkdir()
+    (root / "a.txt").write_text("\n".join(str(i) for i in range(5000)))
+    (root / "b.gz").write_bytes(gzip.compress(b"already compressed"))
+    (root / "sub" / "c.txt").write_text("c")
+    (tmp_path / "ext" / "e.txt").write_text("e" * 100)
+    (root / "linked").symlink_to("../ext")
+    (root / "dangling").symlink_to("nowhere")
+    return root
+
+
+def read_members(zip_path: Path) -> dict[str, bytes]:
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+def test_wrapper_engine_matches_zip(tree: Path, tmp_path: Path) -> None:
+    proc = run_script("quickzip", str(tree))
+    run_script("quickzip", "--use-zip", "-o", str(tmp_path / "zip.zip"), str(tree))
+
+    assert "Wrote zipfile" in proc.stdout
+    assert "dangling" in proc.stderr
+    members = read_members(tmp_path / "src.zip")
+    assert members == read_members(tmp_path / "zip.zip")
+    assert members["src/linked/e.txt"] == b"e" * 100
+
+
+def test_symlink_cycle(tree: Path, tmp_path: Path) -> None:
+    (tree / "sub" / "loop").symlink_to("..")
+    run_script("quickzip", str(tree))
+
+    members = read_members(tmp_path / "src.zip")
+    assert "src/sub/loop/" in members
+    assert not any(name.startswith("src/sub/loop/sub/") for name in members)
+
+
+def test_symlink_to_sibling_dir(tree: Path, tmp_path: Path) -> None:
+    # Sorts (and is walked) before the directory it links to
+    (tree / "link_to_sub").symlink_to("sub")
+    run_script("quickzip", str(tree))
+    run_script("quickzip", "--use-zip", "-o", str(tmp_path / "zip.zip"), str(tree))
+
+    members = read_members(tmp_path / "src.zip")
+    assert members == read_members(tmp_path / "zip.zip")
+    assert members["src/link_to_sub/c.txt"] == members["src/sub/c.txt"] == b"c"
+
+
+@pytest.mark.skipif(os.geteuid() == 0, reason="root can read any file")
+def test_unreadable_file_skipped(tree: Path, tmp_path: Path) -> None:
+    (tree / "sub" / "c.txt").chmod(0)
+    proc = run_script("quickzip", str(tree))
+
+    assert "c.txt" in proc.stderr
+    assert "src/sub/c.txt" not in read_members(tmp_path / "src.zip")
+
+
+def test_compress_member_spills_spool(tree: Path) -> None:
+    path = tree / "a.txt"
+    member = ZipMember("a.txt", str(path), 0, 0o100644, path.stat().st_size)
+    compressed = compress_member(member, spool_max_size=16)
+
+    assert compressed is not None and compressed.data is not None
+    assert compressed.compress_type == zipfile.ZIP_DEFLATED
+    data = compressed.data.read()
+    compressed.data.close()
+    assert zlib.decompress(data, -zlib.MAX_WBITS) == path.read_bytes()
+
+
+def test_write_archive_small_spools(tree: Path, tmp_path: Path) -> None:
+    dst_zipfile = tmp_path / "out.zip"
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        num_members, num_stored = write_archive(
+            str(dst_zipfile), [(str(tmp_path), ["src"])], executor, 2, spool_max_size=16
+        )
+
+    members = read_members(dst_zipfile)
+    assert num_members == len(members) == 7
+    assert num_stored == 2
+    assert members["src/a.txt"] == (tree / "a.txt").read_bytes()
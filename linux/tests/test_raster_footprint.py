@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from conftest import EXEC_DIR, run_script
+
+
+def test_wrapper_python_dryrun(tmp_path: Path) -> None:
+    src_raster = tmp_path / "dem.tif"
+    src_raster.touch()
+    proc = run_script(
+        "raster_coverage", "--python", "--dryrun", "-ol", "1", str(src_raster)
+    )
+
+    assert proc.stdout.splitlines()[-1] == (
+        f'"{EXEC_DIR}/raster_footprint.py" "{src_raster}"'
+        f' --output-path "{tmp_path / "dem_coverage.shp"}" --overview-level 1'
+    )
+
+
+def test_wrapper_python_rejects_raster_output(tmp_path: Path) -> None:
+    src_raster = tmp_path / "dem.tif"
+    src_raster.touch()
+    proc = run_script(
+        "raster_coverage", "--python", "--dryrun", "-r", str(src_raster), check=False
+    )
+
+    assert proc.returncode != 0
+    assert "not supported with the --python option" in proc.stdout + proc.stderr
+
+
+def test_wrapper_python_engine(tmp_path: Path) -> None:
+    rio = pytest.importorskip("rasterio")
+    pytest.importorskip("scipy")
+    gpd = pytest.importorskip("geopandas")
+    from rasterio.transform import from_origin
+
+    # A 60x40 pixel block of valid data with a 10x10 pixel hole
+    src_raster = tmp_path / "dem.tif"
+    dem = np.full((100, 100), -9999, dtype=np.float32)
+    dem[20:60, 10:70] = 1
+    dem[30:40, 30:40] = -9999
+    with rio.open(
+        src_raster,
+        "w",
+        driver="GTiff",
+        width=dem.shape[1],
+        height=dem.shape[0],
+        count=1,
+        dtype="float32",
+        nodata=-9999,
+        crs="EPSG:3413",
+        transform=from_origin(0, 0, 2, 2),
+    ) as dst:
+        dst.write(dem, 1)
+    run_script(
+        "raster_coverage", "--python", "-v", str(tmp_path / "cov.gpkg"), str(src_raster)
+    )
+
+    gdf = gpd.read_file(tmp_path / "cov.gpkg")
+    assert gdf[["srcfile", "outfile"]].values.tolist() == [["dem.tif", "cov.gpkg"]]
+    assert gdf.crs.to_epsg() == 3413
+    footprint = gdf.geometry[0]
+    assert footprint.bounds == (20, -120, 140, -40)
+    assert footprint.area == (60 * 40 - 10 * 10) * 4
+
+
+def test_get_raster_footprint_fill_holes(tmp_path: Path) -> None:
+    rio = pytest.importorskip("rasterio")
+    pytest.importorskip("scipy")
+    from raster_footprint import get_raster_footprint
+    from rasterio.transform import from_origin
+
+    src_raster = tmp_path / "mask.tif"
+    data = np.zeros((20, 20), dtype=np.uint8)
+    data[2:18, 2:18] = 1
+    data[8:12, 8:12] = 0
+    with rio.open(
+        src_raster,
+        "w",
+        driver="GTiff",
+        width=20,
+        height=20,
+        count=1,
+        dtype="uint8",
+        nodata=0,
+        crs="EPSG:32633",
+        transform=from_origin(0, 20, 1, 1),
+    ) as dst:
+        dst.write(data, 1)
+
+    footprint, crs = get_raster_footprint(src_raster, fill_holes=True)
+    assert crs.to_epsg() == 32633
+    assert footprint.area == 16 * 16
+    eroded, _ = get_raster_footprint(src_raster, fill_holes=True, erode_pixels=1)
+    assert eroded.area == 14 * 14
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+rio = pytest.importorskip("rasterio")
+
+from raster_preview import raster_preview, scale_to_byte
+from rasterio.transform import from_origin
+
+
+def write_dem(path: Path, dem: np.ndarray, nodata: float | None = -9999) -> Path:
+    with rio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=dem.shape[1],
+        height=dem.shape[0],
+        count=1,
+        dtype=dem.dtype.name,
+        nodata=nodata,
+        crs="EPSG:3413",
+        transform=from_origin(0, 0, 2, 2),
+        tiled=True,
+    ) as dst:
+        dst.write(dem, 1)
+        dst.build_overviews([2, 4])
+    return path
+
+
+def test_scale_to_byte() -> None:
+    arr = np.ma.masked_equal(np.array([[10, 14, 30, -9999]], dtype=np.float32), -9999)
+
+    # Same stretch as `gdal_translate -scale 10 30 0 255`
+    assert scale_to_byte(arr).tolist() == [[0, 51, 255, 0]]
+
+
+def test_thumbnail(tmp_path: Path) -> None:
+    dem = np.tile(np.arange(64, dtype=np.float32), (64, 1))
+    dem[:8, :8] = -9999
+    src_path = write_dem(tmp_path / "dem.tif", dem)
+
+    raster_preview([src_path], res_meters=8, thumb=True)
+
+    with rio.open(tmp_path / "dem_8m_thumb.tif") as ds:
+        thumb = ds.read(1)
+        assert ds.dtypes[0] == "uint8"
+        assert ds.nodata == 0
+        assert ds.res == (8, 8)
+    assert thumb.shape == (16, 16)
+    assert thumb[:2, :2].tolist() == [[0, 0], [0, 0]]
+    assert thumb[8].min() == 0
+    assert thumb[8].max() == 255
+    assert (np.diff(thumb[8].astype(int)) >= 0).all()
+
+
+def test_hillshade_flat(tmp_path: Path) -> None:
+    src_path = write_dem(tmp_path / "dem.tif", np.full((32, 32), 5, dtype=np.float32))
+
+    raster_preview([src_path], res_meters=4, hillshade=True)
+
+    with rio.open(tmp_path / "dem_4m_shade.tif") as ds:
+        shade = ds.read(1)
+        assert ds.nodata == 0
+    # Flat terrain is lit by the cosine of the 45 degree sun zenith angle
+    assert shade.shape == (16, 16)
+    assert (shade == round(1 + 254 * np.cos(np.radians(45)))).all()
+    assert not (tmp_path / "dem_4m.tif").exists()
@@ -0,0 +1,98 @@
+import json
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+from conftest import run_script
+from geo_output import write_geodataframe
+from shapely.geometry import box
+from tindex_query import parse_where_clause, query_tindex
+
+pytest.importorskip("pyogrio")
+
+
+@pytest.fixture
+def tindex_gdf() -> gpd.GeoDataFrame:
+    # Alternate tiles between two UTM zones, so that neither partition is a
+    # contiguous run of rows
+    return gpd.GeoDataFrame(
+        {
+            "location": [f"tile{i}.tif" for i in range(8)],
+            "acqdate": pd.date_range("2022-01-01", periods=8, freq="D"),
+            "res": [2, 8] * 4,
+        },
+        geometry=[box((i % 2) * 10, i, (i % 2) * 10 + 1, i + 1) for i in range(8)],
+        crs="EPSG:4326",
+    )
+
+
+def get_match_geometries(gdf: gpd.GeoDataFrame) -> dict[str, str]:
+    return dict(zip(gdf["location"], gdf.geometry.to_wkt()))
+
+
+def test_parse_where_clause() -> None:
+    assert parse_where_clause("res <= 2") == ("res", "<=", 2)
+    assert parse_where_clause("name='a b'") == ("name", "=", "a b")
+    with pytest.raises(ValueError, match="Cannot parse"):
+        parse_where_clause("res 2")
+
+
+@pytest.mark.parametrize("partition_by", [None, "utm_zone"])
+def test_query_parquet_tindex(
+    tindex_gdf: gpd.GeoDataFrame, tmp_path: Path, partition_by: str | None
+) -> None:
+    tindex_path = write_geodataframe(
+        tindex_gdf,
+        tmp_path / ("parts" if partition_by else "tindex.parquet"),
+        write_bbox_covering=True,
+        partition_by=partition_by,
+    )
+
+    matches = query_tindex(tindex_path, box(-1, 2.5, 20, 6.5))
+
+    assert get_match_geometries(matches) == get_match_geometries(tindex_gdf.iloc[2:7])
+    matches = query_tindex(tindex_path, box(-1, -1, 20, 20), where=["res > 2"])
+    assert sorted(matches["location"]) == [
+        "tile1.tif",
+        "tile3.tif",
+        "tile5.tif",
+        "tile7.tif",
+    ]
+
+
+def test_query_partitioned_tindex_with_index_column(
+    tindex_gdf: gpd.GeoDataFrame, tmp_path: Path
+) -> None:
+    # Parts that store their row labels as an '__index_level_0__' column
+    for zone, part_gdf in tindex_gdf.groupby(tindex_gdf.index % 2):
+        part_dir = tmp_path / "parts" / f"zone={zone}"
+        part_dir.mkdir(parents=True)
+        part_gdf.to_parquet(part_dir / "part-0.parquet", write_covering_bbox=True)
+
+    matches = query_tindex(tmp_path / "parts", box(-1, -1, 20, 20))
+
+    assert get_match_geometries(matches) == get_match_geometries(tindex_gdf)
+
+
+def test_script_geojsonseq_datetime(
+    tindex_gdf: gpd.GeoDataFrame, tmp_path: Path
+) -> None:
+    tindex_path = tmp_path / "tindex.parquet"
+    tindex_gdf.to_parquet(tindex_path)
+    proc = run_script(
+        "tindex_query.py",
+        str(tindex_path),
+        "--bbox",
+        "-1",
+        "-1",
+        "2",
+        "1.5",
+        "--output-format",
+        "geojsonseq",
+    )
+
+    features = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert [feature["properties"] for feature in features] == [
+        {"location": "tile0.tif", "acqdate": "2022-01-01 00:00:00", "res": 2}
+    ]